@@ -1,19 +1,44 @@
-import os
+# Provider werden erst geladen, wenn sie gebraucht werden: Im Kobold-Modus wird das
+# Gemini-SDK nie importiert (und muss nicht installiert sein), colorama erst bei der
+# ersten Ausgabe. Neue Provider: register_provider("name", funktion).
+# Jede Anfrage läuft über provider_router (Hedging, Failover, Circuit Breaker); Gemini hinter
+# Kobold nur mit KI_FALLBACK=gemini (Cloud-Ausweich ist Opt-in).
+import os, time
+from functools import lru_cache
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
 import requests
-import google.generativeai as genai
-from colorama import Fore, Style
+
+from .provider_router import Provider, Router
+
+KOBOLD_TIMEOUT = float(os.getenv("KOBOLD_TIMEOUT") or 180)
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT") or 60)
+# Kennung der Generierung bei KoboldCpp: abort_local bricht nur Antworten ab, keine Zusammenfassung
+REPLY_GENKEY      = "viluu-reply"
+BACKGROUND_GENKEY = "viluu-background"
 
 # --- HILFSFUNKTION FÜR KONSOLEN-AUSGABEN ---
+@lru_cache(maxsize=1)
+def _colors():
+    try:
+        from colorama import Fore, Style
+        return Fore.CYAN, Fore.RED, Style.RESET_ALL
+    except ImportError:
+        return "", "", ""
+
 def print_ai_info(message):
     """Gibt eine formatierte Info-Nachricht auf der Konsole aus."""
-    print(f"{Fore.CYAN}[AI-CLIENT]{Style.RESET_ALL} {message}")
+    cyan, _, reset = _colors()
+    print(f"{cyan}[AI-CLIENT]{reset} {message}")
 
 def print_ai_error(message):
     """Gibt eine formatierte Fehler-Nachricht auf der Konsole aus."""
-    print(f"{Fore.RED}[AI-CLIENT FEHLER]{Style.RESET_ALL} {message}")
+    _, red, reset = _colors()
+    print(f"{red}[AI-CLIENT FEHLER]{reset} {message}")
 
 # --- KI-PROVIDER: LOKALES MODELL (z.B. Kobold) ---
-def generate_reply_local(history, system_rules, user_message):
+def generate_reply_local(history, system_rules, user_message, genkey: str = REPLY_GENKEY):
     """
     Generiert eine Antwort über eine lokale API (kompatibel mit Kobold).
     """
@@ -21,7 +46,8 @@ def generate_reply_local(history, system_rules, user_message):
     
     prompt = f"{system_rules}\n\n"
     prompt += "--- CHAT-VERLAUF ---\n"
-    for msg in history[-5:]:
+    # history ist bereits per Token-Budget gekürzt (context_window.build_context)
+    for msg in history:
         role = "user" if msg['direction'] == 'in' else "model"
         prompt += f"{role}: {msg['text']}\n"
     prompt += f"--- AKTUELLE NACHRICHT ---\n"
@@ -34,13 +60,14 @@ def generate_reply_local(history, system_rules, user_message):
         'temperature': 0.8,
         'top_p': 0.9,
         'repetition_penalty': 1.1,
-        'stop_sequence': ["\nuser:", "\nmodel:"]
+        'stop_sequence': ["\nuser:", "\nmodel:"],
+        'genkey': genkey,
     }
     
     print_ai_info(f"Sende Anfrage an lokales Modell via {endpoint}...")
     try:
-        # --- HIER IST DIE ÄNDERUNG: Die Wartezeit wurde auf 180 Sekunden erhöht ---
-        response = requests.post(endpoint, json=payload, timeout=180)
+        # Wartezeit per KOBOLD_TIMEOUT (Standard 180 s)
+        response = requests.post(endpoint, json=payload, timeout=KOBOLD_TIMEOUT)
         
         response.raise_for_status()
         
@@ -57,6 +84,13 @@ def generate_reply_local(history, system_rules, user_message):
         return None
 
 # --- KI-PROVIDER: GEMINI (Google) ---
+@lru_cache(maxsize=2)
+def _gemini_model(api_key: str):
+    """SDK-Import + Konfiguration einmal je Prozess (erst beim ersten Gemini-Aufruf)."""
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('gemini-1.5-flash-latest')
+
 def generate_reply_gemini(history, system_rules, user_message):
     """
     Generiert eine Antwort über die Gemini API.
@@ -67,8 +101,10 @@ def generate_reply_gemini(history, system_rules, user_message):
         return None
 
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash-latest')
+        model = _gemini_model(api_key)
+    except ImportError:
+        print_ai_error("Paket 'google-generativeai' fehlt (pip install google-generativeai).")
+        return None
     except Exception as e:
         print_ai_error(f"Fehler bei der Konfiguration des Gemini-Modells: {e}")
         return None
@@ -83,7 +119,7 @@ def generate_reply_gemini(history, system_rules, user_message):
     print_ai_info("Sende Anfrage an Gemini API...")
     try:
         chat_session = model.start_chat(history=gemini_history)
-        response = chat_session.send_message(full_prompt)
+        response = chat_session.send_message(full_prompt, request_options={"timeout": GEMINI_TIMEOUT})
         
         clean_text = response.text.strip()
         
@@ -93,18 +129,137 @@ def generate_reply_gemini(history, system_rules, user_message):
         print_ai_error(f"Fehler bei der Abfrage der Gemini API: {e}")
         return None
 
+# --- WARM-UP: winzige Generierung beim Start, damit die erste echte Antwort nicht kalt ist ---
+def abort_local():
+    """Laufende Generierung in KoboldCpp abbrechen (der Router ruft das für den Verlierer auf)."""
+    endpoint = os.getenv("KOBOLD_ENDPOINT", "http://127.0.0.1:5001/api/v1/generate")
+    i = endpoint.find("/api/")
+    base = endpoint[:i] if i >= 0 else endpoint.rstrip("/")
+    requests.post(base + "/api/extra/abort", json={"genkey": REPLY_GENKEY}, timeout=5)
+
+def warm_up_local(prefix: str):
+    """
+    Lädt bei KoboldCpp die Gewichte in den Speicher und verarbeitet den festen Prompt-Anfang
+    einmal vor – die nächste Anfrage mit demselben Anfang nutzt den Cache (nur der Rest wird gerechnet).
+    """
+    endpoint = os.getenv("KOBOLD_ENDPOINT", "http://127.0.0.1:5001/api/v1/generate")
+    # max_length = Feldname der Kobold-API, max_new_tokens wie in generate_reply_local
+    payload = {'prompt': prefix, 'max_length': 1, 'max_new_tokens': 1, 'temperature': 0.1}
+    requests.post(endpoint, json=payload, timeout=180).raise_for_status()
+
+def warm_up_gemini(prefix: str):
+    """SDK-Import, Konfiguration, TLS-Verbindung und eine Mini-Antwort (1 Token)."""
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise RuntimeError("GEMINI_API_KEY fehlt")
+    _gemini_model(api_key).generate_content(
+        f"{prefix}\nAntworte nur mit OK.", generation_config={"max_output_tokens": 1}
+    )
+
+# --- PROVIDER-REGISTRY ---
+ReplyFn = Callable[[list, str, str], Optional[str]]
+WarmUpFn = Callable[[str], None]
+
+PROVIDERS: Dict[str, ReplyFn] = {
+    "gemini": generate_reply_gemini,
+    "kobold": generate_reply_local,
+}
+WARM_UPS: Dict[str, WarmUpFn] = {
+    "gemini": warm_up_gemini,
+    "kobold": warm_up_local,
+}
+ABORTS: Dict[str, Callable[[], None]] = {
+    "kobold": abort_local,
+}
+
+def register_provider(name: str, fn: ReplyFn, warm_up: Optional[WarmUpFn] = None,
+                      abort: Optional[Callable[[], None]] = None):
+    PROVIDERS[name.lower()] = fn
+    if warm_up is not None:
+        WARM_UPS[name.lower()] = warm_up
+    if abort is not None:
+        ABORTS[name.lower()] = abort
+
+def current_provider() -> str:
+    return os.getenv("KI_PROVIDER", "kobold").lower()
+
+def provider_chain() -> List[str]:
+    """
+    Gewählter Provider + Ausweich-Provider. KI_FALLBACK=gemini (oder kobold, mehrere mit Komma);
+    nicht gesetzt: Kobold hinter Gemini, hinter Kobold nichts – der Chatverlauf geht nur
+    in die Cloud, wenn KI_FALLBACK das ausdrücklich erlaubt.
+    """
+    primary = current_provider()
+    if primary not in PROVIDERS:
+        return []
+    raw = os.getenv("KI_FALLBACK")
+    if raw is None:
+        fallback = ["kobold"] if primary == "gemini" else []
+    else:
+        fallback = [x.strip().lower() for x in raw.split(",") if x.strip()]
+    chain = [primary] + [x for x in fallback if x != primary]
+    return [x for x in chain if x in PROVIDERS]
+
+_ROUTERS: Dict[Tuple[str, ...], Router] = {}
+
+def get_router() -> Optional[Router]:
+    """Ein Router je Provider-Kette – die Gesundheitsdaten bleiben über Anfragen erhalten."""
+    chain = tuple(provider_chain())
+    if not chain:
+        return None
+    if chain not in _ROUTERS:
+        _ROUTERS[chain] = Router([Provider(n, PROVIDERS[n], ABORTS.get(n)) for n in chain])
+    return _ROUTERS[chain]
+
+def generate_background(history, system_rules, user_message) -> Optional[str]:
+    """
+    Für Hintergrund-Jobs (Zusammenfassungen): direkt beim gewählten Provider, ohne Router –
+    kein Hedging in die Cloud, keine Einträge in dessen Latenz-Statistik, kein Abbruch durch ihn.
+    """
+    provider = current_provider()
+    fn = PROVIDERS.get(provider)
+    if fn is None:
+        return None
+    if fn is generate_reply_local:
+        return fn(history, system_rules, user_message, genkey=BACKGROUND_GENKEY)
+    return fn(history, system_rules, user_message)
+
 # --- HAUPTFUNKTION, DIE ALLES STEUERT ---
+def submit_reply(history, system_rules, user_message) -> Optional["Future[Optional[str]]"]:
+    """
+    Startet die Generierung im Hintergrund. Rückgabe: Future mit der Antwort (oder None);
+    None sofort, wenn kein Provider konfiguriert ist. Der Aufrufer entscheidet, wie lange er wartet.
+    """
+    provider = current_provider()
+    router = get_router()
+    if router is None:
+        print_ai_error(f"Unbekannter KI_PROVIDER '{provider}' in der Konfiguration.")
+        return None
+    future = router.submit(history, system_rules, user_message)
+
+    def note_fallback(f):
+        if not f.cancelled() and f.result() and router.last_winner != provider:
+            print_ai_info(f"Antwort kam von '{router.last_winner}' (Ausweich-Provider).")
+    future.add_done_callback(note_fallback)
+    return future
+
 def generate_reply(history, system_rules, user_message):
     """
     Hauptfunktion: Wählt den KI-Provider basierend auf der Konfiguration
     und generiert eine Antwort.
     """
-    provider = os.getenv("KI_PROVIDER", "kobold").lower()
+    future = submit_reply(history, system_rules, user_message)
+    return future.result() if future is not None else None
 
-    if provider == "gemini":
-        return generate_reply_gemini(history, system_rules, user_message)
-    elif provider == "kobold":
-        return generate_reply_local(history, system_rules, user_message)
-    else:
-        print_ai_error(f"Unbekannter KI_PROVIDER '{provider}' in der Konfiguration.")
-        return None
\ No newline at end of file
+def warm_up(prefix: str) -> Optional[float]:
+    """Warm-up des gewählten Providers. Rückgabe: Dauer in Sekunden, None wenn nicht möglich."""
+    fn = WARM_UPS.get(current_provider())
+    if fn is None:
+        return None
+    t0 = time.perf_counter()
+    try:
+        fn(prefix)
+    except Exception as e:
+        print_ai_error(f"Warm-up fehlgeschlagen: {e}")
+        return None
+    return time.perf_counter() - t0
@@ -1,7 +1,7 @@
 # app/bot.py
 from __future__ import annotations
 from playwright.sync_api import sync_playwright, Error
-import json, re
+import json
 from datetime import datetime
 
 # unsere Module
@@ -10,6 +10,8 @@ from templates import (
     pick_template, pick_pause_lead,
     normalize_text, enforce_rules
 )
+from normalize import parse_ts, epoch_to_datetime
+from browser import open_page, report
 
 # ---- Einstellungen ----
 START_URL = "https://viluu.de/mod99/chat/screen"
@@ -55,19 +57,6 @@ JS_WRITE_INPUT = r"""
 """
 
 # ---- Hilfsfunktionen ----
-def parse_ts(ts_text: str) -> datetime | None:
-    """Parst '19:57 22/8/2025' zu datetime."""
-    if not ts_text:
-        return None
-    m = re.search(r'(\d{1,2}):(\d{2})\s+(\d{1,2})/(\d{1,2})/(\d{4})', ts_text)
-    if not m:
-        return None
-    hh, mm, dd, mo, yyyy = map(int, m.groups())
-    try:
-        return datetime(yyyy, mo, dd, hh, mm)
-    except ValueError:
-        return None
-
 def pick_greeting(now: datetime, msg_time: datetime | None) -> str:
     """Zeitabhängige Begrüßung (bei altem Thread neutraler)."""
     if msg_time:
@@ -102,9 +91,10 @@ def compose_reply(intent: str, greet: str, gap_kind: str) -> str:
 # ---- Hauptprogramm ----
 def main():
     with sync_playwright() as p:
-        browser = p.chromium.launch(headless=False)
-        page = browser.new_page()
-        page.goto(START_URL)
+        browser, page = open_page(p, url_hint=START_URL)   # Daemon-Seite, falls einer läuft
+        if not page.url.startswith(START_URL):
+            page.goto(START_URL)
+        print(report(page, "Start-Seite"))
 
         print("✅ Chat-Seite geöffnet. Melde dich an und gehe zur Chat-Ansicht.")
         input("👉 Wenn du im Chat bist, drücke hier ENTER... ")
@@ -155,8 +145,8 @@ def main():
         last_in  = result.get("last_in")
         last_out = result.get("last_out")
 
-        in_time  = parse_ts(last_in["tsText"])  if last_in  else None
-        out_time = parse_ts(last_out["tsText"]) if last_out else None
+        in_time  = epoch_to_datetime(parse_ts(last_in["tsText"]))  if last_in  else None
+        out_time = epoch_to_datetime(parse_ts(last_out["tsText"])) if last_out else None
 
         now = datetime.now()
         greet    = pick_greeting(now, in_time or out_time)
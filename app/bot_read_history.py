@@ -2,8 +2,10 @@
 from __future__ import annotations
 print("🔧 Start: bot_read_history.py geladen")
 
-import json, re, sys, traceback
-from datetime import datetime
+import json, sys, traceback
+
+from normalize import normalize_card
+from browser import describe, open_page, report
 
 try:
     from playwright.sync_api import sync_playwright, Error
@@ -39,27 +41,17 @@ JS_READ_HISTORY = r"""
 })();
 """
 
-def parse_ts(ts_text: str) -> datetime | None:
-    if not ts_text: return None
-    m = re.search(r'(\d{1,2}):(\d{2})\s+(\d{1,2})/(\d{1,2})/(\d{4})', ts_text)
-    if not m: return None
-    hh, mm, dd, mo, yyyy = map(int, m.groups())
-    try:
-        return datetime(yyyy, mo, dd, hh, mm)
-    except ValueError:
-        return None
-
 def main():
     print("🔧 main() gestartet")
     try:
         with sync_playwright() as p:
             print("🔧 Playwright Kontext erstellt")
-            browser = p.chromium.launch(headless=False)
-            print("✅ Chromium gestartet")
-            page = browser.new_page()
-            print("🔧 Neue Seite geöffnet")
-            page.goto(START_URL)
+            browser, page = open_page(p, url_hint=START_URL)   # Daemon-Seite, falls einer läuft
+            print(f"✅ Chromium bereit ({describe()})")
+            if not page.url.startswith(START_URL):
+                page.goto(START_URL)
             print("🌐 Seite geladen:", START_URL)
+            print(report(page, "Start-Seite"))
 
             print("✅ Chat-Seite geöffnet. Melde dich an und gehe zur Chat-Ansicht.")
             input("👉 Wenn du im Chat bist, drücke hier ENTER... ")
@@ -117,9 +109,10 @@ def main():
                 print("   (leer)")
             else:
                 for i, m in enumerate(shown, start=1):
+                    rec = normalize_card(m)
                     who = "DU" if m.get("isMine") else "ER/SIE"
-                    ts  = m.get("tsText") or "(ohne Zeit)"
-                    txt = (m.get("text") or "").strip()
+                    ts  = (rec and rec.ts_iso) or m.get("tsText") or "(ohne Zeit)"
+                    txt = rec.text if rec else ""
                     short = (txt[:140] + "…") if len(txt) > 140 else txt
                     print(f"{i:2d}) [{who}] {ts} — {short}")
 
@@ -1,140 +1,399 @@
 # app/bot_with_history.py
 from __future__ import annotations
 from playwright.sync_api import sync_playwright, Error
-import os, re, json, sqlite3, time
+import os, re, json, sqlite3, threading, time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
 from dotenv import load_dotenv
-from .ai_client import generate_reply
+from .ai_client import get_router, submit_reply, warm_up
 from .rules import filter_and_fix
+from .normalize import MessageRecord, clean_text, normalize_cards
+from .input_gate import gate_incoming
+from .intent_detector import detect_intent
+from .templates import pick_template
+from .context_window import init_context, build_context
+from .summary_memory import SummaryWorker, get_summary_block
+from .conversation import ConvIdentity, identify
+from .net_capture import NetCapture, card_key
+from .followups import FOLLOWUP_HOURS, FollowupTimers
+from .memory_governor import MemoryGovernor
+from .poll_scheduler import BASE_INTERVAL, DOM_MAX_INTERVAL, MAX_INTERVAL, PollScheduler, load_histogram
+from .browser import attach, attach_enabled, daemon_running, describe, open_persistent, report
+from .session import CHAT_URL, ensure_session, is_login_page
+from .retrieval import retrieve_related, format_related
+from .profile_extract import update_profile_incremental, profile_block
+from . import metrics
+from .db import BASE_DIR, DB_PATH, connect
+from .db_write import save_records
+from .migrations import migrate
 
 load_dotenv()
 
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DB_PATH = os.path.join(BASE_DIR, "chat_brain.sqlite")
 LOG_DIR = os.path.join(BASE_DIR, "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 
-START_URL = "https://viluu.de/mod99/chat/screen"
+START_URL = CHAT_URL
+POLL_SECONDS = BASE_INTERVAL   # nur noch Wartezeit nach Fehlern; sonst plant PollScheduler
+WAKE_TICK = 1.0               # so oft wird während des Wartens auf neue Netz-Nachrichten geprüft
+
+# 'net' = Nachrichten aus XHR/WebSocket mitlesen (DOM nur als Rückfall), 'dom' = wie früher
+CAPTURE_MODE = os.getenv("CAPTURE_MODE", "net").strip().lower()
+
+# Hintergrund-Job für die laufende Zusammenfassung (wird in main() gestartet)
+SUMMARY_WORKER: Optional[SummaryWorker] = None
+
+# Fester Anfang jedes Prompts – unverändert lassen, sonst greift der Prefix-Cache des lokalen
+# Modells (und das Warm-up beim Start) nicht mehr. Alles Dynamische kommt danach.
+MASTER_PROMPT = """
+    DU BIST EINE MENSCHLICHE PERSON IN EINEM CHAT. VERHALTE DICH NATÜRLICH UND SEI KEINE MASCHINE.
+    Dein Stil: Du bist charmant, witzig und führst ein natürliches, lockeres Gespräch. Du bist hier, um zu chatten und dein Gegenüber kennenzulernen.
+
+    WICHTIGE REGELN (UNBEDINGT STRIKT EINHALTEN):
+    1. NIEMALS TREFFEN: Lehne ALLE Anfragen nach realen Treffen (egal ob Kaffee, Spaziergang, Dates, "live sehen" oder Adressaustausch) immer höflich aber bestimmt ab. Sage, dass du dich wohler fühlst, wenn ihr erstmal nur hier schreibt.
+    2. KEINE KONTAKTE: Teile NIEMALS Kontaktinformationen (kein WhatsApp, Instagram, Telegram, Telefonnummern, E-Mail etc.). Lehne dies ebenfalls höflich ab.
+    3. STIL: Sprich immer in der "Du"-Form. Sei freundlich und interessiert, aber immer unverbindlich, was die reale Welt angeht. Antworte auf die Fragen, die dir gestellt werden.
+    """
+
+# Beim Start eine Mini-Anfrage an den gewählten Provider (parallel zum Login); AI_WARMUP=0 schaltet ab
+AI_WARMUP = os.getenv("AI_WARMUP", "1").strip().lower() not in ("0", "false", "no", "off")
+
+# So lange wartet eine Antwort auf die KI, dann kommt sofort eine passende Vorlage als Entwurf.
+# Die KI rechnet weiter und ersetzt den Entwurf, solange niemand ihn bearbeitet hat. 0 = ohne Limit.
+REPLY_BUDGET_SECONDS = float(os.getenv("REPLY_BUDGET_SECONDS") or 30)
+UPGRADE_MAX_WAIT = 600   # später (ab Absenden der Anfrage) eintreffende KI-Antworten werden verworfen
+
+@dataclass
+class PendingUpgrade:
+    future: Future
+    draft: str                  # eingefügte Vorlage – nur wenn sie noch so dasteht, wird ersetzt
+    conv_id: Optional[str]
+    started: float              # perf_counter() beim Absenden der KI-Anfrage
+
+PENDING_UPGRADE: Optional[PendingUpgrade] = None
+HOT_REQUEST: Optional[Future] = None   # die KI-Anfrage, für die hot_path gesetzt ist
 
 # --- KORREKTUR: JS_READ_HISTORY jetzt mit Zeitstempel ---
 JS_READ_HISTORY = "() => { const cards = [...document.querySelectorAll('.messages-container .message-card')]; if (!cards.length) return []; function pickInfo(card) { const isMine = card.classList.contains('message-current'); const tsEl = card.querySelector('.message-date'); const tsText = tsEl ? (tsEl.innerText || '').trim() : null; const textEl = card.querySelector('.text'); const text = textEl ? textEl.innerText.trim() : ''; return { text, isMine, tsText }; } return cards.map(pickInfo); }"
+JS_READ_INPUT = "() => { const ta = document.querySelector('#message-input'); return ta ? ta.value : null; }"
 JS_FILL_INPUT = "({value}) => { const ta = document.querySelector('#message-input'); if (!ta) return false; ta.value = value; ta.dispatchEvent(new Event('input', { bubbles: true })); return true; }"
 
+def read_history(page, capture: Optional[NetCapture], ident: ConvIdentity) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Verlauf aus dem Netzwerk-Mitschnitt; solange dort nichts Passendes ist, aus dem DOM.
+    Rückgabe: (Karten, live) – live = aus dem Mitschnitt, der die Warteschleife wecken kann.
+    """
+    if capture is not None:
+        hint = ident.conv_id.split(":", 1)[-1] if ident.source in ("dom", "url") else None
+        cards = capture.history(hint)
+        if cards:
+            metrics.incr("capture.net")
+            return cards, True
+    metrics.incr("capture.dom")
+    return page.evaluate(JS_READ_HISTORY), False
+
 def connect_db() -> sqlite3.Connection:
-    con = sqlite3.connect(DB_PATH)
-    con.execute("PRAGMA foreign_keys = ON;")
-    return con
-def bulk_save_messages(con: sqlite3.Connection, items: List[Dict[str, Any]]):
-    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    for m in items:
-        text = (m.get("text") or "").strip()
-        if not text: continue
-        direction = "out" if m.get("isMine") else "in"
-        ts_iso = parse_ts_to_iso(m.get("tsText"))
-        con.execute("INSERT INTO messages(direction, text, created_at, ts) VALUES (?,?,?,?)", (direction, text, now, ts_iso))
+    return connect()
+
+def bulk_save_messages(con: sqlite3.Connection, records: List[MessageRecord], ident: ConvIdentity) -> int:
+    # Der Chat zeigt immer dasselbe Fenster: schon gespeicherte Nachrichten werden über
+    # den eindeutigen msg_key übersprungen, sonst landet der ganze Verlauf erneut in der DB.
+    inserted = save_records(con, records, ident.conv_id, ident.peer_name)
     con.commit()
+    return inserted
 
-def parse_ts_to_iso(raw_ts: str | None) -> str | None:
-    if not raw_ts: return None
+def _load_activity(conv_id: Optional[str]) -> List[int]:
+    con = connect_db()
     try:
-        dt_obj = datetime.strptime(raw_ts, '%H:%M %d/%m/%Y')
-        return dt_obj.isoformat()
-    except (ValueError, TypeError):
-        return datetime.now().isoformat() # Fallback auf aktuelle Zeit
+        return load_histogram(con, conv_id)
+    finally:
+        con.close()
+
+def wait_for_next_poll(page, scheduler: PollScheduler, capture: Optional[NetCapture]):
+    """
+    Bis zur nächsten fälligen Abfrage warten – in kurzen Schritten, damit eine über das
+    Netz mitgelesene Nachricht (capture.version) sofort eine Abfrage auslöst.
+    """
+    nxt = scheduler.next_due()
+    deadline = time.monotonic() + (nxt[1] if nxt else BASE_INTERVAL)
+    version = capture.version if capture else None
+    while (remaining := deadline - time.monotonic()) > 0:
+        page.wait_for_timeout(min(remaining, WAKE_TICK) * 1000)   # statt sleep: Playwright-Events laufen weiter
+        if capture and capture.version != version:
+            metrics.incr("poll.woken")
+            return
+        if PENDING_UPGRADE is not None and PENDING_UPGRADE.future.done():
+            return   # verspätete KI-Antwort sofort einsetzen
+
+def start_warm_up(ki_provider: str) -> threading.Thread:
+    """Warm-up im Hintergrund – läuft, während der Browser startet und sich einloggt."""
+    def run():
+        secs = warm_up(MASTER_PROMPT)
+        if secs is not None:
+            metrics.set_value("startup.warmup_s", round(secs, 2))
+            print(f"🔥 KI '{ki_provider}' vorgewärmt in {secs:.1f}s (fester Prompt-Anfang im Cache).")
+    t = threading.Thread(target=run, name="ai-warmup", daemon=True)
+    t.start()
+    return t
+
+def fill_template_draft(page, user_text: str, last_out: str, why: str) -> str:
+    """Vorlage passend zum Intent der Nachricht als Entwurf einfügen. Rückgabe: eingefügter Text."""
+    # Follow-up ohne neue Nachricht: lockerer Smalltalk passt am besten
+    intent = detect_intent(user_text, recent_context=last_out).intent if user_text else "smalltalk"
+    draft, flags = filter_and_fix(pick_template(intent))
+    page.evaluate(JS_FILL_INPUT, {"value": draft})
+    print(f"\n📝 {why} – Vorlage ({intent}) eingefügt (NICHT gesendet):")
+    print("   ", draft)
+    return draft
+
+def poll_upgrade(page, ident: ConvIdentity):
+    """
+    Im Hauptloop (Playwright nur aus diesem Thread): verspätete KI-Antwort einsetzen, wenn
+    die Vorlage unverändert im Eingabefeld steht und dieselbe Unterhaltung offen ist.
+    """
+    global PENDING_UPGRADE
+    pu = PENDING_UPGRADE
+    if pu is None:
+        return
+    if not pu.future.done():
+        if time.perf_counter() - pu.started > UPGRADE_MAX_WAIT:
+            PENDING_UPGRADE = None
+            metrics.incr("budget.upgrade_expired")
+        return
+    PENDING_UPGRADE = None
+    reply = pu.future.result()
+    if not reply:
+        metrics.incr("budget.late_failed")
+        print("   KI hat auch später keine Antwort geliefert – Vorlage bleibt.")
+        return
+    if ident.conv_id != pu.conv_id:
+        metrics.incr("budget.upgrade_skipped")
+        print("   Späte KI-Antwort verworfen: andere Unterhaltung offen.")
+        return
+    current = page.evaluate(JS_READ_INPUT)
+    if (current or "").strip() != pu.draft.strip():
+        metrics.incr("budget.upgrade_skipped")
+        print("   Späte KI-Antwort verworfen: Entwurf wurde bearbeitet oder gesendet.")
+        return
+    filtered, flags = filter_and_fix(reply)
+    page.evaluate(JS_FILL_INPUT, {"value": filtered})
+    metrics.incr("budget.upgraded")
+    print(f"\n✅ Vorlage durch KI-Antwort ersetzt ({time.perf_counter() - pu.started:.1f}s nach Anfrage, NICHT gesendet):")
+    print("   ", filtered)
+    print(f"   Flags: {flags}  Budget: {metrics.format_line('budget.')}")
+
+def same_card(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+    return (a.get("text"), a.get("tsText"), bool(a.get("isMine"))) == (b.get("text"), b.get("tsText"), bool(b.get("isMine")))
+
+def tail_mark(history: List[Dict[str, Any]]) -> Tuple[str, int]:
+    """
+    Scrape-Cursor: Identität der letzten Karte + wie oft sie am Ende hintereinander steht
+    (zweimal "ok" in derselben Minute). Anders als len(history) wächst das auch weiter,
+    wenn die Liste gedeckelt ist (NetCapture.keep) oder das DOM-Fenster kürzer wird.
+    """
+    key = card_key(history[-1])
+    run = 0
+    for c in reversed(history):
+        if card_key(c) != key:
+            break
+        run += 1
+    return key, run
+
+def is_newer(mark: Tuple[str, int], seen: Optional[Tuple[str, int]]) -> bool:
+    return seen is None or mark[0] != seen[0] or mark[1] > seen[1]
 
-def main(ki_provider: str):
+def main(ki_provider: str, started_at: Optional[float] = None):
+    """started_at: perf_counter() beim Prozessstart (run.py) – für die Zeit bis zum ersten Poll."""
+    global SUMMARY_WORKER
+    os.environ['KI_PROVIDER'] = ki_provider
+    con = connect_db()
+    migrate(con)   # Schema auf Stand (auf aktueller DB nur ein PRAGMA)
+    con.close()
+
+    SUMMARY_WORKER = SummaryWorker(DB_PATH)
+    SUMMARY_WORKER.start()
+
+    router = get_router()
+    if router is not None:
+        print(f"🧭 KI-Kette: {' -> '.join(x.name for x in router.providers)}  ({router.status()})")
+    max_ctx = init_context(ki_provider)
+    if max_ctx:
+        print(f"📐 Maximale Kontextlänge des Modells: {max_ctx} Tokens")
+    if AI_WARMUP:
+        start_warm_up(ki_provider)
     with sync_playwright() as p:
-        print("Starte Chromium-Browser...")
-        browser = p.chromium.launch(headless=False)
-        page = browser.new_page()
-        
-        login_url = "https://chatadmin.de/login"
-        print(f"✅ Navigiere zur Login-Seite: {login_url}")
-        page.goto(login_url)
+        t_start = time.perf_counter()
+        attached = attach_enabled() and daemon_running()
+        if attached:   # laufender Browser-Daemon: Seite samt Sitzung übernehmen
+            browser, context, page = attach(p, url_hint=CHAT_URL)
+            print(f"🔌 Mit Browser-Daemon verbunden ({(time.perf_counter() - t_start) * 1000:.0f} ms).")
+        else:
+            print(f"Starte Chromium-Browser ({describe()})...")
+            context, page = open_persistent(p)   # Sitzung (Cookies) bleibt über Neustarts erhalten
+        capture = NetCapture(page) if CAPTURE_MODE == "net" else None   # vor dem Login: erste Payloads nicht verpassen
+        if capture:
+            print("📡 Netzwerk-Mitschnitt aktiv (Rückfall: DOM).")
 
-        username = os.getenv("VILUU_USERNAME")
-        password = os.getenv("VILUU_PASSWORD")
+        def shutdown():
+            # Den Browser des Daemons nie schließen – nur die Verbindung trennen
+            (browser if attached else context).close()
 
-        if not username or not password:
-            print("❌ Login-Daten nicht in .env gefunden.")
-            browser.close()
+        if not ensure_session(page, keep_page=attached):
+            shutdown()
             return
-            
-        print(" Fülle Login-Formular aus...")
-        page.get_by_label("Nickname").fill(username)
-        page.get_by_label("Password").fill(password)
-        
-        print(" Klicke auf den Login-Button...")
-        page.get_by_role("button", name="Log In").click()
-        
-        input("--> BITTE FÜHRE JETZT DIE MANUELLEN SCHRITTE AUS UND NAVIGIERE ZUM CHAT. DRÜCKE DANN HIER ENTER...")
+        print(f"🚀 Startklar nach {time.perf_counter() - t_start:.1f}s.")
 
-        last_known_message_count = 0
+        # Zuletzt gesehene Karte je Unterhaltung – beim Wechsel des Chats wird nichts verwechselt
+        cursors: Dict[Optional[str], Tuple[str, int]] = {}
+        # Abfrage-Takt je Unterhaltung: kurz nach Eingang, sonst zunehmend seltener
+        scheduler = PollScheduler(load_hist=_load_activity)
+        polled: Optional[str] = None
+        # Follow-ups: Timer liegen in der DB (überleben Neustarts), im Speicher nur die bald fälligen
+        timer_con = connect_db()
+        followups = FollowupTimers()
+        # Speicher der Seite messen, bei Limit in ruhiger Phase auffrischen
+        governor = MemoryGovernor(timer_con)
+        last_activity = time.monotonic()
+        print(report(page, "Chat"))
         print("\n✅ Bot ist jetzt im Überwachungs- und Follow-Up-Modus...")
         print("   Drücke Strg+C im Terminal, um den Bot zu beenden.")
         
         while True:
             try:
-                history = page.evaluate(JS_READ_HISTORY)
+                if is_login_page(page):   # Sitzung im Lauf abgelaufen -> einmal neu einloggen
+                    if not ensure_session(page):
+                        page.wait_for_timeout(POLL_SECONDS * 1000)
+                        continue
+                ident = identify(page)
+                poll_upgrade(page, ident)
+                if ident.conv_id != polled:   # eine Seite = eine sichtbare Unterhaltung im Takt
+                    if polled is not None:
+                        scheduler.remove(polled)
+                    polled = ident.conv_id
+                    followups.refresh(timer_con, ident.conv_id)   # fälliger Timer dieser Unterhaltung
+                history, live = read_history(page, capture, ident)
+                max_interval = MAX_INTERVAL if live else DOM_MAX_INTERVAL   # lange Pausen nur mit Wecken
+                if started_at is not None:
+                    print(f"⏱️  Start -> erster Poll: {time.perf_counter() - started_at:.1f}s")
+                    metrics.set_value("startup.first_poll_s", round(time.perf_counter() - started_at, 2))
+                    started_at = None
                 if not history:
-                    time.sleep(15)
+                    scheduler.record(ident.conv_id, activity=False, max_interval=max_interval)
+                    wait_for_next_poll(page, scheduler, capture)
                     continue
 
-                current_message_count = len(history)
                 latest_message = history[-1]
+                mark = tail_mark(history)
+                changed = is_newer(mark, cursors.get(ident.conv_id))
+                inbound = changed and not latest_message.get("isMine")
                 
                 # --- START: NEUE PROAKTIVE LOGIK ---
                 
                 # Szenario 1: Neue Nachricht vom Gegenüber (wie bisher)
-                if current_message_count > last_known_message_count and not latest_message.get("isMine"):
+                if inbound:
                     
                     # --- START: NEUE PRÜFUNG AUF LEEREN TEXT (FIX) ---
                     incoming_text = (latest_message.get('text') or "").strip()
-                    print(f"\n🔥 Neue Nachricht erkannt: '{incoming_text}'")
-                    last_known_message_count = current_message_count
+                    print(f"\n🔥 Neue Nachricht erkannt: '{incoming_text}'"
+                          + (f"  [{ident.conv_id}]" if ident.conv_id else ""))
+                    cursors[ident.conv_id] = mark
 
                     if incoming_text:
                         # Nur antworten, wenn der Text NICHT leer ist
-                        generate_and_send_reply(page, ki_provider, history, latest_message)
+                        generate_and_send_reply(page, ki_provider, history, latest_message, ident)
                     else:
                         # Nachricht ist leer (z.B. Tipp-Indikator oder JS-SCRAPER FEHLER), ignoriere sie.
                         print("   JS-Scraper hat leere Nachricht gelesen. Ignoriere und warte auf echten Text.")
                     # --- ENDE: NEUE PRÜFUNG ---
 
-                # Szenario 2: Follow-Up, wenn unsere letzte Nachricht unbeantwortet ist
-                elif latest_message.get("isMine") and current_message_count == last_known_message_count:
-                    last_message_time_iso = parse_ts_to_iso(latest_message.get("tsText"))
-                    
-                    if last_message_time_iso:
-                        time_since_last_message = datetime.now() - datetime.fromisoformat(last_message_time_iso)
-                        
-                        if time_since_last_message > timedelta(hours=4):
-                            print(f"\n⏰ Follow-Up Trigger: Deine letzte Nachricht ist über 4 Stunden alt. Generiere eine Follow-Up Nachricht.")
-                            generate_and_send_reply(page, ki_provider, history, None) 
-                            last_known_message_count += 1 # Wichtig: Zähler erhöhen, um Spam zu verhindern
-                
                 else:
-                    # Wenn keine neue Nachricht da ist, aktualisiere den Zähler für den nächsten Durchlauf
-                    last_known_message_count = current_message_count
+                    # Eigene (z.B. von Hand gesendete) Nachricht speichern -> Trigger macht den Follow-up-Timer scharf
+                    if changed and latest_message.get("isMine"):
+                        bulk_save_messages(timer_con, normalize_cards(history), ident)
+                        followups.refresh(timer_con, ident.conv_id)
+                    cursors[ident.conv_id] = mark
+
+                # Szenario 2: Follow-Up – nur fällige Timer (followup_timers), nicht jede Unterhaltung prüfen
+                for conv in followups.due(timer_con):
+                    if conv != (ident.conv_id or ""):
+                        print(f"\n⏰ Follow-Up fällig in Unterhaltung [{conv or '-'}] – wird beim Öffnen erstellt.")
+                        continue
+                    print(f"\n⏰ Follow-Up Trigger: Deine letzte Nachricht ist über {FOLLOWUP_HOURS:g} Stunden alt. Generiere eine Follow-Up Nachricht.")
+                    generate_and_send_reply(page, ki_provider, history, None, ident)
+                    followups.fired(timer_con, conv)   # gelöscht -> auch nach Neustart kein zweiter Follow-up
+
+                if changed:
+                    last_activity = time.monotonic()
+                governor.tick(page)   # zählt die Karten im DOM (dort wächst der Speicher)
+                if governor.should_recycle(page, time.monotonic() - last_activity):
+                    page = governor.recycle(page, capture)
+                    # Scrape-Cursor wiederherstellen: direkt hinter die zuletzt verarbeitete Nachricht im
+                    # neuen (kürzeren) Fenster – was während des Auffrischens kam, gilt beim nächsten Poll als neu
+                    fresh, _ = read_history(page, capture, identify(page))
+                    at = next((i for i in range(len(fresh) - 1, -1, -1) if same_card(fresh[i], latest_message)), None)
+                    if at is not None:
+                        cursors[ident.conv_id] = tail_mark(fresh[:at + 1])
+                        if at < len(fresh) - 1:
+                            print(f"   {len(fresh) - 1 - at} Nachricht(en) während des Auffrischens – folgt beim nächsten Poll.")
+                    # nicht gefunden: Cursor bleibt – der nächste Poll vergleicht die letzte Karte damit
 
-                time.sleep(15)
+                interval = scheduler.record(ident.conv_id, activity=changed, inbound=inbound,
+                                            max_interval=max_interval)
+                if changed:
+                    print(f"   ⏳ Nächste Abfrage in {interval:.0f}s  (Takt: {metrics.format_line('poll.')})")
+                wait_for_next_poll(page, scheduler, capture)
 
             except KeyboardInterrupt:
                 print("\nBot wird beendet.")
-                browser.close()
+                print(f"   Takt: {metrics.format_line('poll.')}  Follow-ups: {metrics.format_line('followup.')}")
+                print(f"   Speicher: {metrics.format_line('mem.')}")
+                print(f"   Antwort-Budget: {metrics.format_line('budget.')}")
+                timer_con.close()
+                shutdown()
                 return
             except Exception as e:
-                print(f"Ein Fehler ist aufgetreten: {e}. Prüfe in 15 Sekunden erneut.")
-                time.sleep(15)
+                print(f"Ein Fehler ist aufgetreten: {e}. Prüfe in {POLL_SECONDS:g} Sekunden erneut.")
+                try:
+                    page.wait_for_timeout(POLL_SECONDS * 1000)   # statt sleep: Mitschnitt/Routen laufen weiter
+                except Exception:
+                    time.sleep(POLL_SECONDS)   # Seite geschlossen o.ä.
 
 # --- NEUE FUNKTION, um Code-Wiederholung zu vermeiden ---
-def generate_and_send_reply(page, ki_provider, history, latest_message):
+def generate_and_send_reply(page, ki_provider, history, latest_message, ident: ConvIdentity):
+    global PENDING_UPGRADE, HOT_REQUEST
+    records = normalize_cards(history)
+    conv_id = ident.conv_id
     con = connect_db()
-    bulk_save_messages(con, history)
+    n_new = bulk_save_messages(con, records, ident)
+    if n_new:
+        update_profile_incremental(con, conv_id)   # nur die neuen Nachrichten
+    summary_block = get_summary_block(con, conv_id)
+    facts_block = profile_block(con, conv_id)
+    related = []
+    if latest_message is not None:
+        related = retrieve_related(con, conv_id, clean_text(latest_message.get("text")), k=3,
+                                   exclude_texts=(r.text for r in records))
     con.close()
-    print(f"💾 Verlauf gespeichert.")
+    print(f"💾 Verlauf gespeichert ({n_new} neu).")
+
+    PENDING_UPGRADE = None   # neuer Entwurf -> eine ältere, noch laufende Antwort gilt nicht mehr
+    last_out = next((m.get("text", "") for m in reversed(history) if m.get("isMine")), "")
+
+    # --- Vorprüfung der eingehenden Nachricht (spart KI-Aufrufe) ---
+    if latest_message is not None:
+        gate = gate_incoming(clean_text(latest_message.get("text")), recent_context=last_out)
+        if gate:
+            if gate.action == "block":
+                print(f"⛔ Eingang blockiert ({gate.reason}). Kein Entwurf, keine KI-Anfrage.")
+            else:
+                page.evaluate(JS_FILL_INPUT, {"value": gate.reply})
+                print(f"\n✅ Feste Antwort ({gate.reason}) eingefügt (NICHT gesendet):")
+                print("   ", gate.reply)
+                print(f"   Flags: {gate.flags}")
+            print(f"   Gate: {metrics.format_line('gate.')}")
+            return
 
     os.environ['KI_PROVIDER'] = ki_provider
     print(f"🤖 KI-Modus '{ki_provider}' ist aktiviert. Generiere eine Antwort...")
@@ -152,7 +411,7 @@ def generate_and_send_reply(page, ki_provider, history, latest_message):
         user_text = "" # Es gibt keine neue User-Nachricht
     else:
         # Dies ist eine direkte Antwort (Szenario 1)
-        user_text = latest_message.get("text", "") # (Wir wissen dank der Prüfung oben, dass dieser Text nicht leer ist)
+        user_text = clean_text(latest_message.get("text")) # (Wir wissen dank der Prüfung oben, dass dieser Text nicht leer ist)
         is_new_conversation = len(history) <= 2
         if is_new_conversation:
             conversation_context = "Dies ist die allererste Nachricht in einer neuen Unterhaltung."
@@ -160,30 +419,70 @@ def generate_and_send_reply(page, ki_provider, history, latest_message):
             conversation_context = "Dies ist eine laufende Unterhaltung."
 
     # --- START: GENERISCHER MASTER PROMPT (FIX 3.0) ---
-    # Schritt 1: Definiere die Persona und die Regeln (NEUTRAL, OHNE NAMEN)
-    master_prompt_text = f"""
-    DU BIST EINE MENSCHLICHE PERSON IN EINEM CHAT. VERHALTE DICH NATÜRLICH UND SEI KEINE MASCHINE.
-    Dein Stil: Du bist charmant, witzig und führst ein natürliches, lockeres Gespräch. Du bist hier, um zu chatten und dein Gegenüber kennenzulernen.
-
-    WICHTIGE REGELN (UNBEDINGT STRIKT EINHALTEN):
-    1. NIEMALS TREFFEN: Lehne ALLE Anfragen nach realen Treffen (egal ob Kaffee, Spaziergang, Dates, "live sehen" oder Adressaustausch) immer höflich aber bestimmt ab. Sage, dass du dich wohler fühlst, wenn ihr erstmal nur hier schreibt.
-    2. KEINE KONTAKTE: Teile NIEMALS Kontaktinformationen (kein WhatsApp, Instagram, Telegram, Telefonnummern, E-Mail etc.). Lehne dies ebenfalls höflich ab.
-    3. STIL: Sprich immer in der "Du"-Form. Sei freundlich und interessiert, aber immer unverbindlich, was die reale Welt angeht. Antworte auf die Fragen, die dir gestellt werden.
-    """
-
+    # Schritt 1: Persona und Regeln stehen fest in MASTER_PROMPT (immer gleicher Prompt-Anfang)
     # Schritt 2: Kombiniere den Master Prompt mit dem dynamischen Kontext
-    system_rules = f"""
-    {master_prompt_text}
-
+    system_rules = MASTER_PROMPT + f"""
     ZUSATZ-KONTEXT FÜR DIESE SPEZIFISCHE ANTWORT:
     - Aktuelle Tageszeit: Es ist gerade {tageszeit}.
     - Gesprächsstatus: {conversation_context}
     """
+    if facts_block:
+        system_rules += f"""
+    BEKANNT ÜBER DEIN GEGENÜBER (nicht ungefragt wiederholen): {facts_block}
+    """
+    if summary_block:
+        system_rules += f"""
+    BISHERIGES GESPRÄCH (ZUSAMMENFASSUNG ÄLTERER NACHRICHTEN):
+    {summary_block}
+    """
+    if related:
+        system_rules += f"""
+    FRÜHERE, PASSENDE NACHRICHTEN AUS DIESEM GESPRÄCH:
+    {format_related(related)}
+    """
     # --- ENDE: GENERISCHER MASTER PROMPT ---
     
-    history_for_ai = [{'direction': 'out' if msg.get('isMine') else 'in', 'text': msg.get('text', '')} for msg in history[-10:]]
-    ai_reply = generate_reply(history_for_ai, system_rules, user_text)
-    
+    history_for_ai = [{'direction': r.direction, 'text': r.text} for r in records]
+    history_for_ai, ctx = build_context(history_for_ai, system_rules, user_text)
+    print(f"📏 Prompt: {'' if ctx.exact else '~'}{ctx.prompt_tokens} Tokens "
+          f"({ctx.messages} Nachrichten, {ctx.dropped} weggelassen, Budget {ctx.budget})")
+    t_ai = time.perf_counter()
+
+    def finished(done: Optional[Future] = None):
+        # bei Budget-Überschreitung erst, wenn die Antwort doch noch kommt (dann im Router-Thread)
+        global HOT_REQUEST
+        metrics.set_value("ai.last_s", round(time.perf_counter() - t_ai, 2))
+        print(f"⏱️  KI-Anfrage: {metrics.get('ai.last_s'):.1f}s"
+              + (f" (Warm-up beim Start {metrics.get('startup.warmup_s'):.1f}s)" if metrics.get("startup.warmup_s") else ""))
+        if SUMMARY_WORKER:
+            if done is None or done is HOT_REQUEST:   # eine neuere Anfrage läuft noch -> hot_path bleibt gesetzt
+                HOT_REQUEST = None
+                SUMMARY_WORKER.hot_path.clear()
+            SUMMARY_WORKER.request(conv_id)
+
+    future, ai_reply, missed = None, None, False
+    if SUMMARY_WORKER:
+        SUMMARY_WORKER.hot_path.set()
+    try:
+        future = HOT_REQUEST = submit_reply(history_for_ai, system_rules, user_text)
+        if future is not None:
+            ai_reply = future.result(timeout=REPLY_BUDGET_SECONDS or None)
+    except FutureTimeout:
+        missed = True
+    finally:
+        if not missed:   # auch bei einer Exception: hot_path nie gesetzt lassen
+            finished()
+    if missed:
+        future.add_done_callback(finished)
+        metrics.incr("budget.miss")
+        draft = fill_template_draft(page, user_text, last_out,
+                                    f"KI braucht länger als {REPLY_BUDGET_SECONDS:g}s")
+        PENDING_UPGRADE = PendingUpgrade(future, draft, conv_id, t_ai)
+        print(f"   KI rechnet weiter und ersetzt den Entwurf, falls er unverändert bleibt. "
+              f"Budget: {metrics.format_line('budget.')}")
+        return
+    metrics.incr("budget.hit" if ai_reply else "budget.failed")
+
     if ai_reply:
         print("✅ KI-Antwort erhalten.")
         filtered, flags = filter_and_fix(ai_reply)
@@ -192,4 +491,4 @@ def generate_and_send_reply(page, ki_provider, history, latest_message):
         print("   ", filtered)
         print(f"   Flags: {flags}")
     else:
-        print("⚠️ KI konnte keine Antwort generieren.")
\ No newline at end of file
+        fill_template_draft(page, user_text, last_out, "⚠️ KI konnte keine Antwort generieren")
\ No newline at end of file
@@ -0,0 +1,206 @@
+# app/browser.py
+# Schlankes Chromium-Profil für alle Bots: Headless per Schalter, Bilder/Medien/Fonts/
+# Tracking werden gar nicht erst geladen, kleines Fenster. Dazu Ladezeit + RSS-Anzeige.
+#
+# .env:
+#   BROWSER_HEADLESS=0|1|new   0 = sichtbar (Standard), 1 = headless, new = neuer Headless-Modus
+#   BROWSER_BLOCK=1|0          Bilder, Medien, Fonts, Analytics blockieren (Standard: an)
+#   BROWSER_VIEWPORT=800x600   Fenstergröße
+#   BROWSER_PROFILE_DIR=…      Profilordner der dauerhaften Sitzung (Standard: browser_profile/)
+#   BROWSER_ATTACH=auto|0      auto = an laufenden Browser-Daemon (app/browser_daemon.py) andocken
+#   BROWSER_CDP_PORT=9222      Remote-Debugging-Port des Daemons
+#
+# Hinweis: Dieses Modul importiert bewusst nichts aus app/, damit auch bot.py und
+# bot_read_history.py (als Skript gestartet) es nutzen können.
+# RSS-Messung braucht das optionale Paket psutil (pip install psutil).
+from __future__ import annotations
+import os, re, time
+import urllib.request
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+try:
+    import psutil
+except ImportError:   # optional – ohne psutil gibt es nur keine RSS-Zahl
+    psutil = None
+
+BLOCK_TYPES = {"image", "media", "font"}
+RE_BLOCK_URL = re.compile(
+    r"(google-analytics|googletagmanager|doubleclick|googlesyndication|facebook\.(?:net|com)/tr|"
+    r"hotjar|matomo|piwik|clarity\.ms|segment\.(?:io|com)|mixpanel|sentry\.io|"
+    r"\.(?:png|jpe?g|gif|webp|avif|svg|ico|mp4|webm|mp3|woff2?|ttf|otf)(?:\?|$))",
+    re.IGNORECASE
+)
+# Prozessnamen von Chromium (Linux/Windows, inkl. Headless-Shell)
+RE_CHROMIUM_PROC = re.compile(r"chrom|headless_shell", re.IGNORECASE)
+
+_blocked = 0   # Zähler für abgebrochene Anfragen (prozessweit)
+
+BASE_DIR    = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILE_DIR = os.getenv("BROWSER_PROFILE_DIR") or os.path.join(BASE_DIR, "browser_profile")
+CDP_PORT    = int(os.getenv("BROWSER_CDP_PORT") or 9222)
+
+@dataclass(frozen=True)
+class BrowserOptions:
+    headless: str = "0"                     # '0' | '1' | 'new'
+    block: bool = True
+    viewport: Tuple[int, int] = (800, 600)
+
+def options_from_env() -> BrowserOptions:
+    mode = (os.getenv("BROWSER_HEADLESS") or "0").strip().lower()
+    if mode in ("true", "yes", "on"):
+        mode = "1"
+    if mode not in ("0", "1", "new"):
+        mode = "0"
+    block = (os.getenv("BROWSER_BLOCK") or "1").strip().lower() not in ("0", "false", "no", "off")
+    m = re.match(r"^\s*(\d{3,4})\s*[x×]\s*(\d{3,4})\s*$", os.getenv("BROWSER_VIEWPORT") or "")
+    viewport = (int(m.group(1)), int(m.group(2))) if m else BrowserOptions.viewport
+    return BrowserOptions(mode, block, viewport)
+
+def launch_args(opts: BrowserOptions) -> dict:
+    """Parameter für chromium.launch()/launch_persistent_context()."""
+    args = ["--disable-extensions", "--disable-background-networking", "--mute-audio",
+            f"--window-size={opts.viewport[0]},{opts.viewport[1]}"]
+    if opts.headless == "new":   # neuer Headless-Modus = voller Chromium statt Headless-Shell
+        return {"headless": True, "channel": "chromium", "args": args}
+    return {"headless": opts.headless == "1", "args": args}
+
+# -------------------------------------------------------
+# Blockieren
+# -------------------------------------------------------
+def should_block(resource_type: str, url: str) -> bool:
+    return resource_type in BLOCK_TYPES or bool(RE_BLOCK_URL.search(url))
+
+def _route_handler(route):
+    global _blocked
+    req = route.request
+    if should_block(req.resource_type, req.url):
+        _blocked += 1
+        route.abort()
+    else:
+        route.continue_()
+
+def install_blocking(target):
+    """target = BrowserContext (alle Seiten) oder Page."""
+    target.route("**/*", _route_handler)
+
+def blocked_count() -> int:
+    return _blocked
+
+# -------------------------------------------------------
+# Start
+# -------------------------------------------------------
+def launch(p, opts: Optional[BrowserOptions] = None):
+    """p = sync_playwright()-Objekt. Rückgabe: Browser."""
+    opts = opts or options_from_env()
+    return p.chromium.launch(**launch_args(opts))
+
+def new_page(browser, opts: Optional[BrowserOptions] = None):
+    """Neue Seite in einem eigenen Kontext mit kleinem Viewport und Blockliste."""
+    opts = opts or options_from_env()
+    context = browser.new_context(viewport={"width": opts.viewport[0], "height": opts.viewport[1]})
+    if opts.block:
+        install_blocking(context)
+    return context.new_page()
+
+def open_persistent(p, opts: Optional[BrowserOptions] = None, profile_dir: str = PROFILE_DIR,
+                    debug_port: Optional[int] = None):
+    """
+    Dauerhafter Kontext: Cookies, localStorage und IndexedDB bleiben im Profilordner
+    erhalten – nach einem Neustart ist man i.d.R. noch eingeloggt. Rückgabe: (context, page).
+    """
+    opts = opts or options_from_env()
+    os.makedirs(profile_dir, exist_ok=True)
+    kwargs = launch_args(opts)
+    if debug_port:   # nur für den Daemon: andere Prozesse docken per CDP an
+        kwargs["args"] = kwargs["args"] + [f"--remote-debugging-port={debug_port}"]
+    context = p.chromium.launch_persistent_context(
+        profile_dir, viewport={"width": opts.viewport[0], "height": opts.viewport[1]}, **kwargs
+    )
+    if opts.block:
+        install_blocking(context)
+    page = context.pages[0] if context.pages else context.new_page()
+    return context, page
+
+# -------------------------------------------------------
+# Andocken an den Browser-Daemon (CDP)
+# -------------------------------------------------------
+def cdp_url(port: int = CDP_PORT) -> str:
+    return f"http://127.0.0.1:{port}"
+
+def attach_enabled() -> bool:
+    return (os.getenv("BROWSER_ATTACH") or "auto").strip().lower() not in ("0", "false", "no", "off")
+
+def daemon_running(port: int = CDP_PORT, timeout: float = 0.3) -> bool:
+    """Antwortet der Remote-Debugging-Endpunkt? (kurzer HTTP-Check, kein Playwright)"""
+    try:
+        with urllib.request.urlopen(cdp_url(port) + "/json/version", timeout=timeout) as r:
+            return r.status == 200
+    except Exception:
+        return False
+
+def attach(p, url_hint: Optional[str] = None, port: int = CDP_PORT):
+    """
+    Verbindet sich mit dem laufenden Daemon und nimmt die vorhandene Seite (bevorzugt die,
+    deren URL url_hint enthält). Rückgabe: (browser, context, page). Blockliste und Sitzung
+    gehören dem Daemon; browser.close() trennt nur die Verbindung.
+    """
+    browser = p.chromium.connect_over_cdp(cdp_url(port))
+    context = browser.contexts[0] if browser.contexts else browser.new_context()
+    pages = [pg for pg in context.pages if not pg.is_closed()]
+    page = next((pg for pg in pages if url_hint and url_hint in (pg.url or "")), None)
+    page = page or (pages[0] if pages else context.new_page())
+    return browser, context, page
+
+def open_page(p, url_hint: Optional[str] = None):
+    """Für die Einzel-Skripte: Daemon-Seite wenn verfügbar, sonst eigener, schlanker Browser."""
+    if attach_enabled() and daemon_running():
+        t0 = time.perf_counter()
+        browser, _, page = attach(p, url_hint)
+        print(f"🔌 Mit Browser-Daemon verbunden ({(time.perf_counter() - t0) * 1000:.0f} ms).")
+        return browser, page
+    browser = launch(p)
+    return browser, new_page(browser)
+
+# -------------------------------------------------------
+# Messen
+# -------------------------------------------------------
+JS_LOAD_MS = """() => {
+  const n = performance.getEntriesByType('navigation')[0];
+  return n && n.loadEventEnd > 0 ? n.loadEventEnd - n.startTime : null;
+}"""
+
+def page_load_ms(page) -> Optional[float]:
+    """Ladezeit der aktuellen Seite (Navigation Timing), None wenn unbekannt."""
+    try:
+        return page.evaluate(JS_LOAD_MS)
+    except Exception:
+        return None
+
+def chromium_rss_mb() -> Optional[float]:
+    """Summe RSS aller Chromium-Prozesse unterhalb dieses Python-Prozesses (MB), None ohne psutil."""
+    if psutil is None:
+        return None
+    total = 0
+    try:
+        for proc in psutil.Process().children(recursive=True):
+            try:
+                if RE_CHROMIUM_PROC.search(proc.name()):
+                    total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+    except psutil.Error:
+        return None
+    return total / (1024 * 1024)
+
+def describe(opts: Optional[BrowserOptions] = None) -> str:
+    opts = opts or options_from_env()
+    mode = {"0": "sichtbar", "1": "headless", "new": "headless (neu)"}[opts.headless]
+    return f"{mode}, {opts.viewport[0]}x{opts.viewport[1]}, Blockliste {'an' if opts.block else 'aus'}"
+
+def report(page, label: str = "Seite") -> str:
+    """Einzeiler für die Konsole: Ladezeit, RSS, blockierte Anfragen."""
+    ms, rss = page_load_ms(page), chromium_rss_mb()
+    return (f"⏱️  {label}: Ladezeit {f'{ms:.0f} ms' if ms is not None else '-'}, "
+            f"Chromium-RSS {f'{rss:.0f} MB' if rss is not None else '- (psutil fehlt)'}, "
+            f"{_blocked} Anfragen blockiert")
@@ -0,0 +1,51 @@
+# app/browser_daemon.py
+# Langlebiger Browser für alle Bots: EIN Chromium mit dauerhaftem Profil und
+# Remote-Debugging (nur 127.0.0.1). Bots docken per connect_over_cdp an und
+# übernehmen die offene Chat-Seite – ein Neustart des Bots (neue Regeln, neuer Code)
+# kostet dann ein Andocken statt Browserstart, Login und Navigation.
+#
+#   python -m app.browser_daemon         # läuft, bis Strg+C oder das Fenster geschlossen wird
+#
+# Der Prozess muss laufen bleiben: er besitzt den Browser und bedient die Blockliste.
+from __future__ import annotations
+import time
+
+from dotenv import load_dotenv
+from playwright.sync_api import sync_playwright
+
+from .browser import CDP_PORT, cdp_url, daemon_running, describe, open_persistent, report
+from .session import ensure_session
+
+load_dotenv()
+
+IDLE_TICK_MS = 1000   # so oft gibt der Daemon Playwright Gelegenheit, Events/Routen zu bedienen
+
+def main():
+    if daemon_running():
+        print(f"ℹ️  Auf {cdp_url()} läuft bereits ein Browser – nichts zu tun.")
+        return
+    with sync_playwright() as p:
+        t0 = time.perf_counter()
+        print(f"🛰️  Starte Browser-Daemon ({describe()}, Port {CDP_PORT})...")
+        context, page = open_persistent(p, debug_port=CDP_PORT)
+        if not ensure_session(page):
+            print("⚠️ Ohne gültige Sitzung – Bots können trotzdem andocken und den Login wiederholen.")
+        print(report(page, "Chat"))
+        print(f"✅ Daemon bereit nach {time.perf_counter() - t0:.1f}s: {cdp_url()}  (Strg+C beendet)")
+        try:
+            while True:
+                pages = [pg for pg in context.pages if not pg.is_closed()]
+                if not pages:   # Fenster geschlossen
+                    break
+                pages[0].wait_for_timeout(IDLE_TICK_MS)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print("\n🛑 Browser-Daemon wird beendet.")
+            try:
+                context.close()
+            except Exception:
+                pass
+
+if __name__ == "__main__":
+    main()
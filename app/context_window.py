@@ -0,0 +1,126 @@
+# app/context_window.py
+# Token-Budget für den Prompt: Der Verlauf wird von NEU nach ALT aufgefüllt,
+# bis das Budget voll ist. Gezählt wird lokal über ein kalibriertes
+# Zeichen-pro-Token-Verhältnis; bei Kobold ab und zu exakt über den Tokenizer.
+from __future__ import annotations
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from . import metrics
+
+DEFAULT_KOBOLD_ENDPOINT = "http://127.0.0.1:5001/api/v1/generate"
+DEFAULT_BUDGET     = 1024      # Tokens für den ganzen Prompt (Regeln + Verlauf + Nachricht)
+RESERVED_FOR_REPLY = 250 + 32  # max_new_tokens + Sicherheitsabstand
+FRAME_TOKENS       = 16        # Überschriften wie '--- CHAT-VERLAUF ---'
+CALIBRATE_EVERY    = 20        # jede n-te Anfrage exakt zählen lassen (nur Kobold)
+
+_STATE: Dict[str, Any] = {
+    "provider": None,
+    "max_context": None,       # vom Server, einmal beim Start geholt
+    "chars_per_token": 3.5,    # Startwert für deutschen Chat-Text
+    "calls": 0,
+}
+
+@dataclass(frozen=True)
+class ContextInfo:
+    messages: int              # übernommene Verlaufsnachrichten
+    dropped: int               # weggelassen (Budget voll)
+    prompt_tokens: int         # geschätzt bzw. exakt gezählt
+    budget: int
+    exact: bool                # True = vom Tokenizer gezählt
+
+# -------------------------------------------------------
+# Kobold-Endpunkte
+# -------------------------------------------------------
+def _kobold_base() -> str:
+    endpoint = os.getenv("KOBOLD_ENDPOINT", DEFAULT_KOBOLD_ENDPOINT)
+    i = endpoint.find("/api/")
+    return endpoint[:i] if i >= 0 else endpoint.rstrip("/")
+
+def _kobold_value(path: str, payload: Optional[dict] = None, timeout: float = 5) -> Optional[int]:
+    url = _kobold_base() + path
+    try:
+        if payload is None:
+            r = requests.get(url, timeout=timeout)
+        else:
+            r = requests.post(url, json=payload, timeout=timeout)
+        r.raise_for_status()
+        return int(r.json()["value"])
+    except (requests.exceptions.RequestException, KeyError, ValueError, TypeError):
+        return None
+
+# -------------------------------------------------------
+# Öffentliche API
+# -------------------------------------------------------
+def init_context(provider: str) -> Optional[int]:
+    """Einmal beim Start aufrufen: maximale Kontextlänge holen und cachen."""
+    _STATE["provider"] = provider
+    if provider == "kobold" and _STATE["max_context"] is None:
+        _STATE["max_context"] = _kobold_value("/api/v1/config/max_context_length")
+    return _STATE["max_context"]
+
+def token_budget() -> int:
+    budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", DEFAULT_BUDGET))
+    max_ctx = _STATE["max_context"]
+    if max_ctx:
+        budget = min(budget, max_ctx - RESERVED_FOR_REPLY)
+    return max(budget, 64)
+
+def estimate_tokens(text: str) -> int:
+    if not text:
+        return 0
+    return int(len(text) / _STATE["chars_per_token"]) + 1
+
+def count_tokens(text: str) -> Optional[int]:
+    """Exakte Zählung über den Kobold-Tokenizer; kalibriert nebenbei die Näherung."""
+    if _STATE["provider"] != "kobold" or not text:
+        return None
+    n = _kobold_value("/api/extra/tokencount", payload={"prompt": text})
+    if n and len(text) >= 200:
+        ratio = len(text) / n
+        _STATE["chars_per_token"] = 0.7 * _STATE["chars_per_token"] + 0.3 * ratio
+    return n
+
+def format_line(msg: Dict[str, str]) -> str:
+    role = "user" if msg["direction"] == "in" else "model"
+    return f"{role}: {msg['text']}\n"
+
+def build_context(history: List[Dict[str, str]], system_rules: str, user_message: str,
+                  budget: Optional[int] = None) -> Tuple[List[Dict[str, str]], ContextInfo]:
+    """
+    history: [{'direction': 'in'|'out', 'text': ...}, ...] (alt -> neu)
+    Liefert den gekürzten Verlauf (alt -> neu) + Kennzahlen.
+    """
+    budget = budget or token_budget()
+    msgs = list(history)
+    # Die aktuelle Nachricht steht separat im Prompt – nicht doppelt senden
+    if user_message and msgs and msgs[-1]["direction"] == "in" \
+            and (msgs[-1]["text"] or "").strip() == user_message.strip():
+        msgs = msgs[:-1]
+
+    used = estimate_tokens(system_rules) + estimate_tokens(user_message) + FRAME_TOKENS
+    picked: List[Dict[str, str]] = []
+    for msg in reversed(msgs):
+        cost = estimate_tokens(format_line(msg))
+        if used + cost > budget:
+            break
+        picked.append(msg)
+        used += cost
+    picked.reverse()
+
+    _STATE["calls"] += 1
+    exact = False
+    if _STATE["calls"] % CALIBRATE_EVERY == 1:
+        full = system_rules + "".join(format_line(m) for m in picked) + user_message
+        n = count_tokens(full)
+        if n:
+            used, exact = n + FRAME_TOKENS, True
+
+    metrics.incr("ctx.requests")
+    metrics.incr("ctx.prompt_tokens_total", used)
+    metrics.set_value("ctx.prompt_tokens_last", used)
+    metrics.incr("ctx.dropped_messages", len(msgs) - len(picked))
+    return picked, ContextInfo(len(picked), len(msgs) - len(picked), used, budget, exact)
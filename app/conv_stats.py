@@ -0,0 +1,198 @@
+# app/conv_stats.py
+# Kennzahlen je Unterhaltung (Anzahl ein/aus, erste/letzte Zeitstempel, letzte id),
+# von Triggern auf 'messages' laufend mitgeführt. Dashboard und Follow-Up lesen
+# damit eine Zeile statt COUNT(*)/MAX() über das ganze Archiv.
+#
+#   python -m app.conv_stats              # Tabelle anzeigen + gegen messages prüfen
+#   python -m app.conv_stats --rebuild    # komplett neu berechnen
+#
+# Schlüssel: COALESCE(conv_id, '') wie bei conversation_summaries.
+# Zeitstempel = messages.ts_epoch (Wanduhrzeit in Sekunden, NULL wird ignoriert).
+from __future__ import annotations
+import argparse, sqlite3, time
+from dataclasses import dataclass
+from typing import Optional
+
+STATS_DDL = """
+    CREATE TABLE IF NOT EXISTS conversation_stats (
+        conv_id TEXT PRIMARY KEY,          -- '' = ohne Dialogschlüssel
+        in_count INTEGER NOT NULL DEFAULT 0,
+        out_count INTEGER NOT NULL DEFAULT 0,
+        first_in_ts INTEGER,
+        last_in_ts INTEGER,
+        first_out_ts INTEGER,
+        last_out_ts INTEGER,
+        last_message_id INTEGER,
+        updated_at TEXT
+    )
+"""
+
+# Neue Zeile dazu: Zähler +1, Grenzen per MIN/MAX (COALESCE, damit NULL nicht gewinnt)
+_ADD = """
+    INSERT INTO conversation_stats(conv_id, in_count, out_count, first_in_ts, last_in_ts,
+                                   first_out_ts, last_out_ts, last_message_id, updated_at)
+    VALUES (COALESCE(new.conv_id, ''), new.direction = 'in', new.direction = 'out',
+            CASE WHEN new.direction = 'in'  THEN new.ts_epoch END,
+            CASE WHEN new.direction = 'in'  THEN new.ts_epoch END,
+            CASE WHEN new.direction = 'out' THEN new.ts_epoch END,
+            CASE WHEN new.direction = 'out' THEN new.ts_epoch END,
+            new.id, datetime('now'))
+    ON CONFLICT(conv_id) DO UPDATE SET
+        in_count     = in_count  + excluded.in_count,
+        out_count    = out_count + excluded.out_count,
+        first_in_ts  = MIN(COALESCE(first_in_ts,  excluded.first_in_ts),  COALESCE(excluded.first_in_ts,  first_in_ts)),
+        last_in_ts   = MAX(COALESCE(last_in_ts,   excluded.last_in_ts),   COALESCE(excluded.last_in_ts,   last_in_ts)),
+        first_out_ts = MIN(COALESCE(first_out_ts, excluded.first_out_ts), COALESCE(excluded.first_out_ts, first_out_ts)),
+        last_out_ts  = MAX(COALESCE(last_out_ts,  excluded.last_out_ts),  COALESCE(excluded.last_out_ts,  last_out_ts)),
+        last_message_id = MAX(COALESCE(last_message_id, 0), excluded.last_message_id),
+        updated_at   = excluded.updated_at;
+"""
+
+# Alte Zeile weg: Zähler -1. Grenzen nur dann neu suchen, wenn genau diese Zeile die
+# Grenze war – dann ist es ein einzelner Indexzugriff (conv_id, direction, ts_epoch).
+def _bound(col: str, agg: str, direction: str) -> str:
+    return (f"{col} = CASE WHEN old.direction = '{direction}' AND old.ts_epoch = {col} "
+            f"THEN (SELECT {agg}(m.ts_epoch) FROM messages m "
+            f"WHERE m.conv_id IS old.conv_id AND m.direction = '{direction}') ELSE {col} END")
+
+_REMOVE = f"""
+    UPDATE conversation_stats SET
+        in_count  = in_count  - (old.direction = 'in'),
+        out_count = out_count - (old.direction = 'out'),
+        {_bound('first_in_ts', 'MIN', 'in')},
+        {_bound('last_in_ts', 'MAX', 'in')},
+        {_bound('first_out_ts', 'MIN', 'out')},
+        {_bound('last_out_ts', 'MAX', 'out')},
+        last_message_id = CASE WHEN old.id = last_message_id
+            THEN (SELECT MAX(m.id) FROM messages m WHERE m.conv_id IS old.conv_id) ELSE last_message_id END,
+        updated_at = datetime('now')
+    WHERE conv_id = COALESCE(old.conv_id, '');
+    DELETE FROM conversation_stats
+    WHERE conv_id = COALESCE(old.conv_id, '') AND in_count + out_count <= 0;
+"""
+
+STATS_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS conversation_stats_ai AFTER INSERT ON messages BEGIN {_ADD} END",
+    f"CREATE TRIGGER IF NOT EXISTS conversation_stats_ad AFTER DELETE ON messages BEGIN {_REMOVE} END",
+    f"""CREATE TRIGGER IF NOT EXISTS conversation_stats_au AFTER UPDATE OF conv_id, direction, ts_epoch ON messages
+        WHEN old.conv_id IS NOT new.conv_id OR old.direction IS NOT new.direction
+          OR old.ts_epoch IS NOT new.ts_epoch
+        BEGIN {_REMOVE} {_ADD} END""",
+]
+
+REBUILD_SQL = """
+    INSERT INTO conversation_stats(conv_id, in_count, out_count, first_in_ts, last_in_ts,
+                                   first_out_ts, last_out_ts, last_message_id, updated_at)
+    SELECT COALESCE(conv_id, ''),
+           SUM(direction = 'in'), SUM(direction = 'out'),
+           MIN(CASE WHEN direction = 'in'  THEN ts_epoch END),
+           MAX(CASE WHEN direction = 'in'  THEN ts_epoch END),
+           MIN(CASE WHEN direction = 'out' THEN ts_epoch END),
+           MAX(CASE WHEN direction = 'out' THEN ts_epoch END),
+           MAX(id), datetime('now')
+    FROM messages
+    GROUP BY COALESCE(conv_id, '')
+"""
+
+_COLS = "in_count, out_count, first_in_ts, last_in_ts, first_out_ts, last_out_ts, last_message_id"
+
+# -------------------------------------------------------
+# Schema
+# -------------------------------------------------------
+def ensure_stats(con: sqlite3.Connection) -> bool:
+    """Tabelle + Trigger anlegen. Beim ersten Mal wird der Bestand berechnet (True)."""
+    existed = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='conversation_stats'"
+    ).fetchone() is not None
+    con.execute(STATS_DDL)
+    for stmt in STATS_TRIGGERS:
+        con.execute(stmt)
+    if not existed:
+        con.execute(REBUILD_SQL)
+    con.commit()
+    return not existed
+
+def rebuild_stats(con: sqlite3.Connection) -> int:
+    """Alles aus 'messages' neu berechnen. Rückgabe: Anzahl Unterhaltungen."""
+    con.execute("DELETE FROM conversation_stats")
+    con.execute(REBUILD_SQL)
+    con.commit()
+    return con.execute("SELECT COUNT(*) FROM conversation_stats").fetchone()[0]
+
+def check_stats(con: sqlite3.Connection) -> int:
+    """Vergleicht die Tabelle mit einer frischen Berechnung. Rückgabe: abweichende Unterhaltungen."""
+    fresh = REBUILD_SQL.split("SELECT", 1)[1]
+    rows = con.execute(f"""
+        WITH fresh(conv_id, {_COLS}, updated_at) AS (SELECT {fresh})
+        SELECT (SELECT COUNT(*) FROM (SELECT conv_id, {_COLS} FROM fresh
+                                      EXCEPT SELECT conv_id, {_COLS} FROM conversation_stats))
+             + (SELECT COUNT(*) FROM (SELECT conv_id, {_COLS} FROM conversation_stats
+                                      EXCEPT SELECT conv_id, {_COLS} FROM fresh))
+    """).fetchone()
+    return rows[0]
+
+# -------------------------------------------------------
+# Lesen
+# -------------------------------------------------------
+@dataclass(frozen=True)
+class ConvStats:
+    in_count: int = 0
+    out_count: int = 0
+    first_in_ts: Optional[int] = None
+    last_in_ts: Optional[int] = None
+    first_out_ts: Optional[int] = None
+    last_out_ts: Optional[int] = None
+    last_message_id: Optional[int] = None
+
+    @property
+    def total(self) -> int:
+        return self.in_count + self.out_count
+
+    @property
+    def awaiting_reply(self) -> bool:
+        """Unsere letzte Nachricht ist jünger als die letzte des Gegenübers."""
+        return self.last_out_ts is not None and (self.last_in_ts is None or self.last_out_ts > self.last_in_ts)
+
+def get_stats(con: sqlite3.Connection, conv_id: Optional[str]) -> ConvStats:
+    row = con.execute(
+        f"SELECT {_COLS} FROM conversation_stats WHERE conv_id=?", (conv_id or "",)
+    ).fetchone()
+    return ConvStats(*row) if row else ConvStats()
+
+def totals(con: sqlite3.Connection) -> ConvStats:
+    """Über alle Unterhaltungen (eine Zeile je Unterhaltung, nicht je Nachricht)."""
+    row = con.execute("""
+        SELECT IFNULL(SUM(in_count), 0), IFNULL(SUM(out_count), 0),
+               MIN(first_in_ts), MAX(last_in_ts), MIN(first_out_ts), MAX(last_out_ts), MAX(last_message_id)
+        FROM conversation_stats
+    """).fetchone()
+    return ConvStats(*row)
+
+def main():
+    from .db import DB_PATH, connect_migrated
+    from .normalize import epoch_to_iso
+    ap = argparse.ArgumentParser(description="Kennzahlen je Unterhaltung anzeigen bzw. neu berechnen.")
+    ap.add_argument("--rebuild", action="store_true", help="Tabelle komplett aus 'messages' neu berechnen")
+    args = ap.parse_args()
+
+    con = connect_migrated()
+    try:
+        if args.rebuild:
+            t0 = time.perf_counter()
+            n = rebuild_stats(con)
+            print(f"✅ {n} Unterhaltung(en) in {(time.perf_counter() - t0) * 1000:.0f} ms neu berechnet ({DB_PATH}).")
+        for conv_id, *vals in con.execute(f"SELECT conv_id, {_COLS} FROM conversation_stats ORDER BY conv_id"):
+            s = ConvStats(*vals)
+            print(f"[{conv_id or '-'}] ein={s.in_count} aus={s.out_count}  "
+                  f"zuletzt ein={epoch_to_iso(s.last_in_ts) or '-'} aus={epoch_to_iso(s.last_out_ts) or '-'}  "
+                  f"letzte id={s.last_message_id}")
+        bad = check_stats(con)
+        if bad:
+            print(f"⚠️  {bad} Abweichung(en) gegenüber 'messages' – bitte mit --rebuild neu berechnen.")
+        else:
+            print("✅ Stimmt mit 'messages' überein.")
+    finally:
+        con.close()
+
+if __name__ == "__main__":
+    main()
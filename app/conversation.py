@@ -0,0 +1,100 @@
+# app/conversation.py
+# Wer ist das Gegenüber? Stabiler Schlüssel der offenen Unterhaltung aus URL bzw. DOM.
+#
+# Reihenfolge (erster Treffer gewinnt):
+#   1. data-*-Attribut am Chat (data-conversation-id, data-dialog-id, …)
+#   2. Kennung in der URL (Pfad /chat/123 bzw. ?dialog=123)
+#   3. Profil-Link im Chat-Kopf (/profile/123)
+#   4. angezeigter Name des Gegenübers
+# Nichts gefunden -> conv_id None (in der DB: NULL), wie bisher.
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# Die Selektoren decken die üblichen Varianten ab; was die Seite nicht hat, bleibt einfach leer.
+JS_CONV_IDENTITY = """() => {
+  const attrs = ['data-conversation-id', 'data-dialog-id', 'data-chat-id', 'data-user-id', 'data-profile-id'];
+  const scope = document.querySelector('.messages-container');
+  let domId = null;
+  for (const a of attrs) {
+    const el = (scope && scope.closest('[' + a + ']')) || document.querySelector('[' + a + ']');
+    const v = el ? (el.getAttribute(a) || '').trim() : '';
+    if (v) { domId = a.replace(/^data-/, '').replace(/-id$/, '') + ':' + v; break; }
+  }
+  const heads = ['.chat-header', '.messages-header', '.conversation-header'];
+  const nameEl = document.querySelector(
+    heads.flatMap(h => [h + ' .name', h + ' .username']).concat(['.chat-user-name', '.profile-name']).join(', '));
+  const link = document.querySelector(
+    heads.flatMap(h => [h + ' a[href*="/profile"]', h + ' a[href*="/user"]']).join(', '));
+  return {
+    url: location.href,
+    domId,
+    peerName: nameEl ? (nameEl.innerText || '').trim() || null : null,
+    profileHref: link ? link.getAttribute('href') : null,
+  };
+}"""
+
+RE_URL_QUERY = re.compile(
+    r"[?&#](?:conversation|dialog|chat|user|profile)(?:_?id)?=([A-Za-z0-9_-]+)", re.IGNORECASE
+)
+RE_URL_PATH  = re.compile(
+    r"/(?:conversations?|dialogs?|chats?|messages|users?|profiles?)/(\d[A-Za-z0-9_-]*)", re.IGNORECASE
+)
+MAX_NAME_CHARS = 60
+
+@dataclass(frozen=True)
+class ConvIdentity:
+    conv_id: Optional[str]       # None = unbekannt
+    peer_name: Optional[str]
+    source: str                  # 'dom' | 'url' | 'profile' | 'name' | 'none'
+
+UNKNOWN = ConvIdentity(None, None, "none")
+
+def id_from_url(url: Optional[str]) -> Optional[str]:
+    """'…/chat/screen?dialog=4711' -> '4711' (Query vor Pfad), sonst None."""
+    if not url:
+        return None
+    m = RE_URL_QUERY.search(url) or RE_URL_PATH.search(url)
+    return m.group(1) if m else None
+
+def clean_name(name: Optional[str]) -> Optional[str]:
+    name = " ".join((name or "").split())[:MAX_NAME_CHARS]
+    return name or None
+
+def resolve_identity(info: Optional[Dict[str, Any]]) -> ConvIdentity:
+    """Ergebnis von JS_CONV_IDENTITY -> ConvIdentity (reine Funktion, ohne Browser prüfbar)."""
+    if not info:
+        return UNKNOWN
+    peer = clean_name(info.get("peerName"))
+    if info.get("domId"):
+        return ConvIdentity(str(info["domId"]), peer, "dom")
+    url_id = id_from_url(info.get("url"))
+    if url_id:
+        return ConvIdentity(f"url:{url_id}", peer, "url")
+    href_id = id_from_url(info.get("profileHref"))
+    if href_id:
+        return ConvIdentity(f"profile:{href_id}", peer, "profile")
+    if peer:
+        return ConvIdentity(f"name:{peer.lower()}", peer, "name")
+    return UNKNOWN
+
+def identify(page) -> ConvIdentity:
+    """Liest die Kennung der offenen Unterhaltung. Fehler im Skript -> unbekannt."""
+    try:
+        return resolve_identity(page.evaluate(JS_CONV_IDENTITY))
+    except Exception:
+        return UNKNOWN
+
+# Kurzer Check ohne Browser: python -m app.conversation
+if __name__ == "__main__":
+    samples = [
+        {"url": "https://viluu.de/mod99/chat/screen"},
+        {"url": "https://viluu.de/mod99/chat/screen?dialog=4711", "peerName": "  Sven  "},
+        {"url": "https://viluu.de/mod99/chat/12345/screen"},
+        {"url": "https://viluu.de/mod99/chat/screen", "domId": "conversation:abc-9", "peerName": "Sven"},
+        {"url": "https://viluu.de/mod99/chat/screen", "profileHref": "/profile/777"},
+        {"url": "https://viluu.de/mod99/chat/screen", "peerName": "Sven_HH"},
+    ]
+    for s in samples:
+        print(f"{str(s):110} -> {resolve_identity(s)}")
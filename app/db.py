@@ -0,0 +1,27 @@
+# app/db.py
+# Der EINE Ort für Datenbank-Pfad und Verbindung.
+# Das Schema kommt ausschließlich aus app/migrations.py (PRAGMA user_version).
+from __future__ import annotations
+import os, sqlite3
+from typing import Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH  = os.getenv("CHAT_DB_PATH") or os.path.join(BASE_DIR, "chat_brain.sqlite")
+
+# Früher lagen Regeln/Vorlagen/Lexikon in einer zweiten, cwd-relativen DB.
+# Sie wird nur noch einmalig von der Migration übernommen.
+LEGACY_CONTENT_DB = os.path.join(BASE_DIR, "data", "chat_brain.sqlite")
+
+def connect(path: Optional[str] = None, rows: bool = False) -> sqlite3.Connection:
+    con = sqlite3.connect(path or DB_PATH)
+    con.execute("PRAGMA foreign_keys = ON;")
+    if rows:
+        con.row_factory = sqlite3.Row
+    return con
+
+def connect_migrated(path: Optional[str] = None, rows: bool = False) -> sqlite3.Connection:
+    """Verbindung + Schema auf Stand bringen (aktuell: nur ein PRAGMA-Lesezugriff)."""
+    from .migrations import migrate
+    con = connect(path, rows)
+    migrate(con)
+    return con
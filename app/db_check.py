@@ -1,15 +1,14 @@
 # app/db_check.py
 from __future__ import annotations
 import os, sqlite3, textwrap
-from datetime import datetime
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DB_PATH  = os.path.join(BASE_DIR, "chat_brain.sqlite")
+from .conv_stats import totals
+from .db import DB_PATH, connect_migrated
+from .normalize import epoch_to_iso
+
 
 def connect():
-    con = sqlite3.connect(DB_PATH)
-    con.row_factory = sqlite3.Row
-    return con
+    return connect_migrated(rows=True)
 
 def fmt(s: str | None, n: int = 100) -> str:
     if not s:
@@ -33,41 +32,22 @@ def main():
     con = connect()
     cur = con.cursor()
 
-    # 1) Kurze Übersicht
+    # 1) Kurze Übersicht (aus conversation_stats: eine Zeile je Unterhaltung)
     show_header("ÜBERSICHT")
-    cur.execute("SELECT COUNT(*) FROM messages")
-    total = cur.fetchone()[0]
-    cur.execute("SELECT COUNT(*) FROM messages WHERE direction='in'")
-    cnt_in = cur.fetchone()[0]
-    cur.execute("SELECT COUNT(*) FROM messages WHERE direction='out'")
-    cnt_out = cur.fetchone()[0]
-    safe_print(f"Nachrichten gesamt : {total}")
-    safe_print(f"  eingehend (in)   : {cnt_in}")
-    safe_print(f"  ausgehend (out)  : {cnt_out}")
+    stats = totals(con)
+    safe_print(f"Nachrichten gesamt : {stats.total}")
+    safe_print(f"  eingehend (in)   : {stats.in_count}")
+    safe_print(f"  ausgehend (out)  : {stats.out_count}")
 
     # 2) Letzte eingehende + ausgehende Zeitstempel
-    cur.execute("SELECT ts, raw_ts FROM messages WHERE direction='in'  AND ts IS NOT NULL ORDER BY ts DESC LIMIT 1")
-    last_in  = cur.fetchone()
-    cur.execute("SELECT ts, raw_ts FROM messages WHERE direction='out' AND ts IS NOT NULL ORDER BY ts DESC LIMIT 1")
-    last_out = cur.fetchone()
-
-    def parse_iso(row):
-        if not row or not row["ts"]:
-            return None
-        try:
-            return datetime.strptime(row["ts"], "%Y-%m-%d %H:%M:%S")
-        except Exception:
-            return None
-
-    tin  = parse_iso(last_in)
-    tout = parse_iso(last_out)
+    tin, tout = stats.last_in_ts, stats.last_out_ts
 
     safe_print("\nLetzte Zeitstempel:")
-    safe_print(f"  Eingehend : {last_in['raw_ts'] if last_in else '-'}  → {last_in['ts'] if last_in else '-'}")
-    safe_print(f"  Ausgehend : {last_out['raw_ts'] if last_out else '-'} → {last_out['ts'] if last_out else '-'}")
+    safe_print(f"  Eingehend : {epoch_to_iso(tin) or '-'}")
+    safe_print(f"  Ausgehend : {epoch_to_iso(tout) or '-'}")
 
     if tin and tout:
-        gap_h = abs((tin - tout).total_seconds()) / 3600.0
+        gap_h = abs(tin - tout) / 3600.0
         safe_print(f"  Lücke     : {gap_h:.1f} Stunden")
 
     # 3) Letzte 10 Nachrichten (neueste zuerst)
@@ -75,7 +55,7 @@ def main():
     cur.execute("""
         SELECT id, direction, ts, raw_ts, text
         FROM messages
-        ORDER BY COALESCE(ts, created_at) DESC
+        ORDER BY sort_ts DESC, id DESC
         LIMIT 10
     """)
     rows = cur.fetchall()
@@ -90,20 +70,19 @@ def main():
 
     # 4) Profile + Dialog-Infos
     show_header("PROFILE")
-    cur.execute("SELECT id, side, IFNULL(name,'') AS name, IFNULL(city,'') AS city, IFNULL(relationship_status,'') AS rs, IFNULL(job,'') AS job, IFNULL(updated_at,'') AS up FROM profiles ORDER BY side")
+    cur.execute("SELECT id, side, conv_id, IFNULL(name,'') AS name, IFNULL(city,'') AS city, IFNULL(status,'') AS rs, IFNULL(job,'') AS job, IFNULL(updated_at,'') AS up FROM profiles ORDER BY side, conv_id")
     profs = cur.fetchall()
     if not profs:
         safe_print("(noch keine Profileinträge)")
     else:
         for p in profs:
-            safe_print(f"- side={p['side']} id={p['id']}  name='{p['name']}'  city='{p['city']}'  status='{p['rs']}'  job='{p['job']}'  updated={p['up']}")
+            safe_print(f"- side={p['side']} id={p['id']}  [{p['conv_id'] or '-'}]  name='{p['name']}'  city='{p['city']}'  status='{p['rs']}'  job='{p['job']}'  updated={p['up']}")
 
     show_header("DIALOG-INFO")
     cur.execute("""
-        SELECT d.profile_id, p.side, d.key, d.value, d.updated_at
-        FROM dialog_info d
-        LEFT JOIN profiles p ON p.id = d.profile_id
-        ORDER BY d.updated_at DESC
+        SELECT conv_id, key, value, occurrences, last_seen
+        FROM dialog_info
+        ORDER BY last_seen DESC
         LIMIT 20
     """)
     infos = cur.fetchall()
@@ -111,7 +90,7 @@ def main():
         safe_print("(noch keine Dialog-Infos)")
     else:
         for i in infos:
-            safe_print(f"[{i['side'] or '?'}] {i['key']} → {i['value']} (zu Profil {i['profile_id']}, {i['updated_at']})")
+            safe_print(f"[{i['conv_id'] or '-'}] {i['key']} → {i['value']} ({i['occurrences']}x, zuletzt {i['last_seen']})")
 
     con.close()
     safe_print("\n✅ Fertig.")
@@ -1,9 +1,10 @@
 # app/db_migrate.py
+# Spalten-Abgleich für Alt-DBs (Migration 2 in app/migrations.py) + Übersicht.
 from __future__ import annotations
-import os, sqlite3
+import sqlite3
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DB_PATH  = os.path.join(BASE_DIR, "chat_brain.sqlite")
+from .db import DB_PATH, connect
+from .migrations import migrate, current_version
 
 NEEDED_PROFILE_COLS = {
     "name": "TEXT",
@@ -12,15 +13,10 @@ NEEDED_PROFILE_COLS = {
     "job": "TEXT",
     "gender": "TEXT",
     "updated_at": "TEXT",
+    "conv_id": "TEXT NOT NULL DEFAULT ''",   # peer-Profil je Unterhaltung, '' = ohne Schlüssel
 }
-# Manche Alt-DBs haben z. B. relationship_status / birthday – die lassen wir einfach stehen.
-
-NEEDED_DIALOG_INFO_COLS = {
-    "key": "TEXT",
-    "value": "TEXT",
-    "confidence": "REAL",
-    "created_at": "TEXT",
-}
+# Alt-DBs haben statt status noch relationship_status – der Wert wird übernommen,
+# die alte Spalte bleibt stehen (z. B. birthday lassen wir ebenfalls in Ruhe).
 
 def has_table(con: sqlite3.Connection, name: str) -> bool:
     cur = con.execute(
@@ -34,62 +30,29 @@ def table_cols(con: sqlite3.Connection, name: str) -> set[str]:
     return {row[1] for row in cur.fetchall()}  # row[1] = Spaltenname
 
 def ensure_profiles(con: sqlite3.Connection):
-    if not has_table(con, "profiles"):
-        con.execute("""
-        CREATE TABLE profiles (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            side TEXT,         -- 'me' oder 'peer'
-            name TEXT,
-            city TEXT,
-            status TEXT,
-            job TEXT,
-            gender TEXT,
-            updated_at TEXT
-        )
-        """)
-        print("🆕 Tabelle 'profiles' neu erstellt.")
-        return
-
     existing = table_cols(con, "profiles")
     for col, ctype in NEEDED_PROFILE_COLS.items():
         if col not in existing:
             con.execute(f"ALTER TABLE profiles ADD COLUMN {col} {ctype}")
             print(f"🔧 Spalte hinzugefügt: profiles.{col} ({ctype})")
-
-def ensure_dialog_info(con: sqlite3.Connection):
-    if not has_table(con, "dialog_info"):
-        con.execute("""
-        CREATE TABLE dialog_info (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            key TEXT,
-            value TEXT,
-            confidence REAL,
-            created_at TEXT
+    if "relationship_status" in existing:
+        con.execute(
+            "UPDATE profiles SET status = relationship_status "
+            "WHERE (status IS NULL OR status = '') AND relationship_status IS NOT NULL"
         )
-        """)
-        print("🆕 Tabelle 'dialog_info' neu erstellt.")
-        return
-
-    existing = table_cols(con, "dialog_info")
-    for col, ctype in NEEDED_DIALOG_INFO_COLS.items():
-        if col not in existing:
-            con.execute(f"ALTER TABLE dialog_info ADD COLUMN {col} {ctype}")
-            print(f"🔧 Spalte hinzugefügt: dialog_info.{col} ({ctype})")
 
 def main():
     print(f"🔗 DB: {DB_PATH}")
-    con = sqlite3.connect(DB_PATH)
+    con = connect()
     try:
-        ensure_profiles(con)
-        ensure_dialog_info(con)
-        con.commit()
+        n = migrate(con)
 
         # Übersicht
         prof_cols = ", ".join(sorted(table_cols(con, "profiles")))
         di_cols   = ", ".join(sorted(table_cols(con, "dialog_info")))
         print("📋 profiles-Spalten:", prof_cols)
         print("📋 dialog_info-Spalten:", di_cols)
-        print("✅ Migration fertig.")
+        print(f"✅ Migration fertig (Schema-Version {current_version(con)}, {n} Schritt(e) angewendet).")
     finally:
         con.close()
 
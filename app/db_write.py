@@ -1,85 +1,303 @@
 # app/db_write.py
 from __future__ import annotations
-import os, re, json, glob
+import os, json, glob, time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import sqlite3
-from typing import List, Dict, Any, Tuple, Union
+from typing import Iterator, List, Dict, Any, Optional, Tuple, Union
+
+from .db import BASE_DIR, DB_PATH, connect_migrated
+from .normalize import MessageRecord, clean_text, epoch_to_iso, msg_key, normalize_cards, parse_ts, parse_ts_iso
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DB_PATH   = os.path.join(BASE_DIR, "chat_brain.sqlite")
 LOG_DIR   = os.path.join(BASE_DIR, "logs")
 
+IMPORT_CHUNK   = 5000   # Nachrichten pro Transaktion beim Import
+PARALLEL_FROM  = 8      # ab so vielen neuen Dateien in mehreren Prozessen parsen
+
 # ---------- helpers ----------
 
 def connect() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
-
-def parse_ts(raw_ts: str) -> str | None:
-    if not raw_ts:
-        return None
-    m = re.search(r'(\d{1,2}):(\d{2})\s+(\d{1,2})/(\d{1,2})/(\d{4})', raw_ts)
-    if not m:
-        return None
-    hh, mm, dd, mo, yy = map(int, m.groups())
-    try:
-        dt = datetime(yy, mo, dd, hh, mm, 0)
-        return dt.strftime("%Y-%m-%d %H:%M:%S")
-    except ValueError:
-        return None
+    return connect_migrated()
+
+def history_files() -> List[str]:
+    return sorted(glob.glob(os.path.join(LOG_DIR, "history_*.json")))
 
 def latest_history_json() -> str | None:
-    files = sorted(glob.glob(os.path.join(LOG_DIR, "history_*.json")))
+    files = history_files()
     return files[-1] if files else None
 
 # ---------- Profile ----------
 
-def upsert_profile(conn: sqlite3.Connection, side: str, **fields) -> int:
-    row = conn.execute("SELECT id FROM profiles WHERE side=?", (side,)).fetchone()
+def upsert_profile(conn: sqlite3.Connection, side: str, conv_id: str | None = None, **fields) -> int:
+    # 'me' gilt für alle Unterhaltungen, 'peer' gibt es je Unterhaltung ('' = ohne Schlüssel)
+    key = conv_id or ""
+    row = conn.execute("SELECT id FROM profiles WHERE side=? AND conv_id=?", (side, key)).fetchone()
     now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
     if row:
         return row[0]
-    cur = conn.execute("INSERT INTO profiles(side, updated_at) VALUES (?,?)", (side, now))
+    cur = conn.execute("INSERT INTO profiles(side, conv_id, updated_at) VALUES (?,?,?)", (side, key, now))
     return cur.lastrowid
 
 # ---------- Messages speichern ----------
 
-def save_message(conn: sqlite3.Connection,
-                 direction: str, text: str, raw_ts: str | None,
-                 peer_name: str | None = None, conv_id: str | None = None):
-    iso_ts = parse_ts(raw_ts) if raw_ts else None
-    now    = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+def ensure_import_schema(conn: sqlite3.Connection):
+    """msg_key-Spalte (eindeutig) + Manifest der bereits eingelesenen Dateien."""
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(messages)")}
+    if "msg_key" not in cols:
+        conn.execute("ALTER TABLE messages ADD COLUMN msg_key TEXT")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS import_manifest (
+            path TEXT PRIMARY KEY,        -- Dateiname in logs/
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            messages INTEGER NOT NULL,    -- Nachrichten in der Datei
+            inserted INTEGER NOT NULL,    -- davon neu in die DB
+            imported_at TEXT
+        )
+    """)
+    ensure_time_columns(conn)   # vorher: ts einheitlich, sonst passen die Schlüssel nicht
+    backfill_msg_keys(conn)
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_messages_msg_key ON messages(msg_key)")
+    conn.commit()
+
+# Zeitachse: ts_epoch (Ganzzahl, Wanduhrzeit) + sort_ts (generiert, nie NULL)
+# created_at ist echte UTC; created_epoch ist derselbe Zeitpunkt als Wanduhr-Sekunden wie ts_epoch,
+# sonst wären Zeilen ohne Stempel um den UTC-Versatz verschoben. Das Umrechnen ('localtime')
+# ist in einer generierten Spalte nicht erlaubt – daher gespeichert, per Trigger beim Einfügen.
+CREATED_EPOCH_SQL = "CAST(strftime('%s', {col}, 'localtime') AS INTEGER)"
+CREATED_EPOCH_TRIGGER = f"""
+    CREATE TRIGGER IF NOT EXISTS messages_created_epoch_ai AFTER INSERT ON messages
+    WHEN new.created_epoch IS NULL BEGIN
+        UPDATE messages SET created_epoch = {CREATED_EPOCH_SQL.format(col="COALESCE(new.created_at, 'now')")}
+        WHERE id = new.id;
+    END
+"""
+TIME_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_messages_conv_ts     ON messages(conv_id, ts_epoch)",
+    "CREATE INDEX IF NOT EXISTS idx_messages_conv_dir_ts ON messages(conv_id, direction, ts_epoch)",
+    "CREATE INDEX IF NOT EXISTS idx_messages_dir_ts      ON messages(direction, ts_epoch)",
+    "CREATE INDEX IF NOT EXISTS idx_messages_sort        ON messages(sort_ts)",
+    # ersetzt durch die Indizes oben (ts-Text und direction allein fragt niemand mehr ab)
+    "DROP INDEX IF EXISTS idx_messages_ts",
+    "DROP INDEX IF EXISTS idx_messages_dir",
+]
+
+def ensure_time_columns(conn: sqlite3.Connection) -> int:
+    """
+    Legt ts_epoch/created_epoch/sort_ts + Indizes an und trägt ts_epoch für alte Zeilen nach
+    (aus ts, sonst aus raw_ts bzw. dem Stempel am Textende). Rückgabe: nachgetragene Zeilen.
+    """
+    cols = {r[1] for r in conn.execute("PRAGMA table_xinfo(messages)")}
+    if "ts_epoch" not in cols:
+        conn.execute("ALTER TABLE messages ADD COLUMN ts_epoch INTEGER")
+    if "created_epoch" not in cols:
+        conn.execute("ALTER TABLE messages ADD COLUMN created_epoch INTEGER")
+        conn.execute(f"UPDATE messages SET created_epoch = {CREATED_EPOCH_SQL.format(col='created_at')} "
+                     "WHERE created_at IS NOT NULL")
+        if "sort_ts" in cols:   # alte Form fiel auf created_at in UTC zurück -> neu anlegen
+            conn.execute("DROP INDEX IF EXISTS idx_messages_sort")
+            conn.execute("ALTER TABLE messages DROP COLUMN sort_ts")
+            cols.discard("sort_ts")
+    conn.execute(CREATED_EPOCH_TRIGGER)
+    if "sort_ts" not in cols:
+        # ohne Stempel zählt der Speicherzeitpunkt – so ist die Reihenfolge immer definiert
+        conn.execute(
+            "ALTER TABLE messages ADD COLUMN sort_ts INTEGER GENERATED ALWAYS AS "
+            "(COALESCE(ts_epoch, created_epoch)) VIRTUAL"
+        )
+
+    # ts vereinheitlichen ('2025-08-23T17:22:00' -> '2025-08-23 17:22:00') und umrechnen
     conn.execute(
-        "INSERT INTO messages(conv_id, direction, text, ts, raw_ts, peer_name, created_at) "
-        "VALUES (?,?,?,?,?,?,?)",
-        (conv_id, direction, text, iso_ts, raw_ts, peer_name, now)
+        "UPDATE messages SET ts = strftime('%Y-%m-%d %H:%M:%S', ts) "
+        "WHERE ts_epoch IS NULL AND ts LIKE '____-__-__T%'"
     )
+    done = conn.execute(
+        "UPDATE messages SET ts_epoch = CAST(strftime('%s', ts) AS INTEGER) "
+        "WHERE ts_epoch IS NULL AND ts IS NOT NULL AND strftime('%s', ts) IS NOT NULL"
+    ).rowcount
 
-def bulk_save_from_history(conn: sqlite3.Connection, history: Union[Dict[str, Any], List[Any]], conv_id: str | None = None) -> int:
+    updates = []
+    for mid, raw_ts, text in conn.execute(
+        "SELECT id, raw_ts, text FROM messages WHERE ts_epoch IS NULL AND ts IS NULL"
+    ):
+        epoch = parse_ts(raw_ts) or parse_ts((text or "").rsplit("\n", 1)[-1])
+        if epoch is not None:
+            updates.append((epoch, epoch_to_iso(epoch), mid))
+    conn.executemany("UPDATE messages SET ts_epoch=?, ts=? WHERE id=?", updates)
+
+    for stmt in TIME_INDEXES:
+        conn.execute(stmt)
+    conn.commit()
+    return done + len(updates)
+
+# ---------- Lesen über die Zeit-Indizes ----------
+
+def recent_messages(conn: sqlite3.Connection, conv_id: str | None, limit: int = 10) -> List[tuple]:
+    """Letzte N Nachrichten einer Unterhaltung (neueste zuerst) – über idx_messages_conv_ts."""
+    return conn.execute(
+        "SELECT id, direction, text, ts_epoch, raw_ts FROM messages WHERE conv_id IS ? "
+        "ORDER BY ts_epoch DESC, id DESC LIMIT ?", (conv_id, limit)
+    ).fetchall()
+
+def backfill_msg_keys(conn: sqlite3.Connection) -> int:
+    """Schlüssel für Zeilen ohne msg_key nachtragen (z.B. vom Live-Bot). Doppelte bleiben NULL."""
+    rows = conn.execute(
+        "SELECT id, direction, text, ts, raw_ts FROM messages WHERE msg_key IS NULL ORDER BY id"
+    ).fetchall()
+    if not rows:
+        return 0
+    taken = {r[0] for r in conn.execute("SELECT msg_key FROM messages WHERE msg_key IS NOT NULL")}
+    updates = []
+    for mid, direction, text, ts, raw_ts in rows:
+        if not ts:   # Stempel aus raw_ts bzw. der letzten Textzeile
+            ts = parse_ts_iso(raw_ts) or parse_ts_iso((text or "").rsplit("\n", 1)[-1])
+        key = msg_key(direction, clean_text(text, stamp_missing=not raw_ts), ts)
+        if key in taken:
+            continue
+        taken.add(key)
+        updates.append((key, mid))
+    conn.executemany("UPDATE messages SET msg_key=? WHERE id=?", updates)
+    return len(updates)
+
+INSERT_MESSAGE = (
+    "INSERT OR IGNORE INTO messages(conv_id, direction, text, ts, ts_epoch, raw_ts, peer_name, created_at, msg_key) "
+    "VALUES (?,?,?,?,?,?,?,?,?)"
+)
+# Ohne Unterhaltung (Snapshots, unbekannter Chat): nichts einfügen, was schon einer
+# Unterhaltung zugeordnet ist – dort steht es unter einem anderen msg_key (Index direction, ts_epoch).
+INSERT_UNASSIGNED = (
+    "INSERT OR IGNORE INTO messages(conv_id, direction, text, ts, ts_epoch, raw_ts, peer_name, created_at, msg_key) "
+    "SELECT ?1,?2,?3,?4,?5,?6,?7,?8,?9 WHERE NOT EXISTS ("
+    "SELECT 1 FROM messages WHERE direction=?2 AND ts_epoch IS ?5 AND text=?3 AND conv_id IS NOT NULL)"
+)
+
+def save_records(conn: sqlite3.Connection, records: List[MessageRecord],
+                 conv_id: str | None = None, peer_name: str | None = None) -> int:
+    """
+    Gemeinsamer Schreibweg für Live-Bot und Einzel-Speichern. Rückgabe: neu eingefügte Zeilen.
+    Mit conv_id werden Nachrichten, die schon ohne Schlüssel (NULL) gespeichert wurden,
+    der Unterhaltung zugeordnet statt ein zweites Mal eingefügt.
+    """
+    if not records:
+        return 0
+    conv_id = conv_id or None   # '' = unbekannt = NULL
+    if conv_id:
+        conn.executemany(
+            "UPDATE OR IGNORE messages SET conv_id=?, msg_key=?, text=?, peer_name=COALESCE(peer_name, ?) "
+            "WHERE msg_key=? AND conv_id IS NULL",   # Alt-Zeilen tragen teils noch den Stempel im Text
+            [(conv_id, r.key_for(conv_id), r.text, peer_name, r.key) for r in records]
+        )
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    cur = conn.executemany(
+        INSERT_MESSAGE if conv_id else INSERT_UNASSIGNED,
+        [(conv_id, r.direction, r.text, r.ts_iso, r.ts_epoch, r.raw_ts, peer_name, now, r.key_for(conv_id))
+         for r in records]
+    )
+    return cur.rowcount   # ohne die Zeilen, die Trigger (FTS, conversation_stats) schreiben
+
+def save_message(conn: sqlite3.Connection,
+                 direction: str, text: str, raw_ts: str | None,
+                 peer_name: str | None = None, conv_id: str | None = None) -> bool:
+    """True = neu gespeichert, False = schon vorhanden (gleiche msg_key)."""
+    text = clean_text(text, stamp_missing=not raw_ts)
+    if not text:
+        return False
+    rec = MessageRecord(direction, text, parse_ts(raw_ts), raw_ts)
+    return save_records(conn, [rec], conv_id=conv_id, peer_name=peer_name) > 0
+
+def _history_messages(history: Union[Dict[str, Any], List[Any]]) -> List[Any]:
     """
     Akzeptiert:
       1) Dict mit "messages"
       2) direkte Liste von Nachrichten
     """
     if isinstance(history, list):
-        msgs = history
-    elif isinstance(history, dict) and "messages" in history:
-        msgs = history.get("messages") or []
-    else:
-        msgs = []
+        return history
+    if isinstance(history, dict) and "messages" in history:
+        return history.get("messages") or []
+    return []
+
+def bulk_save_from_history(conn: sqlite3.Connection, history: Union[Dict[str, Any], List[Any]], conv_id: str | None = None) -> int:
+    return save_records(conn, normalize_cards(_history_messages(history)), conv_id=conv_id)
 
-    count = 0
-    for m in msgs:
-        if not isinstance(m, dict):
+# ---------- Import aller Snapshots ----------
+
+Record = Tuple[str, str, str, Optional[str], Optional[int], Optional[str]]   # (msg_key, direction, text, ts, ts_epoch, raw_ts)
+
+def parse_snapshot(path: str) -> List[Record]:
+    """Eine history_*.json -> bereinigte Datensätze (läuft ggf. in einem Worker-Prozess)."""
+    return [(r.key, r.direction, r.text, r.ts_iso, r.ts_epoch, r.raw_ts)
+            for r in normalize_cards(_history_messages(load_json_file(path)))]
+
+def pending_files(conn: sqlite3.Connection, files: List[str]) -> List[str]:
+    """Nur Dateien, die neu sind oder sich seit dem letzten Import geändert haben."""
+    known = {r[0]: (r[1], r[2]) for r in conn.execute("SELECT path, size, mtime FROM import_manifest")}
+    todo = []
+    for path in files:
+        st = os.stat(path)
+        if known.get(os.path.basename(path)) != (st.st_size, st.st_mtime):
+            todo.append(path)
+    return todo
+
+def _chunks(records: List[Record], size: int) -> Iterator[List[Record]]:
+    for i in range(0, len(records), size):
+        yield records[i:i + size]
+
+def write_snapshot(conn: sqlite3.Connection, path: str, records: List[Record], seen: set) -> int:
+    """Schreibt eine Datei in Transaktionen zu je IMPORT_CHUNK Zeilen; Manifest mit der letzten."""
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    fresh = []
+    for rec in records:
+        if rec[0] in seen:   # schon in einem älteren Snapshot dieses Laufs
             continue
-        text    = (m.get("text") or "").strip()
-        raw_ts  = m.get("tsText") or None
-        is_mine = bool(m.get("isMine"))
-        direction = "out" if is_mine else "in"
-        save_message(conn, direction, text, raw_ts, peer_name=None, conv_id=conv_id)
-        count += 1
-    return count
+        seen.add(rec[0])
+        fresh.append(rec)
+
+    inserted = 0
+    for chunk in _chunks(fresh, IMPORT_CHUNK):
+        cur = conn.executemany(
+            INSERT_UNASSIGNED,
+            [(None, direction, text, ts, epoch, raw_ts, None, now, key)
+             for key, direction, text, ts, epoch, raw_ts in chunk]
+        )
+        inserted += cur.rowcount   # total_changes zählte auch Trigger-Zeilen mit
+        conn.commit()
+
+    st = os.stat(path)
+    conn.execute(
+        "INSERT OR REPLACE INTO import_manifest(path, size, mtime, messages, inserted, imported_at) "
+        "VALUES (?,?,?,?,?,?)",
+        (os.path.basename(path), st.st_size, st.st_mtime, len(records), inserted, now)
+    )
+    conn.commit()
+    return inserted
+
+def import_all(conn: sqlite3.Connection, files: List[str] | None = None,
+               workers: int | None = None) -> Tuple[int, int, int]:
+    """
+    Liest alle noch nicht importierten Snapshots (alt -> neu).
+    Rückgabe: (Dateien, Nachrichten gelesen, neu gespeichert).
+    """
+    ensure_import_schema(conn)
+    todo = pending_files(conn, history_files() if files is None else files)
+    if not todo:
+        return 0, 0, 0
+
+    workers = workers or os.cpu_count() or 1
+    seen: set = set()
+    read = inserted = 0
+    if workers > 1 and len(todo) >= PARALLEL_FROM:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # map() liefert in Dateireihenfolge -> ids bleiben chronologisch
+            for path, records in zip(todo, pool.map(parse_snapshot, todo, chunksize=4)):
+                read += len(records)
+                inserted += write_snapshot(conn, path, records, seen)
+    else:
+        for path in todo:
+            records = parse_snapshot(path)
+            read += len(records)
+            inserted += write_snapshot(conn, path, records, seen)
+    return len(todo), read, inserted
 
 # ---------- CLI ----------
 
@@ -89,23 +307,26 @@ def load_json_file(path: str) -> Union[Dict[str, Any], List[Any]]:
 
 def cli():
     print(f"🔗 DB: {DB_PATH}")
-    latest = latest_history_json()
-    if not latest:
+    files = history_files()
+    if not files:
         print("❌ Kein history_*.json in logs/ gefunden. Bitte zuerst bot_with_history laufen lassen.")
         return
-    print(f"📄 Neuste History-Datei: {latest}")
-
-    data = load_json_file(latest)
+    print(f"📄 {len(files)} History-Dateien in {LOG_DIR}")
 
     conn = connect()
     try:
         me_id   = upsert_profile(conn, "me")
         peer_id = upsert_profile(conn, "peer")
 
-        n = bulk_save_from_history(conn, data, conv_id=None)
-        conn.commit()
-        print(f"✅ {n} Nachrichten in die DB übernommen.")
-        print("   Tabelle: messages")
+        t0 = time.perf_counter()
+        n_files, n_read, n_new = import_all(conn)
+        if not n_files:
+            print("ℹ️  Alle Dateien wurden schon importiert – nichts zu tun.")
+            return
+        secs = time.perf_counter() - t0
+        print(f"✅ {n_files} Dateien, {n_read} Nachrichten gelesen, {n_new} neu in die DB übernommen "
+              f"({secs:.2f}s).")
+        print("   Tabelle: messages (Duplikate über msg_key übersprungen)")
     finally:
         conn.close()
 
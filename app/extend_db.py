@@ -1,59 +1,28 @@
 # app/extend_db.py
-import sqlite3
-from pathlib import Path
+# Inhalte für Regeln/Antworten: Gesetze, Intents, Vorlagen, Gefühllexikon.
+# Angelegt und EINMALIG befüllt wird über app/migrations.py – dieses Skript
+# bringt nur die DB auf den aktuellen Stand (kein doppeltes Einfügen mehr).
+from __future__ import annotations
 
-DB_PATH = Path("data/chat_brain.sqlite")
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+from .db import DB_PATH, connect
+from .migrations import migrate
 
-def run():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute("PRAGMA foreign_keys = ON")
-
-    # 1) Gesetze (nie brechen)
-    cur.execute("""
+CONTENT_DDL = [
+    """
     CREATE TABLE IF NOT EXISTS laws (
       id INTEGER PRIMARY KEY,
       name TEXT NOT NULL UNIQUE,
       description TEXT NOT NULL
     )
-    """)
-    laws = [
-        ("GermanOnly", "Nur Deutsch, saubere Rechtschreibung und Satzzeichen."),
-        ("NoAutoSend", "Nie automatisch senden. Nur in das Eingabefeld schreiben."),
-        ("MaxLen500", "Antwort maximal 500 Zeichen."),
-        ("UmlautsKeep", "Umlaute ä ö ü beibehalten."),
-        ("EszettToSS", "ß immer zu ss umschreiben."),
-        ("NoHyphen", "Keine Bindestriche im Text."),
-        ("NoMeetup", "Nie Treffen oder Date vorschlagen oder annehmen."),
-        ("NoPlatforms", "Kein Plattformwechsel oder Kontaktdaten anfragen oder geben."),
-        ("OnTopic", "Immer Bezug auf den Verlauf und die aktuelle Nachricht."),
-    ]
-    cur.executemany("INSERT OR IGNORE INTO laws (name, description) VALUES (?,?)", laws)
-
-    # 2) Intents
-    cur.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS intents (
       id INTEGER PRIMARY KEY,
       code TEXT NOT NULL UNIQUE,
       description TEXT NOT NULL
     )
-    """)
-    intents = [
-        ("sexual",     "sexuell direkt"),
-        ("compliment", "Kompliment / Anziehung"),
-        ("question",   "Frage"),
-        ("smalltalk",  "neutrales Kennenlernen"),
-        ("boundary",   "Grenzen und Regeln ansprechen"),
-        ("repetition", "Thema wurde schon besprochen"),
-        ("aggressive", "angriff oder Beschimpfung"),
-        ("sadness",    "traurigkeit, erschöpfung, klage"),
-        ("fallback",   "keine klare Absicht")
-    ]
-    cur.executemany("INSERT OR IGNORE INTO intents (code, description) VALUES (?,?)", intents)
-
-    # 3) Templates (mehrere Varianten je Intent für Abwechslung)
-    cur.execute("""
+    """,
+    """
     CREATE TABLE IF NOT EXISTS templates (
       id INTEGER PRIMARY KEY,
       intent_code TEXT NOT NULL REFERENCES intents(code),
@@ -62,7 +31,44 @@ def run():
       body TEXT NOT NULL,
       max_len INTEGER NOT NULL DEFAULT 500
     )
-    """)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS feelings_lex (
+      id INTEGER PRIMARY KEY,
+      category TEXT NOT NULL,   -- traurig, erschöpft, ängstlich, ärger, frustriert, hoffnungsvoll, dankbar, froh, stark, positiv, unsicher
+      token TEXT NOT NULL
+    )
+    """,
+]
+
+# 1) Gesetze (nie brechen)
+LAWS = [
+    ("GermanOnly", "Nur Deutsch, saubere Rechtschreibung und Satzzeichen."),
+    ("NoAutoSend", "Nie automatisch senden. Nur in das Eingabefeld schreiben."),
+    ("MaxLen500", "Antwort maximal 500 Zeichen."),
+    ("UmlautsKeep", "Umlaute ä ö ü beibehalten."),
+    ("EszettToSS", "ß immer zu ss umschreiben."),
+    ("NoHyphen", "Keine Bindestriche im Text."),
+    ("NoMeetup", "Nie Treffen oder Date vorschlagen oder annehmen."),
+    ("NoPlatforms", "Kein Plattformwechsel oder Kontaktdaten anfragen oder geben."),
+    ("OnTopic", "Immer Bezug auf den Verlauf und die aktuelle Nachricht."),
+]
+
+# 2) Intents
+INTENTS = [
+    ("sexual",     "sexuell direkt"),
+    ("compliment", "Kompliment / Anziehung"),
+    ("question",   "Frage"),
+    ("smalltalk",  "neutrales Kennenlernen"),
+    ("boundary",   "Grenzen und Regeln ansprechen"),
+    ("repetition", "Thema wurde schon besprochen"),
+    ("aggressive", "angriff oder Beschimpfung"),
+    ("sadness",    "traurigkeit, erschöpfung, klage"),
+    ("fallback",   "keine klare Absicht")
+]
+
+# 3) Templates (mehrere Varianten je Intent für Abwechslung)
+def template_seed() -> list[tuple]:
     t = []
     # sexual (ohne Treffen, nur Chat)
     t += [("sexual","neutral","warm","Du klingst sehr direkt. Was reizt dich hier im Chat gerade am meisten?"),
@@ -100,48 +106,53 @@ def run():
     t += [("fallback","neutral","warm","Klingt interessant. Woran denkst du gerade hier im Chat?"),
           ("fallback","neutral","sachlich","Erzähl mir mehr, damit ich gezielt antworten kann."),
           ("fallback","neutral","empathisch","Ich bin ganz Ohr. Was ist dir gerade wichtig?")]
-    cur.executemany(
-        "INSERT INTO templates (intent_code,gender,tone,body,max_len) VALUES (?,?,?,?,500)", t
-    )
+    return t
 
-    # 4) Gefühllexikon (ausgewaehlte Tokens, erweiterbar)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS feelings_lex (
-      id INTEGER PRIMARY KEY,
-      category TEXT NOT NULL,   -- traurig, erschöpft, ängstlich, ärger, frustriert, hoffnungsvoll, dankbar, froh, stark, positiv, unsicher
-      token TEXT NOT NULL
-    )
-    """)
-    lex = [
-      # traurig
-      ("traurig","traurig"),("traurig","trauer"),("traurig","depressiv"),
-      ("traurig","verzweifelt"),("traurig","deprimiert"),("traurig","niedergeschlagen"),
-      # erschöpft
-      ("erschöpft","müde"),("erschöpft","erschöpft"),("erschöpft","ausgelaugt"),("erschöpft","kaputt"),
-      # ängstlich
-      ("ängstlich","angst"),("ängstlich","ängstlich"),("ängstlich","besorgt"),("ängstlich","unsicher"),
-      # ärger
-      ("ärger","wütend"),("ärger","sauer"),("ärger","verärgert"),("ärger","genervt"),
-      # frustriert
-      ("frustriert","frustriert"),("frustriert","enttäuscht"),("frustriert","hilflos"),
-      # hoffnungsvoll
-      ("hoffnungsvoll","hoffnungsvoll"),("hoffnungsvoll","zuversichtlich"),("hoffnungsvoll","optimistisch"),
-      # dankbar
-      ("dankbar","dankbar"),("dankbar","danke"),
-      # froh
-      ("froh","glücklich"),("froh","zufrieden"),("froh","happy"),("froh","erleichtert"),
-      # stark
-      ("stark","stark"),("stark","mutig"),("stark","tapfer"),
-      # positiv
-      ("positiv","gut"),("positiv","super"),("positiv","toll"),("positiv","prima"),
-      # unsicher
-      ("unsicher","unsicher"),("unsicher","zweifel"),("unsicher","ratlos"),
-    ]
-    cur.executemany("INSERT INTO feelings_lex (category, token) VALUES (?,?)", lex)
+# 4) Gefühllexikon (ausgewaehlte Tokens, erweiterbar)
+FEELINGS_LEX = [
+  # traurig
+  ("traurig","traurig"),("traurig","trauer"),("traurig","depressiv"),
+  ("traurig","verzweifelt"),("traurig","deprimiert"),("traurig","niedergeschlagen"),
+  # erschöpft
+  ("erschöpft","müde"),("erschöpft","erschöpft"),("erschöpft","ausgelaugt"),("erschöpft","kaputt"),
+  # ängstlich
+  ("ängstlich","angst"),("ängstlich","ängstlich"),("ängstlich","besorgt"),("ängstlich","unsicher"),
+  # ärger
+  ("ärger","wütend"),("ärger","sauer"),("ärger","verärgert"),("ärger","genervt"),
+  # frustriert
+  ("frustriert","frustriert"),("frustriert","enttäuscht"),("frustriert","hilflos"),
+  # hoffnungsvoll
+  ("hoffnungsvoll","hoffnungsvoll"),("hoffnungsvoll","zuversichtlich"),("hoffnungsvoll","optimistisch"),
+  # dankbar
+  ("dankbar","dankbar"),("dankbar","danke"),
+  # froh
+  ("froh","glücklich"),("froh","zufrieden"),("froh","happy"),("froh","erleichtert"),
+  # stark
+  ("stark","stark"),("stark","mutig"),("stark","tapfer"),
+  # positiv
+  ("positiv","gut"),("positiv","super"),("positiv","toll"),("positiv","prima"),
+  # unsicher
+  ("unsicher","unsicher"),("unsicher","zweifel"),("unsicher","ratlos"),
+]
 
-    conn.commit()
-    conn.close()
-    print("✅ DB erweitert: laws, intents, templates, feelings_lex.")
+def seed_content(cur):
+    """Nur leere Tabellen befüllen (laws/intents sind per UNIQUE ohnehin sicher)."""
+    cur.executemany("INSERT OR IGNORE INTO laws (name, description) VALUES (?,?)", LAWS)
+    cur.executemany("INSERT OR IGNORE INTO intents (code, description) VALUES (?,?)", INTENTS)
+    if not cur.execute("SELECT 1 FROM templates LIMIT 1").fetchone():
+        cur.executemany(
+            "INSERT INTO templates (intent_code,gender,tone,body,max_len) VALUES (?,?,?,?,500)", template_seed()
+        )
+    if not cur.execute("SELECT 1 FROM feelings_lex LIMIT 1").fetchone():
+        cur.executemany("INSERT INTO feelings_lex (category, token) VALUES (?,?)", FEELINGS_LEX)
+
+def run():
+    conn = connect()
+    try:
+        n = migrate(conn)
+    finally:
+        conn.close()
+    print(f"✅ DB erweitert: laws, intents, templates, feelings_lex ({n} Migration(en) angewendet) – {DB_PATH}")
 
 if __name__ == "__main__":
     run()
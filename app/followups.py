@@ -0,0 +1,193 @@
+# app/followups.py
+# Follow-up-Timer je Unterhaltung, dauerhaft in SQLite (followup_timers):
+#   - gespeicherte eigene Nachricht  -> Timer (neu) scharf: fällig = Zeit + FOLLOWUP_HOURS
+#   - gespeicherte fremde Nachricht  -> Timer aufgehoben
+#   - ausgelöst (Entwurf erstellt)   -> Zeile gelöscht, kein zweiter Follow-up nach Neustart
+# Scharf-/Aufheben passiert per Trigger auf messages, egal wer speichert (Bot, Import, Reprocess).
+#
+# Im Prozess hält FollowupTimers nur die bald fälligen Timer in einem Heap; die Prüfung je
+# Poll kostet O(1) solange nichts fällig ist, sonst O(fällige · log n) – unabhängig davon,
+# wie viele Unterhaltungen in der DB stehen.
+#
+# Zeiten sind wie ts_epoch Wanduhr-Sekunden (siehe normalize.py), also mit now_epoch() vergleichen.
+from __future__ import annotations
+import calendar, heapq, os, sqlite3, time
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+
+from . import metrics
+
+FOLLOWUP_HOURS = float(os.getenv("FOLLOWUP_HOURS") or 4)
+STALE_HOURS    = float(os.getenv("FOLLOWUP_STALE_HOURS") or 48)   # älter fällig -> verwerfen statt nachholen
+HORIZON        = 3600     # so weit im Voraus werden Timer in den Heap geladen (s)
+RELOAD_SECONDS = 600      # so oft wird der Heap aus der DB nachgefüllt
+
+DELAY = int(FOLLOWUP_HOURS * 3600)
+
+# -------------------------------------------------------
+# Schema
+# -------------------------------------------------------
+FOLLOWUP_DDL = """
+    CREATE TABLE IF NOT EXISTS followup_timers (
+        conv_id TEXT PRIMARY KEY,          -- '' = ohne Dialogschlüssel
+        out_ts INTEGER NOT NULL,           -- ts_epoch unserer letzten Nachricht
+        due_epoch INTEGER NOT NULL,        -- out_ts + Wartezeit
+        armed_at TEXT NOT NULL DEFAULT (datetime('now'))
+    )
+"""
+FOLLOWUP_INDEX = "CREATE INDEX IF NOT EXISTS idx_followup_due ON followup_timers(due_epoch)"
+
+def _arm(row: str, cond: str = "1") -> str:
+    # Nur vorwärts: eine nachträglich importierte ältere Nachricht verschiebt nichts
+    return f"""
+        INSERT INTO followup_timers(conv_id, out_ts, due_epoch)
+        SELECT COALESCE({row}.conv_id, ''), {row}.ts_epoch, {row}.ts_epoch + {DELAY} WHERE {cond}
+        ON CONFLICT(conv_id) DO UPDATE SET out_ts = excluded.out_ts, due_epoch = excluded.due_epoch,
+                                           armed_at = excluded.armed_at
+        WHERE excluded.out_ts > followup_timers.out_ts;
+    """
+
+def _cancel(row: str, cond: str = "1") -> str:
+    # Antwort des Gegenübers (gleich alt oder neuer als unsere Nachricht) hebt auf
+    return f"""
+        DELETE FROM followup_timers
+        WHERE {cond} AND conv_id = COALESCE({row}.conv_id, '') AND out_ts <= {row}.ts_epoch;
+    """
+
+FOLLOWUP_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS followup_arm_ai AFTER INSERT ON messages
+        WHEN new.direction = 'out' AND new.ts_epoch IS NOT NULL BEGIN {_arm('new')} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS followup_cancel_ai AFTER INSERT ON messages
+        WHEN new.direction = 'in' AND new.ts_epoch IS NOT NULL BEGIN {_cancel('new')} END""",
+    # Zuordnung zu einer Unterhaltung (save_records): Timer unter '' mitnehmen
+    f"""CREATE TRIGGER IF NOT EXISTS followup_move_au AFTER UPDATE OF conv_id ON messages
+        WHEN old.conv_id IS NOT new.conv_id AND new.ts_epoch IS NOT NULL BEGIN
+            DELETE FROM followup_timers
+            WHERE old.direction = 'out' AND conv_id = COALESCE(old.conv_id, '') AND out_ts = old.ts_epoch;
+            {_cancel('new', "new.direction = 'in'")}
+            {_arm('new', "new.direction = 'out'")}
+        END""",
+]
+
+# Bestand: Unterhaltungen, in denen wir zuletzt geschrieben haben
+BACKFILL_SQL = f"""
+    INSERT OR IGNORE INTO followup_timers(conv_id, out_ts, due_epoch)
+    SELECT conv_id, last_out_ts, last_out_ts + {DELAY} FROM conversation_stats
+    WHERE last_out_ts IS NOT NULL AND (last_in_ts IS NULL OR last_out_ts > last_in_ts)
+"""
+
+def ensure_followups(con: sqlite3.Connection) -> bool:
+    """Tabelle, Index, Trigger; beim ersten Mal aus conversation_stats füllen (True)."""
+    existed = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='followup_timers'"
+    ).fetchone() is not None
+    con.execute(FOLLOWUP_DDL)
+    con.execute(FOLLOWUP_INDEX)
+    for stmt in FOLLOWUP_TRIGGERS:
+        con.execute(stmt)
+    if not existed:
+        con.execute(BACKFILL_SQL)
+    con.commit()
+    return not existed
+
+def now_epoch() -> int:
+    """Jetzt als Wanduhr-Sekunden – dieselbe Skala wie messages.ts_epoch."""
+    return calendar.timegm(datetime.now().timetuple())
+
+# -------------------------------------------------------
+# Heap der bald fälligen Timer
+# -------------------------------------------------------
+class FollowupTimers:
+    """
+    due(con, now) -> fällige Unterhaltungen; nach dem Follow-up fired(con, conv_id).
+    Der Heap kann veraltet sein (Trigger arbeiten nur in der DB) – jeder Kandidat wird
+    vor der Rückgabe per Primärschlüssel gegen followup_timers geprüft.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._heap: List[Tuple[int, str]] = []
+        self._queued: Set[Tuple[int, str]] = set()
+        self._loaded_until = 0
+        self._reload_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def _push(self, due: int, key: str):
+        if (due, key) not in self._queued:
+            self._queued.add((due, key))
+            heapq.heappush(self._heap, (due, key))
+
+    def reload(self, con: sqlite3.Connection, now: Optional[int] = None):
+        """Timer bis now + HORIZON nachladen (Bereichsabfrage über idx_followup_due)."""
+        now = now_epoch() if now is None else now
+        until = now + HORIZON
+        for key, due in con.execute(
+            "SELECT conv_id, due_epoch FROM followup_timers WHERE due_epoch <= ?", (until,)
+        ):
+            self._push(due, key)
+        self._loaded_until = until
+        self._reload_at = self._clock() + RELOAD_SECONDS
+        metrics.set_value("followup.queued", len(self._heap))
+
+    def refresh(self, con: sqlite3.Connection, conv_id: Optional[str]):
+        """Nach dem Speichern bzw. beim Öffnen einer Unterhaltung: deren Timer übernehmen."""
+        row = con.execute(
+            "SELECT due_epoch FROM followup_timers WHERE conv_id=?", (conv_id or "",)
+        ).fetchone()
+        if row and row[0] <= self._loaded_until:
+            self._push(row[0], conv_id or "")
+
+    def due(self, con: sqlite3.Connection, now: Optional[int] = None) -> List[str]:
+        now = now_epoch() if now is None else now
+        if self._clock() >= self._reload_at:
+            self.reload(con, now)
+        out: List[str] = []
+        while self._heap and self._heap[0][0] <= now:
+            due, key = heapq.heappop(self._heap)
+            self._queued.discard((due, key))
+            row = con.execute(
+                "SELECT due_epoch FROM followup_timers WHERE conv_id=?", (key,)
+            ).fetchone()
+            if row is None:
+                metrics.incr("followup.cancelled")   # inzwischen beantwortet
+                continue
+            if row[0] != due:   # neu scharf gemacht
+                if row[0] <= self._loaded_until:
+                    self._push(row[0], key)
+                continue
+            if now - due > STALE_HOURS * 3600:
+                con.execute("DELETE FROM followup_timers WHERE conv_id=? AND due_epoch=?", (key, due))
+                con.commit()
+                metrics.incr("followup.stale")
+                continue
+            out.append(key)
+        return out
+
+    def fired(self, con: sqlite3.Connection, conv_id: Optional[str]):
+        """Follow-up ist erstellt – Timer löschen (erst die nächste eigene Nachricht macht ihn wieder scharf)."""
+        con.execute("DELETE FROM followup_timers WHERE conv_id=?", (conv_id or "",))
+        con.commit()
+        metrics.incr("followup.fired")
+
+def main():
+    from .db import DB_PATH, connect_migrated
+    from .normalize import epoch_to_iso
+    con = connect_migrated()
+    try:
+        now = now_epoch()
+        rows = con.execute(
+            "SELECT conv_id, out_ts, due_epoch FROM followup_timers ORDER BY due_epoch"
+        ).fetchall()
+        print(f"⏰ {len(rows)} Follow-up-Timer in {DB_PATH} (Wartezeit {FOLLOWUP_HOURS:g} h):")
+        for conv_id, out_ts, due in rows:
+            state = "fällig" if due <= now else f"in {(due - now) / 3600:.1f} h"
+            if now - due > STALE_HOURS * 3600:
+                state = "veraltet (wird verworfen)"
+            print(f"   [{conv_id or '-'}] letzte eigene {epoch_to_iso(out_ts)}  -> {epoch_to_iso(due)}  {state}")
+    finally:
+        con.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# app/input_gate.py
+# Günstige Vorprüfung der EINGEHENDEN Nachricht, bevor die KI überhaupt gefragt wird.
+# Was die Ausgabe-Regeln (rules.filter_and_fix) ohnehin verwerfen bzw. durch einen
+# festen Satz ersetzen würden, muss nicht erst generiert werden.
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from . import metrics
+from .intent_detector import detect_intent
+from .rules import RE_CONTACTS, RE_MEETUP, filter_and_fix, is_incest_block
+from .templates import pick_template
+
+# Intents, bei denen wir direkt eine Vorlage nehmen statt zu generieren.
+# Zusätzlich muss eine Kontakt-/Treffen-Regel greifen (weniger Fehlalarme).
+GATED_INTENTS = {"boundary"}
+
+@dataclass(frozen=True)
+class GateResult:
+    action: str                 # 'block' (kein Entwurf) | 'template' (fester Entwurf)
+    reason: str                 # z.B. 'incest_block', 'intent:boundary'
+    reply: str                  # fertiger Entwurf ('' bei block)
+    flags: Dict[str, bool]
+
+def gate_incoming(text: str, recent_context: str = "") -> Optional[GateResult]:
+    """
+    Liefert ein GateResult, wenn für diese Nachricht KEIN KI-Aufruf nötig ist,
+    sonst None (normal weiter generieren).
+    """
+    metrics.incr("gate.checked")
+    t = text or ""
+
+    if is_incest_block(t):
+        metrics.incr("gate.block")
+        metrics.incr("gate.llm_calls_avoided")
+        return GateResult("block", "incest_block", "", {"incest_block": True})
+
+    res = detect_intent(t, recent_context=recent_context)
+    if res.intent in GATED_INTENTS and (RE_MEETUP.search(t) or RE_CONTACTS.search(t)):
+        reply, flags = filter_and_fix(pick_template(res.intent))
+        metrics.incr("gate.template")
+        metrics.incr("gate.llm_calls_avoided")
+        return GateResult("template", f"intent:{res.intent}", reply, flags)
+
+    metrics.incr("gate.passed")
+    return None
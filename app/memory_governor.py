@@ -0,0 +1,248 @@
+# app/memory_governor.py
+# Speicher der Chat-Seite im Blick behalten: Die Seite läuft Stunden bis Tage, die
+# Single-Page-App sammelt dabei DOM-Knoten und JS-Heap an. Der Governor misst
+# regelmäßig per CDP (Performance.getMetrics) plus Chromium-RSS (psutil, optional),
+# schreibt den Verlauf nach memory_samples und frischt die Seite in einer ruhigen
+# Phase auf, sobald ein Limit überschritten ist:
+#   Stufe 1: page.reload()
+#   Stufe 2: neue Seite im selben Kontext, alte schließen (eigener Renderer-Prozess)
+# Stufe 2 kommt, wenn nach einem Reload die Limits weiter überschritten bleiben.
+#
+# .env (0 = Limit aus):
+#   MEM_HEAP_MB=256   MEM_NODES=50000   MEM_CARDS=1000   MEM_RSS_MB=1024
+#   MEM_SAMPLE_SECONDS=60   MEM_IDLE_SECONDS=90   MEM_KEEP_DAYS=14
+#
+#   python -m app.memory_governor      # Verlauf der letzten Messungen
+from __future__ import annotations
+import os, sqlite3, time
+from dataclasses import dataclass
+from typing import Optional
+
+from . import metrics
+from .browser import chromium_rss_mb
+from .followups import now_epoch
+from .session import CHAT_READY
+
+MB = 1024 * 1024
+
+def _env_num(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name) or default)
+    except ValueError:
+        return default
+
+LIMIT_HEAP_MB  = _env_num("MEM_HEAP_MB", 256)
+LIMIT_NODES    = _env_num("MEM_NODES", 50000)
+LIMIT_CARDS    = _env_num("MEM_CARDS", 1000)
+LIMIT_RSS_MB   = _env_num("MEM_RSS_MB", 1024)
+SAMPLE_SECONDS = _env_num("MEM_SAMPLE_SECONDS", 60)
+IDLE_SECONDS   = _env_num("MEM_IDLE_SECONDS", 90)    # so lange ohne neue Nachricht = ruhige Phase
+KEEP_DAYS      = _env_num("MEM_KEEP_DAYS", 14)
+ESCALATE_SECONDS = 1800   # noch über Limit so kurz nach einem Reload -> nächstes Mal neue Seite
+READY_TIMEOUT_MS = 20000
+
+JS_CARD_COUNT  = "() => document.querySelectorAll('.message-card').length"
+JS_INPUT_EMPTY = "() => { const ta = document.querySelector('#message-input'); return !ta || !ta.value.trim(); }"
+
+# -------------------------------------------------------
+# Schema
+# -------------------------------------------------------
+SAMPLES_DDL = """
+    CREATE TABLE IF NOT EXISTS memory_samples (
+        id INTEGER PRIMARY KEY,
+        ts_epoch INTEGER NOT NULL,          -- Wanduhr-Sekunden wie messages.ts_epoch
+        heap_used_mb REAL, heap_total_mb REAL,
+        nodes INTEGER, listeners INTEGER, documents INTEGER,
+        cards INTEGER,
+        rss_mb REAL,                        -- NULL ohne psutil bzw. angedockt
+        action TEXT                         -- NULL | 'reload' | 'new_page'
+    )
+"""
+
+def ensure_samples(con: sqlite3.Connection):
+    con.execute(SAMPLES_DDL)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_memory_samples_ts ON memory_samples(ts_epoch)")
+    con.commit()
+
+# -------------------------------------------------------
+# Messen
+# -------------------------------------------------------
+@dataclass(frozen=True)
+class MemSample:
+    heap_used_mb: Optional[float] = None
+    heap_total_mb: Optional[float] = None
+    nodes: Optional[int] = None
+    listeners: Optional[int] = None
+    documents: Optional[int] = None
+    cards: Optional[int] = None
+    rss_mb: Optional[float] = None
+
+    def over_limit(self) -> Optional[str]:
+        """Grund als Text, wenn ein Limit überschritten ist – sonst None."""
+        checks = (("Heap", self.heap_used_mb, LIMIT_HEAP_MB, "MB"), ("DOM-Knoten", self.nodes, LIMIT_NODES, ""),
+                  ("Karten", self.cards, LIMIT_CARDS, ""), ("RSS", self.rss_mb, LIMIT_RSS_MB, "MB"))
+        for label, value, limit, unit in checks:
+            if limit and value is not None and value > limit:
+                return f"{label} {value:.0f}{unit} > {limit:.0f}{unit}"
+        return None
+
+    def line(self) -> str:
+        def f(v, fmt="{:.0f}"):
+            return "-" if v is None else fmt.format(v)
+        return (f"Heap {f(self.heap_used_mb)}/{f(self.heap_total_mb)} MB, {f(self.nodes)} Knoten, "
+                f"{f(self.listeners)} Listener, {f(self.cards)} Karten, RSS {f(self.rss_mb)} MB")
+
+def cdp_metrics(cdp) -> dict:
+    """Performance.getMetrics -> {Name: Wert}; die Domain muss vorher aktiviert sein."""
+    return {m["name"]: m["value"] for m in cdp.send("Performance.getMetrics").get("metrics", [])}
+
+class MemoryGovernor:
+    """
+    Im Hauptloop: tick(page) misst bei Bedarf; should_recycle(page, idle_for)
+    sagt, ob jetzt aufgefrischt werden darf; recycle(page, capture) gibt die (evtl. neue) Seite zurück.
+    """
+
+    def __init__(self, con: Optional[sqlite3.Connection] = None, clock=time.monotonic):
+        self.con = con
+        self._clock = clock
+        self._cdp = None
+        self._cdp_page = None
+        self._next_sample = 0.0
+        self._last_recycle = -1e9
+        self._escalate = False
+        self.last: Optional[MemSample] = None
+        self.reason: Optional[str] = None
+
+    # --- Messen ---
+    def _session(self, page):
+        if self._cdp is None or self._cdp_page is not page:
+            self._cdp, self._cdp_page = None, page
+            try:
+                cdp = page.context.new_cdp_session(page)
+                cdp.send("Performance.enable")
+                self._cdp = cdp
+            except Exception:
+                return None   # kein Chromium o.ä. – dann nur Karten/RSS
+        return self._cdp
+
+    def sample(self, page, cards: Optional[int] = None, action: Optional[str] = None) -> MemSample:
+        m = {}
+        cdp = self._session(page)
+        if cdp is not None:
+            try:
+                m = cdp_metrics(cdp)
+            except Exception:
+                self._cdp = None
+        if cards is None:
+            try:
+                cards = page.evaluate(JS_CARD_COUNT)
+            except Exception:
+                cards = None
+        s = MemSample(
+            heap_used_mb=m["JSHeapUsedSize"] / MB if "JSHeapUsedSize" in m else None,
+            heap_total_mb=m["JSHeapTotalSize"] / MB if "JSHeapTotalSize" in m else None,
+            nodes=int(m["Nodes"]) if "Nodes" in m else None,
+            listeners=int(m["JSEventListeners"]) if "JSEventListeners" in m else None,
+            documents=int(m["Documents"]) if "Documents" in m else None,
+            cards=cards,
+            rss_mb=chromium_rss_mb(),
+        )
+        self.last = s
+        self._record(s, action)
+        for key in ("heap_used_mb", "nodes", "cards", "rss_mb"):
+            value = getattr(s, key)
+            if value is not None:
+                metrics.set_value(f"mem.{key}", round(value, 1))
+        return s
+
+    def _record(self, s: MemSample, action: Optional[str]):
+        if self.con is None:
+            return
+        now = now_epoch()
+        self.con.execute(
+            "INSERT INTO memory_samples(ts_epoch, heap_used_mb, heap_total_mb, nodes, listeners, documents, "
+            "cards, rss_mb, action) VALUES (?,?,?,?,?,?,?,?,?)",
+            (now, s.heap_used_mb, s.heap_total_mb, s.nodes, s.listeners, s.documents, s.cards, s.rss_mb, action),
+        )
+        self.con.execute("DELETE FROM memory_samples WHERE ts_epoch < ?", (now - int(KEEP_DAYS * 86400),))
+        self.con.commit()
+
+    def tick(self, page, cards: Optional[int] = None) -> Optional[MemSample]:
+        """Alle SAMPLE_SECONDS messen; setzt self.reason, solange ein Limit überschritten ist."""
+        if self._clock() < self._next_sample:
+            return None
+        self._next_sample = self._clock() + SAMPLE_SECONDS
+        s = self.sample(page, cards)
+        reason = s.over_limit()
+        if reason and self._clock() - self._last_recycle < ESCALATE_SECONDS:
+            self._escalate = True   # Reload hat nicht gereicht
+        self.reason = reason
+        return s
+
+    # --- Auffrischen ---
+    def should_recycle(self, page, idle_for: float) -> bool:
+        """Nur in einer ruhigen Phase und nie mit einem Entwurf im Eingabefeld."""
+        if not self.reason or idle_for < IDLE_SECONDS:
+            return False
+        try:
+            return bool(page.evaluate(JS_INPUT_EMPTY))
+        except Exception:
+            return False
+
+    def recycle(self, page, capture=None):
+        """
+        Seite auffrischen und dieselbe URL (= Unterhaltung) wiederherstellen. Rückgabe: die
+        Seite, mit der weitergearbeitet wird. Der Netz-Mitschnitt hängt danach an ihr.
+        """
+        url, reason = page.url, self.reason
+        action = "new_page" if self._escalate else "reload"
+        print(f"♻️  Speicher-Limit ({reason}) – {'neue Seite' if self._escalate else 'Reload'} in ruhiger Phase …")
+        t0 = time.perf_counter()
+        if self._escalate:
+            new = page.context.new_page()
+            if capture is not None:
+                capture.attach(new)
+            new.goto(url, wait_until="domcontentloaded")
+            page.close()
+            page = new
+        else:
+            page.reload(wait_until="domcontentloaded")
+        try:
+            page.wait_for_selector(CHAT_READY, timeout=READY_TIMEOUT_MS)
+        except Exception:
+            pass   # Login-Seite o.ä. – der Hauptloop prüft die Sitzung ohnehin
+        self._last_recycle = self._clock()
+        self._escalate = False
+        self.reason = None
+        self._next_sample = self._clock() + SAMPLE_SECONDS
+        metrics.incr(f"mem.{action}")
+        s = self.sample(page, action=action)
+        print(f"   ✅ Aufgefrischt in {time.perf_counter() - t0:.1f}s: {s.line()}")
+        return page
+
+def main():
+    from .db import DB_PATH, connect_migrated
+    from .normalize import epoch_to_iso
+    con = connect_migrated()
+    try:
+        rows = con.execute("""
+            SELECT date(ts_epoch, 'unixepoch') AS day, COUNT(*), MAX(heap_used_mb), MAX(nodes),
+                   MAX(cards), MAX(rss_mb), SUM(action IS NOT NULL)
+            FROM memory_samples GROUP BY day ORDER BY day DESC LIMIT 14
+        """).fetchall()
+        print(f"🧠 Speicherverlauf ({DB_PATH}), Maxima je Tag:")
+        if not rows:
+            print("   (noch keine Messungen)")
+        for day, n, heap, nodes, cards, rss, recycles in rows:
+            print(f"   {day}: {n:4d} Messungen, Heap {heap or 0:.0f} MB, {nodes or 0} Knoten, "
+                  f"{cards or 0} Karten, RSS {f'{rss:.0f} MB' if rss else '-'}, {recycles} Auffrischung(en)")
+        for ts, action, heap, nodes in con.execute(
+            "SELECT ts_epoch, action, heap_used_mb, nodes FROM memory_samples "
+            "WHERE action IS NOT NULL ORDER BY ts_epoch DESC LIMIT 5"
+        ):
+            print(f"   ♻️  {epoch_to_iso(ts)} {action}: danach Heap {heap or 0:.0f} MB, {nodes or 0} Knoten")
+    finally:
+        con.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+# app/metrics.py
+# Kleine, prozessweite Zähler (thread-sicher) für Konsolen-Statistiken.
+from __future__ import annotations
+import threading
+from typing import Dict
+
+_LOCK = threading.Lock()
+_VALUES: Dict[str, float] = {}
+
+def incr(name: str, n: float = 1) -> None:
+    with _LOCK:
+        _VALUES[name] = _VALUES.get(name, 0) + n
+
+def set_value(name: str, value: float) -> None:
+    with _LOCK:
+        _VALUES[name] = value
+
+def get(name: str, default: float = 0) -> float:
+    with _LOCK:
+        return _VALUES.get(name, default)
+
+def snapshot(prefix: str = "") -> Dict[str, float]:
+    with _LOCK:
+        return {k: v for k, v in sorted(_VALUES.items()) if k.startswith(prefix)}
+
+def format_line(prefix: str) -> str:
+    """z.B. 'checked=12 block=1 template=3' für alle Zähler mit prefix."""
+    snap = snapshot(prefix)
+    if not snap:
+        return "-"
+    parts = []
+    for k, v in snap.items():
+        val = f"{v:.0f}" if float(v).is_integer() else f"{v:.2f}"
+        parts.append(f"{k[len(prefix):]}={val}")
+    return " ".join(parts)
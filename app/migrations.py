@@ -0,0 +1,167 @@
+# app/migrations.py
+# Versionierte Schema-Migrationen über PRAGMA user_version.
+# Jede Migration läuft genau EINMAL (Reihenfolge = Nummer) und ist idempotent,
+# d.h. ein Abbruch mitten im Schritt schadet nicht – er wird beim nächsten Start
+# einfach wiederholt. Ist die DB auf Stand, kostet migrate() einen PRAGMA-Lesezugriff.
+#
+# Neue Schemaänderung = neue Funktion unten + Eintrag am Ende von MIGRATIONS.
+from __future__ import annotations
+import os, sqlite3, time
+from typing import Callable, List, Tuple
+
+# Module werden erst in den Migrationen importiert: auf einer aktuellen DB
+# soll der Start nichts davon laden müssen.
+
+def _m001_base(con: sqlite3.Connection):
+    from .upgrade_db import DDL, SEED_SETTINGS, seed_normalize, seed_rules, seed_settings
+    for stmt in DDL:
+        con.execute(stmt)
+    seed_settings(con, SEED_SETTINGS)
+    seed_rules(con)
+    seed_normalize(con)
+
+def _m002_profiles(con: sqlite3.Connection):
+    from .db_migrate import ensure_profiles
+    ensure_profiles(con)   # status statt relationship_status, fehlende Spalten
+
+def _m003_content(con: sqlite3.Connection):
+    """Regeln/Gesetze/Intents/Vorlagen/Lexikon in die Haupt-DB (vorher data/chat_brain.sqlite)."""
+    from .db import LEGACY_CONTENT_DB
+    from .extend_db import CONTENT_DDL, seed_content
+    from .setup_db import schema as RULES_DDL, seed_rules
+    con.executescript(RULES_DDL)
+    for stmt in CONTENT_DDL:
+        con.execute(stmt)
+
+    main_file = con.execute("PRAGMA database_list").fetchone()[2]
+    if os.path.exists(LEGACY_CONTENT_DB) and os.path.abspath(main_file or "") != LEGACY_CONTENT_DB:
+        con.execute("ATTACH DATABASE ? AS legacy", (LEGACY_CONTENT_DB,))
+        try:
+            legacy = {r[0] for r in con.execute("SELECT name FROM legacy.sqlite_master WHERE type='table'")}
+            for table in ("rules", "laws", "intents", "templates", "feelings_lex"):
+                empty = not con.execute(f"SELECT 1 FROM main.{table} LIMIT 1").fetchone()
+                if table in legacy and empty:
+                    cols = [r[1] for r in con.execute(f"PRAGMA main.table_info({table})")]
+                    have = {r[1] for r in con.execute(f"PRAGMA legacy.table_info({table})")}
+                    use = ", ".join(c for c in cols if c in have)
+                    con.execute(f"INSERT INTO main.{table} ({use}) SELECT {use} FROM legacy.{table}")
+            con.commit()
+        finally:
+            con.execute("DETACH DATABASE legacy")
+
+    cur = con.cursor()
+    seed_rules(cur)      # nur falls weiterhin leer
+    seed_content(cur)
+
+def _m004_dialog_info(con: sqlite3.Connection):
+    """Eine Form für dialog_info: (conv_id, key, value) statt profile_id/UNIQUE(profile_id, key)."""
+    from .profile_extract import ensure_dialog_info_store
+    ensure_dialog_info_store(con)
+    cols = [r[1] for r in con.execute("PRAGMA table_info(dialog_info)")]
+    if "profile_id" not in cols and "updated_at" not in cols:
+        return
+    con.execute("ALTER TABLE dialog_info RENAME TO dialog_info_old")
+    con.execute("DROP INDEX IF EXISTS ux_dialog_info_conv_key_value")
+    con.execute("DROP INDEX IF EXISTS idx_dialog_info_k")
+    ensure_dialog_info_store(con)   # legt die neue Tabelle + UNIQUE-Index an
+    con.execute("""
+        INSERT INTO dialog_info (id, conv_id, key, value, confidence, created_at, first_seen, last_seen, occurrences)
+        SELECT id, conv_id, key, value, confidence, created_at, first_seen, last_seen, occurrences
+        FROM dialog_info_old
+    """)
+    con.execute("DROP TABLE dialog_info_old")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_dialog_info_k ON dialog_info(key)")
+
+def _m005_messages(con: sqlite3.Connection):
+    from .db_write import ensure_import_schema
+    ensure_import_schema(con)   # msg_key, ts_epoch/sort_ts, Zeit-Indizes, import_manifest
+
+def _m006_fts(con: sqlite3.Connection):
+    from .retrieval import ensure_fts
+    ensure_fts(con)
+
+def _m007_bookkeeping(con: sqlite3.Connection):
+    from .profile_extract import ensure_schema as ensure_profile_schema
+    from .reprocess import ensure_schema as ensure_reprocess_schema
+    from .summary_memory import ensure_schema as ensure_summary_schema
+    ensure_summary_schema(con)
+    ensure_profile_schema(con)
+    ensure_reprocess_schema(con)
+
+def _m008_conv_stats(con: sqlite3.Connection):
+    from .conv_stats import ensure_stats
+    ensure_stats(con)   # Tabelle + Trigger, Bestand einmal berechnen
+
+def _m009_conversations(con: sqlite3.Connection):
+    """Daten je Unterhaltung: profiles.conv_id (eindeutig mit side) + Index (conv_id, id)."""
+    from .db_migrate import ensure_profiles
+    ensure_profiles(con)
+    # Alt-DBs: je (side, conv_id) nur die jüngste Zeile behalten
+    con.execute("DELETE FROM profiles WHERE id NOT IN (SELECT MAX(id) FROM profiles GROUP BY side, conv_id)")
+    con.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_profiles_side_conv ON profiles(side, conv_id)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_messages_conv_id ON messages(conv_id, id)")
+
+def _m010_activity(con: sqlite3.Connection):
+    from .poll_scheduler import ensure_activity
+    ensure_activity(con)   # Stunden-Histogramm eingehender Nachrichten (Trigger + Bestand)
+
+def _m011_followups(con: sqlite3.Connection):
+    from .followups import ensure_followups
+    ensure_followups(con)   # Follow-up-Timer: Trigger + offene Unterhaltungen aus conversation_stats
+
+def _m012_memory_samples(con: sqlite3.Connection):
+    from .memory_governor import ensure_samples
+    ensure_samples(con)   # Speicherverlauf der Chat-Seite
+
+def _m013_sort_ts_wallclock(con: sqlite3.Connection):
+    """sort_ts: Zeilen ohne Stempel nach created_epoch (Wanduhr) statt created_at (UTC) einordnen."""
+    from .db_write import ensure_time_columns
+    ensure_time_columns(con)
+
+MIGRATIONS: List[Tuple[int, str, Callable[[sqlite3.Connection], None]]] = [
+    (1, "Grundschema + Startwerte", _m001_base),
+    (2, "profiles: status/gender vereinheitlicht", _m002_profiles),
+    (3, "Regeln, Vorlagen, Lexikon in der Haupt-DB", _m003_content),
+    (4, "dialog_info je Unterhaltung", _m004_dialog_info),
+    (5, "messages: msg_key, ts_epoch, Zeit-Indizes", _m005_messages),
+    (6, "Volltext-Index (FTS5)", _m006_fts),
+    (7, "Zusammenfassungen, Wasserstände, Analyse-Tabellen", _m007_bookkeeping),
+    (8, "Kennzahlen je Unterhaltung (Trigger)", _m008_conv_stats),
+    (9, "Profile und Nachrichten je Unterhaltung", _m009_conversations),
+    (10, "Aktivität je Unterhaltung und Uhrzeit (Trigger)", _m010_activity),
+    (11, "Follow-up-Timer je Unterhaltung (Trigger)", _m011_followups),
+    (12, "Speicherverlauf der Chat-Seite", _m012_memory_samples),
+    (13, "sort_ts in Wanduhrzeit (created_epoch)", _m013_sort_ts_wallclock),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def current_version(con: sqlite3.Connection) -> int:
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(con: sqlite3.Connection, verbose: bool = True) -> int:
+    """Bringt die DB auf SCHEMA_VERSION. Rückgabe: Anzahl angewendeter Migrationen."""
+    version = current_version(con)
+    if version >= SCHEMA_VERSION:
+        return 0
+    applied = 0
+    for num, title, fn in MIGRATIONS:
+        if num <= version:
+            continue
+        t0 = time.perf_counter()
+        fn(con)
+        con.execute(f"PRAGMA user_version = {num}")
+        con.commit()
+        applied += 1
+        if verbose:
+            print(f"🧱 Migration {num}: {title} ({(time.perf_counter() - t0) * 1000:.0f} ms)")
+    return applied
+
+if __name__ == "__main__":
+    from .db import DB_PATH, connect
+    con = connect()
+    try:
+        before = current_version(con)
+        n = migrate(con)
+        print(f"✅ {DB_PATH}: Schema-Version {before} -> {current_version(con)} ({n} Migration(en)).")
+    finally:
+        con.close()
@@ -0,0 +1,264 @@
+# app/net_capture.py
+# Nachrichten direkt aus dem Netzwerkverkehr der Chat-Seite mitlesen (XHR/fetch-JSON
+# und WebSocket-Frames) statt .message-card per innerText zu scrapen.
+#
+# Ergebnis hat dieselbe Form wie JS_READ_HISTORY: {'text', 'tsText', 'isMine'} –
+# plus 'id', 'convId' und 'tsExact' (Server-Zeit in Sekunden, nur zum Sortieren).
+# Solange für die Unterhaltung noch kein ganzer Verlauf (Liste) gesehen wurde – etwa
+# nach dem Andocken an eine schon geladene Seite –, liefert history() [] und der
+# Aufrufer liest wie bisher das DOM. Einzelne Push-Nachrichten allein reichen nicht.
+#
+# Wichtig (Sync-API): Playwright verarbeitet Events nur während eigener Aufrufe –
+# im Hauptloop also page.wait_for_timeout() statt time.sleep() verwenden.
+#
+# Das Format der Seite ist nicht dokumentiert; erkannt wird alles, was wie eine
+# Nachricht aussieht: Text + Zeit + Richtung (eigene/fremde). Unklare Einträge fallen weg.
+from __future__ import annotations
+import json, os, re
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+TEXT_KEYS = ("text", "message", "body", "content", "msg")
+TIME_KEYS = ("created_at", "createdAt", "sent_at", "sentAt", "timestamp", "date", "time", "ts")
+MINE_KEYS = ("isMine", "is_mine", "mine", "own", "is_own", "outgoing", "fromMe", "from_me")
+DIR_KEYS  = ("direction", "type")
+ID_KEYS   = ("id", "message_id", "messageId", "_id", "uuid")
+CONV_KEYS = ("conversation_id", "conversationId", "dialog_id", "dialogId", "chat_id", "chatId")
+WRAP_KEYS = ("data", "message", "payload", "result", "item")   # Einzel-Nachricht in Hülle
+
+OUT_WORDS = {"out", "outgoing", "sent", "own", "mine"}
+IN_WORDS  = {"in", "incoming", "received", "inbound"}
+
+# Nur Antworten, deren URL danach aussieht (per Env anpassbar)
+RE_URL   = re.compile(os.getenv("NET_CAPTURE_URL_RE", r"(message|chat|dialog|conversation)"), re.IGNORECASE)
+RE_STAMP = re.compile(r"^\d{1,2}:\d{2}\s+\d{1,2}/\d{1,2}/\d{4}$")
+RE_SOCKETIO = re.compile(r"^\d+")   # socket.io: '42["message", {...}]'
+MAX_KEEP  = 300   # Nachrichten je Unterhaltung im Speicher
+MAX_DEPTH = 6
+
+# -------------------------------------------------------
+# Payload -> Karten
+# -------------------------------------------------------
+def parse_time(value: Any) -> Optional[datetime]:
+    """Epoch (s/ms, auch als Text) oder ISO-8601 -> lokale Wanduhrzeit (naiv)."""
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value.strip())
+    try:
+        if isinstance(value, (int, float)):
+            secs = value / 1000 if value > 1e12 else value
+            return datetime.fromtimestamp(secs)
+        if isinstance(value, str):
+            dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+            return dt.astimezone().replace(tzinfo=None) if dt.tzinfo else dt
+    except (ValueError, OverflowError, OSError):
+        return None
+    return None
+
+def format_stamp(dt: datetime) -> str:
+    """Wie im Chat angezeigt: '19:57 22/8/2025'."""
+    return f"{dt.hour}:{dt.minute:02d} {dt.day}/{dt.month}/{dt.year}"
+
+def _first(d: Dict[str, Any], keys) -> Any:
+    for k in keys:
+        if k in d and d[k] not in (None, ""):
+            return d[k]
+    return None
+
+def _is_mine(d: Dict[str, Any]) -> Optional[bool]:
+    for k in MINE_KEYS:
+        if isinstance(d.get(k), bool):
+            return d[k]
+    for k in DIR_KEYS:
+        v = str(d.get(k) or "").lower()
+        if v in OUT_WORDS:
+            return True
+        if v in IN_WORDS:
+            return False
+    return None
+
+def to_card(d: Any) -> Optional[Dict[str, Any]]:
+    """Ein Payload-Objekt -> Karte, oder None wenn es keine eindeutige Nachricht ist."""
+    if not isinstance(d, dict):
+        return None
+    text = _first(d, TEXT_KEYS)
+    mine = _is_mine(d)
+    raw_time = _first(d, TIME_KEYS)
+    if not isinstance(text, str) or not text.strip() or mine is None or raw_time is None:
+        return None
+    if isinstance(raw_time, str) and RE_STAMP.match(raw_time.strip()):
+        ts_text, exact = raw_time.strip(), None
+    else:
+        dt = parse_time(raw_time)
+        if dt is None:
+            return None
+        ts_text, exact = format_stamp(dt), dt.timestamp()
+    mid, conv = _first(d, ID_KEYS), _first(d, CONV_KEYS)
+    return {
+        "text": text.strip(), "tsText": ts_text, "isMine": mine,
+        "id": None if mid is None else str(mid),
+        "convId": None if conv is None else str(conv),
+        "tsExact": exact,
+    }
+
+def card_key(c: Dict[str, Any]) -> str:
+    """Identität einer Karte: Server-ID, sonst Richtung + Stempel + Text (auch für DOM-Karten)."""
+    return c.get("id") or f"{bool(c.get('isMine'))}\x1f{c.get('tsText')}\x1f{c.get('text')}"
+
+def extract_cards(obj: Any, depth: int = 0) -> List[Dict[str, Any]]:
+    """
+    Sucht Listen von Nachrichten beliebig tief, Einzel-Nachrichten nur oben bzw. in
+    einer Hülle ('data', 'message', …) – so landen Vorschauen aus Chat-Listen nicht im Verlauf.
+    """
+    if depth > MAX_DEPTH:
+        return []
+    if isinstance(obj, list):
+        cards = [c for c in map(to_card, obj) if c]
+        if cards:
+            return cards
+        out: List[Dict[str, Any]] = []
+        for item in obj:
+            if isinstance(item, (list, dict)):
+                out.extend(extract_cards(item, depth + 1))
+        return out
+    if isinstance(obj, dict):
+        if depth <= 1:
+            card = to_card(obj)
+            if card:
+                return [card]
+        out = []
+        for k, v in obj.items():
+            if isinstance(v, list) or (isinstance(v, dict) and k in WRAP_KEYS):
+                out.extend(extract_cards(v, depth + 1 if k in WRAP_KEYS else depth + 2))
+        return out
+    return []
+
+def parse_frame(payload: Any) -> Any:
+    """WebSocket-Frame (Text/Bytes, evtl. socket.io-Präfix) -> JSON oder None."""
+    if isinstance(payload, (bytes, bytearray)):
+        try:
+            payload = payload.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+    if not isinstance(payload, str):
+        return None
+    s = RE_SOCKETIO.sub("", payload.strip(), count=1)
+    if not s or s[0] not in "[{":
+        return None
+    try:
+        return json.loads(s)
+    except ValueError:
+        return None
+
+# -------------------------------------------------------
+# Mitschnitt
+# -------------------------------------------------------
+class NetCapture:
+    """Hängt sich an eine Page und sammelt Nachrichten je Unterhaltung ('' = ohne Kennung)."""
+
+    def __init__(self, page=None, keep: int = MAX_KEEP):
+        self.keep = keep
+        self.version = 0           # zählt neue Nachrichten – billiger Änderungs-Check
+        self.payloads = 0          # Antworten/Frames mit mindestens einer Nachricht
+        self._convs: Dict[str, "OrderedDict[str, Dict[str, Any]]"] = {}
+        self._complete: set = set()   # Unterhaltungen, deren Verlauf als Liste kam
+        if page is not None:
+            self.attach(page)
+
+    def attach(self, page):
+        page.on("response", self._on_response)
+        page.on("websocket", self._on_websocket)
+
+    # --- Events ---
+    def _on_response(self, response):
+        try:
+            if response.request.resource_type not in ("xhr", "fetch") or not RE_URL.search(response.url):
+                return
+            if "json" not in (response.headers.get("content-type") or ""):
+                return
+            self.feed(response.json())
+        except Exception:
+            pass   # Seite neu geladen, Body weg o.ä. – Mitschnitt darf den Bot nie stören
+
+    def _on_websocket(self, ws):
+        ws.on("framereceived", self._on_frame)
+        ws.on("framesent", self._on_frame)   # eigene, gesendete Nachrichten
+
+    def _on_frame(self, payload):
+        data = parse_frame(payload)
+        if data is not None:
+            self.feed(data)
+
+    # --- Sammeln ---
+    def feed(self, data: Any) -> int:
+        """Payload auswerten. Rückgabe: Anzahl neuer Nachrichten."""
+        cards = extract_cards(data)
+        if not cards:
+            return 0
+        self.payloads += 1
+        new = 0
+        for c in cards:
+            conv = c["convId"] or ""
+            if len(cards) > 1:
+                self._complete.add(conv)
+            bucket = self._convs.setdefault(conv, OrderedDict())
+            key = card_key(c)
+            if key in bucket:
+                bucket[key].update(c)   # z.B. bearbeitete Nachricht
+                continue
+            bucket[key] = c
+            new += 1
+            while len(bucket) > self.keep:
+                bucket.popitem(last=False)
+        self.version += new
+        return new
+
+    def history(self, conv_hint: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Verlauf (alt -> neu) der passenden Unterhaltung. Mit Kennung aus URL/DOM wird genau
+        diese genommen (unbekannt -> []); ohne nur, wenn eindeutig (eine einzige gesehen). Sonst [] -> DOM.
+        """
+        if conv_hint:
+            if conv_hint not in self._convs:
+                return []   # nie eine andere Unterhaltung unter dieser Kennung liefern
+            conv = conv_hint
+        elif len(self._convs) == 1:
+            conv = next(iter(self._convs))
+        else:
+            return []
+        if conv not in self._complete:
+            return []
+        bucket = self._convs[conv]
+        cards = list(bucket.values())
+        cards.sort(key=lambda c: (c["tsExact"] is None, c["tsExact"] or 0))   # stabil: Ankunft bei Gleichstand
+        return cards
+
+# Kurzer Check ohne Browser: python -m app.net_capture
+if __name__ == "__main__":
+    cap = NetCapture()
+    cap.feed({"data": {"messages": [
+        {"id": 1, "text": "Hi, wie geht's?", "created_at": "2025-08-31T15:34:00Z", "is_mine": False, "dialog_id": 4711},
+        {"id": 2, "text": "Gut und dir?", "created_at": 1756654500, "direction": "out", "dialog_id": 4711},
+    ]}})
+    cap.feed({"conversations": [{"id": 9, "last_message": {"text": "Vorschau", "created_at": 1, "is_mine": False}}]})
+    cap._on_frame('42["message",{"id":3,"text":"Super!","timestamp":1756654800000,"from_me":false,"dialog_id":4711}]')
+    cap._on_frame(json.dumps({"event": "typing"}))
+    for c in cap.history("4711"):
+        print(f"   {'DU    ' if c['isMine'] else 'ER/SIE'} {c['tsText']:16} {c['text']}")
+    print(f"   version={cap.version} payloads={cap.payloads} Unterhaltungen={list(cap._convs)}")
+    assert cap.history("9999") == [], "unbekannte Kennung darf keine fremde Unterhaltung liefern"
+    print("   ✅ unbekannte Kennung -> [] (DOM-Fallback)")
+
+    # Volle Unterhaltung: die Länge bleibt bei MAX_KEEP stehen, neue Nachrichten erkennt
+    # der Bot daher an der letzten Karte (card_key), nicht an len(history)
+    full = NetCapture()
+    full.feed({"messages": [{"id": i, "text": f"Nachricht {i}", "timestamp": 1756600000 + 60 * i,
+                             "is_mine": i % 2 == 0, "dialog_id": 1} for i in range(MAX_KEEP)]})
+    before = full.history("1")
+    full._on_frame('42["message",{"id":"neu","text":"Noch da?","timestamp":1756700000,"from_me":false,"dialog_id":1}]')
+    after = full.history("1")
+    assert len(before) == len(after) == MAX_KEEP, (len(before), len(after))
+    assert card_key(after[-1]) != card_key(before[-1]) and after[-1]["text"] == "Noch da?"
+    print(f"   ✅ volle Unterhaltung ({MAX_KEEP}): neue Nachricht an card_key der letzten Karte erkannt")
@@ -0,0 +1,152 @@
+# app/normalize.py
+# Gemeinsame Normalisierung gescrapter Nachrichten-Karten für alle Bots und Importer:
+# bereinigter Text, Richtung und Zeitstempel als ganze Sekunden (Epoch).
+#
+# Zeitstempel im Chat sehen so aus: '19:57 22/8/2025' (Ortszeit, ohne Zone).
+# Wir rechnen sie als Wanduhrzeit in Sekunden um (calendar.timegm), d.h. die
+# Zahl ist nur zum Sortieren/Vergleichen gedacht, nicht als echte UTC-Zeit.
+# Es gibt KEINEN Rückfall auf "jetzt": unlesbar bleibt None.
+from __future__ import annotations
+import calendar, hashlib, re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+RE_STAMP     = re.compile(r"(\d{1,2}):(\d{2})\s+(\d{1,2})/(\d{1,2})/(\d{4})")
+# Manche Karten enthalten den Zeitstempel zusätzlich als letzte Zeile im Text. Nur mit Datum
+# eindeutig – eine Zeile nur mit Uhrzeit ("Treffen wir uns um\n18:30") kann Inhalt sein.
+RE_TS_SUFFIX   = re.compile(r"\n\s*\d{1,2}:\d{2}\s+\d{1,2}/\d{1,2}(?:/\d{4})?\s*$")
+RE_TIME_SUFFIX = re.compile(r"\n\s*\d{1,2}:\d{2}\s*$")
+
+_EPOCH0 = datetime(1970, 1, 1)
+
+# -------------------------------------------------------
+# Zeitstempel
+# -------------------------------------------------------
+@lru_cache(maxsize=4096)
+def _day_start(yyyy: int, mo: int, dd: int) -> Optional[int]:
+    if not (1 <= mo <= 12 and 1 <= dd <= calendar.monthrange(yyyy, mo)[1]):
+        return None
+    return calendar.timegm((yyyy, mo, dd, 0, 0, 0))
+
+@lru_cache(maxsize=65536)
+def parse_stamp(raw: str) -> Optional[int]:
+    """'19:57 22/8/2025' (auch eingebettet) -> Sekunden, sonst None. Gecacht pro Rohtext."""
+    m = RE_STAMP.search(raw)
+    if not m:
+        return None
+    hh, mm, dd, mo, yyyy = map(int, m.groups())
+    if hh > 23 or mm > 59:
+        return None
+    day = _day_start(yyyy, mo, dd)
+    return None if day is None else day + hh * 3600 + mm * 60
+
+def parse_ts(raw: Optional[str]) -> Optional[int]:
+    return parse_stamp(raw) if raw else None
+
+def epoch_to_iso(epoch: Optional[int]) -> Optional[str]:
+    """Format der Spalte messages.ts: 'YYYY-MM-DD HH:MM:SS'."""
+    if epoch is None:
+        return None
+    return (_EPOCH0 + timedelta(seconds=epoch)).strftime("%Y-%m-%d %H:%M:%S")
+
+def epoch_to_datetime(epoch: Optional[int]) -> Optional[datetime]:
+    """Naive Wanduhrzeit – vergleichbar mit datetime.now()."""
+    return None if epoch is None else _EPOCH0 + timedelta(seconds=epoch)
+
+def parse_ts_iso(raw: Optional[str]) -> Optional[str]:
+    return epoch_to_iso(parse_ts(raw))
+
+# -------------------------------------------------------
+# Text + Datensatz
+# -------------------------------------------------------
+def clean_text(text: Optional[str], stamp_missing: bool = False) -> str:
+    """
+    Text ohne angehängten Zeitstempel ('…\\n17:34 31/8/2025'). Eine letzte Zeile nur mit
+    Uhrzeit gilt bloß dann als Stempel, wenn die Karte keinen eigenen hat (stamp_missing).
+    """
+    out = RE_TS_SUFFIX.sub("", (text or "").strip())
+    if stamp_missing:
+        out = RE_TIME_SUFFIX.sub("", out)
+    return out.strip()
+
+def msg_key(direction: str, text: str, ts: Optional[str], conv_id: Optional[str] = None) -> str:
+    """
+    Identität einer Nachricht über überlappende Snapshots hinweg (ts im ISO-Format).
+    Ohne conv_id bleibt der Schlüssel wie bisher, mit conv_id kollidieren gleiche
+    Texte zur selben Minute in verschiedenen Unterhaltungen nicht mehr.
+    """
+    raw = f"{direction}\x1f{ts or ''}\x1f{text}"
+    if conv_id:
+        raw = f"{conv_id}\x1e{raw}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+@dataclass(frozen=True)
+class MessageRecord:
+    direction: str              # 'in' | 'out'
+    text: str                   # bereinigt
+    ts_epoch: Optional[int]     # Wanduhrzeit in Sekunden, None = unbekannt
+    raw_ts: Optional[str]       # wie gelesen, z.B. '19:57 22/8/2025'
+
+    @property
+    def ts_iso(self) -> Optional[str]:
+        return epoch_to_iso(self.ts_epoch)
+
+    @property
+    def key(self) -> str:
+        return msg_key(self.direction, self.text, self.ts_iso)
+
+    def key_for(self, conv_id: Optional[str]) -> str:
+        return msg_key(self.direction, self.text, self.ts_iso, conv_id)
+
+def normalize_card(card: Dict[str, Any]) -> Optional[MessageRecord]:
+    """{'text', 'tsText', 'isMine'} -> MessageRecord (None bei leerem Text)."""
+    raw = card.get("text") or ""
+    raw_ts = card.get("tsText") or None
+    text = clean_text(raw, stamp_missing=raw_ts is None)
+    if not text:
+        return None
+    ts = parse_ts(raw_ts)
+    if ts is None and raw_ts is None:   # Stempel steht evtl. nur im Text
+        ts = parse_ts(raw.rsplit("\n", 1)[-1])
+    return MessageRecord("out" if card.get("isMine") else "in", text, ts, raw_ts)
+
+def normalize_cards(cards: Iterable[Dict[str, Any]]) -> List[MessageRecord]:
+    """
+    Stapel-Variante für Importe: jeder unterschiedliche Stempel wird nur einmal
+    geparst (Minutenauflösung -> sehr viele Wiederholungen), leere Karten fallen weg.
+    """
+    cards = [c for c in cards if isinstance(c, dict)]
+    stamps = {c.get("tsText") for c in cards if c.get("tsText")}
+    lookup = {s: parse_stamp(s) for s in stamps}
+    out: List[MessageRecord] = []
+    for c in cards:
+        raw = c.get("text") or ""
+        raw_ts = c.get("tsText") or None
+        text = clean_text(raw, stamp_missing=raw_ts is None)
+        if not text:
+            continue
+        if raw_ts is not None:
+            ts = lookup[raw_ts]
+        else:
+            ts = parse_ts(raw.rsplit("\n", 1)[-1])
+        out.append(MessageRecord("out" if c.get("isMine") else "in", text, ts, raw_ts))
+    return out
+
+# Mini-Benchmark: python -m app.normalize
+if __name__ == "__main__":
+    import time
+    cards = [{"text": f"Nachricht {i}\n{i % 24}:{i % 60:02d} {i % 28 + 1}/{i % 12 + 1}/2025",
+              "tsText": f"{i % 24}:{i % 60:02d} {i % 28 + 1}/{i % 12 + 1}/2025", "isMine": i % 2 == 0}
+             for i in range(1_000_000)]
+    t0 = time.perf_counter()
+    recs = normalize_cards(cards)
+    secs = time.perf_counter() - t0
+    print(f"{len(recs)} Karten in {secs:.2f}s ({len(recs) / secs:,.0f}/s)  Beispiel: {recs[1]}")
+    for s in ("19:57 22/8/2025", "7:05 1/9/2025", "25:00 1/1/2025", "12:00 31/2/2025", "17:18 3/9", ""):
+        print(f"   {s!r:20} -> {parse_ts(s)} {parse_ts_iso(s)}")
+    assert clean_text("Treffen wir uns um\n18:30") == "Treffen wir uns um\n18:30"
+    assert clean_text("Hallo\n17:34 31/8/2025") == "Hallo"
+    assert normalize_card({"text": "Hallo\n17:34", "tsText": ""}).text == "Hallo"
+    print("   ✅ Uhrzeit als letzte Zeile bleibt Text, wenn die Karte einen Stempel hat")
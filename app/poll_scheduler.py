@@ -0,0 +1,228 @@
+# app/poll_scheduler.py
+# Adaptive Abfrage-Intervalle je Unterhaltung statt festem sleep(15):
+#   - direkt nach eingehender Nachricht: kurz (MIN_INTERVAL)
+#   - ohne Aktivität: exponentiell länger (BACKOFF) bis MAX_INTERVAL
+#   - dazu ein Faktor aus dem Stunden-Histogramm der Unterhaltung (conversation_activity):
+#     zu Uhrzeiten, in denen das Gegenüber sonst schreibt, wird öfter nachgesehen.
+# Ein Heap (fällig, Unterhaltung) bedient beliebig viele Unterhaltungen aus einer Schleife.
+from __future__ import annotations
+import heapq, sqlite3, time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from . import metrics
+
+MIN_INTERVAL  = 3.0      # Sekunden nach frischer Aktivität
+BASE_INTERVAL = 15.0     # bisheriger fester Wert
+MAX_INTERVAL  = 600.0    # nachts/über Tage: höchstens alle 10 Minuten
+# Ohne Netz-Mitschnitt weckt nichts die Schleife vorzeitig – neue Nachrichten bzw. ein Wechsel
+# der Unterhaltung fallen erst bei der nächsten Abfrage auf. Dann höchstens so lange warten.
+DOM_MAX_INTERVAL = BASE_INTERVAL
+BACKOFF       = 1.6      # Faktor je Abfrage ohne Neues
+BIAS_RANGE    = (0.5, 3.0)   # Histogramm darf das Intervall höchstens so stark verkürzen/verlängern
+HIST_TTL      = 3600.0   # Histogramm je Unterhaltung so lange im Speicher
+
+# -------------------------------------------------------
+# Schema: Stunden-Histogramm eingehender Nachrichten (per Trigger gepflegt)
+# -------------------------------------------------------
+ACTIVITY_DDL = """
+    CREATE TABLE IF NOT EXISTS conversation_activity (
+        conv_id TEXT NOT NULL,             -- '' = ohne Dialogschlüssel
+        hour INTEGER NOT NULL,             -- 0..23 Wanduhrzeit (aus ts_epoch)
+        inbound INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (conv_id, hour)
+    )
+"""
+_ADD = """
+    INSERT INTO conversation_activity(conv_id, hour, inbound)
+    VALUES (COALESCE(new.conv_id, ''), (new.ts_epoch % 86400) / 3600, 1)
+    ON CONFLICT(conv_id, hour) DO UPDATE SET inbound = inbound + 1;
+"""
+_REMOVE = """
+    UPDATE conversation_activity SET inbound = inbound - 1
+    WHERE conv_id = COALESCE(old.conv_id, '') AND hour = (old.ts_epoch % 86400) / 3600;
+"""
+ACTIVITY_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS conversation_activity_ai AFTER INSERT ON messages
+        WHEN new.direction = 'in' AND new.ts_epoch IS NOT NULL BEGIN {_ADD} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS conversation_activity_ad AFTER DELETE ON messages
+        WHEN old.direction = 'in' AND old.ts_epoch IS NOT NULL BEGIN {_REMOVE} END""",
+    # Zuordnung zu einer Unterhaltung (user-039) o.ä.: alten Eintrag ab-, neuen aufbuchen
+    f"""CREATE TRIGGER IF NOT EXISTS conversation_activity_au_old AFTER UPDATE OF conv_id, direction, ts_epoch ON messages
+        WHEN old.direction = 'in' AND old.ts_epoch IS NOT NULL BEGIN {_REMOVE} END""",
+    f"""CREATE TRIGGER IF NOT EXISTS conversation_activity_au_new AFTER UPDATE OF conv_id, direction, ts_epoch ON messages
+        WHEN new.direction = 'in' AND new.ts_epoch IS NOT NULL BEGIN {_ADD} END""",
+]
+REBUILD_SQL = """
+    INSERT INTO conversation_activity(conv_id, hour, inbound)
+    SELECT COALESCE(conv_id, ''), (ts_epoch % 86400) / 3600, COUNT(*)
+    FROM messages WHERE direction = 'in' AND ts_epoch IS NOT NULL
+    GROUP BY 1, 2
+"""
+
+def ensure_activity(con: sqlite3.Connection) -> bool:
+    """Tabelle + Trigger anlegen; beim ersten Mal aus dem Bestand füllen (True)."""
+    existed = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='conversation_activity'"
+    ).fetchone() is not None
+    con.execute(ACTIVITY_DDL)
+    for stmt in ACTIVITY_TRIGGERS:
+        con.execute(stmt)
+    if not existed:
+        con.execute(REBUILD_SQL)
+    con.commit()
+    return not existed
+
+def load_histogram(con: sqlite3.Connection, conv_id: Optional[str]) -> List[int]:
+    hist = [0] * 24
+    for hour, n in con.execute(
+        "SELECT hour, inbound FROM conversation_activity WHERE conv_id=?", (conv_id or "",)
+    ):
+        if 0 <= hour < 24:
+            hist[hour] = max(n, 0)
+    return hist
+
+def hour_bias(hist: List[int], hour: int) -> float:
+    """
+    Faktor fürs Intervall: < 1 zu aktiven Uhrzeiten, > 1 zu ruhigen. Geglättet
+    (+1 je Stunde), damit wenige Nachrichten nicht gleich extreme Werte ergeben.
+    """
+    total = sum(hist)
+    if not total:
+        return 1.0
+    avg = (total + 24) / 24
+    weight = (hist[hour % 24] + 1) / avg
+    lo, hi = BIAS_RANGE
+    return min(max(1.0 / weight, lo), hi)
+
+# -------------------------------------------------------
+# Scheduler
+# -------------------------------------------------------
+@dataclass
+class ConvPoll:
+    interval: float = BASE_INTERVAL
+    idle_polls: int = 0
+    due: float = 0.0
+    hist: Optional[List[int]] = None
+    hist_at: float = 0.0
+
+class PollScheduler:
+    """
+    next_due() -> (Unterhaltung, Wartezeit); nach der Abfrage record(conv, neu, eingehend).
+    Die Uhr ist austauschbar (Tests), das Histogramm kommt über load_hist aus der DB.
+    """
+
+    def __init__(self, load_hist: Optional[Callable[[Optional[str]], List[int]]] = None,
+                 clock: Callable[[], float] = time.monotonic,
+                 hour: Callable[[], int] = lambda: datetime.now().hour):
+        self._load_hist = load_hist
+        self._clock = clock
+        self._hour = hour
+        self._convs: Dict[str, ConvPoll] = {}
+        self._heap: List[Tuple[float, str]] = []
+
+    def add(self, conv_id: Optional[str], due_in: float = 0.0):
+        key = conv_id or ""
+        if key in self._convs:
+            return
+        st = ConvPoll(due=self._clock() + due_in)
+        self._convs[key] = st
+        heapq.heappush(self._heap, (st.due, key))
+
+    def remove(self, conv_id: Optional[str]):
+        self._convs.pop(conv_id or "", None)   # Heap-Eintrag verfällt beim nächsten pop
+
+    def __len__(self) -> int:
+        return len(self._convs)
+
+    def next_due(self) -> Optional[Tuple[str, float]]:
+        """Nächste fällige Unterhaltung und Sekunden bis dahin (0 = jetzt)."""
+        while self._heap:
+            due, key = self._heap[0]
+            st = self._convs.get(key)
+            if st is None or st.due != due:   # entfernt oder neu eingeplant -> veraltet
+                heapq.heappop(self._heap)
+                continue
+            return key, max(due - self._clock(), 0.0)
+        return None
+
+    def pop_due(self) -> List[str]:
+        """Alle jetzt fälligen Unterhaltungen (O(fällige · log n))."""
+        now, out = self._clock(), []
+        while self._heap and self._heap[0][0] <= now:
+            due, key = heapq.heappop(self._heap)
+            st = self._convs.get(key)
+            if st is not None and st.due == due:
+                out.append(key)
+        return out
+
+    def _histogram(self, key: str, st: ConvPoll) -> Optional[List[int]]:
+        if self._load_hist is None:
+            return None
+        now = self._clock()
+        if st.hist is None or now - st.hist_at > HIST_TTL:
+            try:
+                st.hist, st.hist_at = self._load_hist(key or None), now
+            except sqlite3.Error:
+                st.hist, st.hist_at = None, now
+        return st.hist
+
+    def record(self, conv_id: Optional[str], activity: bool, inbound: bool = False,
+               max_interval: float = MAX_INTERVAL) -> float:
+        """
+        Ergebnis einer Abfrage eintragen und nächste planen. Rückgabe: neues Intervall (s).
+        max_interval: DOM_MAX_INTERVAL, solange der Verlauf aus dem DOM kommt (kein Wecken möglich).
+        """
+        key = conv_id or ""
+        if key not in self._convs:
+            self.add(key)
+        st = self._convs[key]
+        if inbound:
+            base, st.idle_polls = MIN_INTERVAL, 0
+            metrics.incr("poll.fast")
+        elif activity:
+            base, st.idle_polls = BASE_INTERVAL / 2, 0
+            metrics.incr("poll.active")
+        else:
+            st.idle_polls += 1
+            base = min(BASE_INTERVAL * BACKOFF ** (st.idle_polls - 1), max_interval)
+            metrics.incr("poll.backoff")
+        hist = self._histogram(key, st)
+        bias = hour_bias(hist, self._hour()) if hist else 1.0
+        interval = min(max(base * bias, MIN_INTERVAL), max_interval)
+        if inbound:
+            interval = MIN_INTERVAL   # gerade geschrieben -> Bias ignorieren
+        st.interval = interval
+        st.due = self._clock() + interval
+        heapq.heappush(self._heap, (st.due, key))
+        metrics.incr("poll.polls")
+        metrics.set_value("poll.interval_s", round(interval, 1))
+        metrics.set_value("poll.bias", round(bias, 2))
+        return interval
+
+    def interval(self, conv_id: Optional[str]) -> float:
+        st = self._convs.get(conv_id or "")
+        return st.interval if st else BASE_INTERVAL
+
+# Simulation: python -m app.poll_scheduler
+if __name__ == "__main__":
+    t = [0.0]
+    hist = [0] * 24
+    for h in (19, 20, 21, 22):
+        hist[h] = 30
+    for hour in (21, 4):
+        sched = PollScheduler(load_hist=lambda _c: hist, clock=lambda: t[0], hour=lambda: hour)
+        sched.add("a")
+        line = []
+        for step in range(12):
+            key, wait = sched.next_due()
+            t[0] += wait
+            inbound = step in (0, 6)
+            line.append(f"{sched.record(key, activity=inbound, inbound=inbound):.0f}")
+        print(f"   {hour:2d} Uhr: Intervalle (s) {' '.join(line)}")
+    dom = PollScheduler(clock=lambda: t[0])
+    waits = [dom.record("d", activity=False, max_interval=DOM_MAX_INTERVAL) for _ in range(12)]
+    assert max(waits) <= DOM_MAX_INTERVAL, waits
+    print(f"   DOM (ohne Wecken): höchstens {max(waits):.0f}s")
+    print(f"   Metriken: {metrics.format_line('poll.')}")
@@ -1,23 +1,23 @@
 # app/profile_extract.py
 from __future__ import annotations
-import os, re, sqlite3
+import os, re, sqlite3, sys
+from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Tuple, Dict
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DB_PATH  = os.path.join(BASE_DIR, "chat_brain.sqlite")
+from .db import connect
+from .migrations import migrate
 
 # -------------------------------------------------------
 # Hilfen: DB
 # -------------------------------------------------------
 def connect_db() -> sqlite3.Connection:
-    con = sqlite3.connect(DB_PATH)
-    con.row_factory = sqlite3.Row
-    return con
+    return connect(rows=True)
 
-def upsert_profile(con: sqlite3.Connection, side: str, **fields):
-    # side in ('me','peer')
-    cur = con.execute("SELECT id FROM profiles WHERE side=?", (side,))
+def upsert_profile(con: sqlite3.Connection, side: str, conv_id: Optional[str] = None, **fields):
+    # side in ('me','peer'); eine Zeile je (side, Unterhaltung), '' = ohne Schlüssel
+    key = conv_id or ""
+    cur = con.execute("SELECT id FROM profiles WHERE side=? AND conv_id=?", (side, key))
     row = cur.fetchone()
     now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
     if row:
@@ -28,21 +28,112 @@ def upsert_profile(con: sqlite3.Connection, side: str, **fields):
             vals.append(v)
         sets.append("updated_at=?")
         vals.append(now)
-        vals.append(side)
-        con.execute(f"UPDATE profiles SET {', '.join(sets)} WHERE side=?", vals)
+        vals += [side, key]
+        con.execute(f"UPDATE profiles SET {', '.join(sets)} WHERE side=? AND conv_id=?", vals)
     else:
-        cols = ["side", "updated_at"] + list(fields.keys())
-        vals = [side, now] + list(fields.values())
+        cols = ["side", "conv_id", "updated_at"] + list(fields.keys())
+        vals = [side, key, now] + list(fields.values())
         qs   = ",".join(["?"] * len(vals))
         con.execute(f"INSERT INTO profiles ({', '.join(cols)}) VALUES ({qs})", vals)
 
-def insert_dialog_info(con: sqlite3.Connection, key: str, value: str, confidence: float = 0.9):
+# dialog_info: ein Eintrag je (Unterhaltung, key, value) – Wiederholungen zählen nur hoch
+DIALOG_INFO_COLS = {
+    "conv_id": "TEXT NOT NULL DEFAULT ''",
+    "confidence": "REAL",
+    "created_at": "TEXT",
+    "first_seen": "TEXT",
+    "last_seen": "TEXT",
+    "occurrences": "INTEGER NOT NULL DEFAULT 1",
+}
+
+def ensure_dialog_info_store(con: sqlite3.Connection):
+    existing = {r[1] for r in con.execute("PRAGMA table_info(dialog_info)")}
+    if not existing:
+        con.execute("""
+            CREATE TABLE dialog_info (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                conv_id TEXT NOT NULL DEFAULT '',
+                key TEXT NOT NULL,
+                value TEXT,
+                confidence REAL,
+                created_at TEXT,
+                first_seen TEXT,
+                last_seen TEXT,
+                occurrences INTEGER NOT NULL DEFAULT 1
+            )
+        """)
+    else:
+        for col, ctype in DIALOG_INFO_COLS.items():
+            if col not in existing:
+                con.execute(f"ALTER TABLE dialog_info ADD COLUMN {col} {ctype}")
+    has_index = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='index' AND name='ux_dialog_info_conv_key_value'"
+    ).fetchone()
+    if not has_index:
+        compact_dialog_info(con)   # Dubletten müssen vor dem UNIQUE-Index weg
+        con.execute(
+            "CREATE UNIQUE INDEX ux_dialog_info_conv_key_value ON dialog_info(conv_id, key, value)"
+        )
+
+def compact_dialog_info(con: sqlite3.Connection) -> int:
+    """Fasst doppelte (conv_id, key, value)-Zeilen zu einer zusammen. Rückgabe: gelöschte Zeilen."""
+    cols = {r[1] for r in con.execute("PRAGMA table_info(dialog_info)")}
+    seen_expr = "COALESCE(first_seen, created_at" + (", updated_at" if "updated_at" in cols else "") + ")"
+    last_expr = "COALESCE(last_seen, created_at" + (", updated_at" if "updated_at" in cols else "") + ")"
+    con.execute("DROP TABLE IF EXISTS temp._dialog_info_groups")
+    con.execute(f"""
+        CREATE TEMP TABLE _dialog_info_groups AS
+        SELECT MIN(id) AS keep_id, COUNT(*) AS n,
+               MIN({seen_expr}) AS first_seen, MAX({last_expr}) AS last_seen,
+               SUM(COALESCE(occurrences, 1)) AS occ, MAX(confidence) AS conf
+        FROM dialog_info
+        GROUP BY conv_id, key, value
+    """)
+    con.execute("""
+        UPDATE dialog_info SET
+            first_seen  = (SELECT g.first_seen FROM _dialog_info_groups g WHERE g.keep_id = dialog_info.id),
+            last_seen   = (SELECT g.last_seen  FROM _dialog_info_groups g WHERE g.keep_id = dialog_info.id),
+            occurrences = (SELECT g.occ        FROM _dialog_info_groups g WHERE g.keep_id = dialog_info.id),
+            confidence  = (SELECT g.conf       FROM _dialog_info_groups g WHERE g.keep_id = dialog_info.id)
+        WHERE id IN (SELECT keep_id FROM _dialog_info_groups)
+    """)
+    cur = con.execute("DELETE FROM dialog_info WHERE id NOT IN (SELECT keep_id FROM _dialog_info_groups)")
+    con.execute("DROP TABLE temp._dialog_info_groups")
+    return cur.rowcount
+
+def upsert_dialog_info(con: sqlite3.Connection, conv_id: Optional[str], key: str, value: str,
+                       confidence: float = 0.9, count: int = 1):
     now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
     con.execute(
-        "INSERT INTO dialog_info (key, value, confidence, created_at) VALUES (?,?,?,?)",
-        (key, value, confidence, now)
+        "INSERT INTO dialog_info (conv_id, key, value, confidence, created_at, first_seen, last_seen, occurrences) "
+        "VALUES (?,?,?,?,?,?,?,?) "
+        "ON CONFLICT(conv_id, key, value) DO UPDATE SET "
+        "last_seen=excluded.last_seen, occurrences=occurrences+excluded.occurrences, "
+        "confidence=MAX(COALESCE(confidence, 0), excluded.confidence)",
+        (conv_id or "", key, value, confidence, now, now, now, count)
     )
 
+def get_dialog_infos(con: sqlite3.Connection, conv_id: Optional[str]) -> list[Tuple[str, str, int]]:
+    """Alle Fakten einer Unterhaltung – ein Index-Lookup über (conv_id, key, value)."""
+    return [tuple(r) for r in con.execute(
+        "SELECT key, value, occurrences FROM dialog_info WHERE conv_id=? ORDER BY key, value",
+        (conv_id or "",)
+    )]
+
+def profile_block(con: sqlite3.Connection, conv_id: Optional[str]) -> str:
+    """Kurzer Prompt-Block mit bekannten Fakten über das Gegenüber (leer, wenn nichts bekannt)."""
+    parts = []
+    row = con.execute(
+        "SELECT city, status, job, gender FROM profiles WHERE side='peer' AND conv_id=?", (conv_id or "",)
+    ).fetchone()
+    if row:
+        for label, val in zip(("Wohnort", "Status", "Beruf", "Geschlecht"), row):
+            if val:
+                parts.append(f"{label}: {val}")
+    for key, value, _ in get_dialog_infos(con, conv_id):
+        parts.append(f"{key}: {value}")
+    return "; ".join(parts)
+
 # -------------------------------------------------------
 # Extraktions-Heuristiken (vorsichtig und streng)
 # -------------------------------------------------------
@@ -56,6 +147,7 @@ CITY_PATTERNS = [
     re.compile(r"\b(?:ich\s*(?:wohne|lebe)\s*(?:in|bei)|aus|komme\s*aus)\s+([A-ZÄÖÜ][a-zäöüß\-]{2,})\b"),
     re.compile(r"\b(?:wohnhaft\s*in)\s+([A-ZÄÖÜ][a-zäöüß\-]{2,})\b"),
 ]
+RE_CITY_SHAPE = re.compile(r"^[A-ZÄÖÜ][a-zäöüß\-]{2,}$")
 # Wörter, die NIE Stadt sein können (um „allen“, „gut“ etc. auszuschließen)
 CITY_BLACKLIST = {"allen", "alles", "gut", "bisschen", "heute", "morgen", "gestern"}
 
@@ -67,6 +159,8 @@ STATUS_MAP: Dict[str, str] = {
     r"\bgetrennt\b": "getrennt",
     r"\bverwitwet\b": "verwitwet",
 }
+STATUS_PATTERNS = [(re.compile(pat), value) for pat, value in STATUS_MAP.items()]
+RE_STATUS_SINCE = re.compile(r"seit\s*(\d{1,2})\s*(jahr|jahren)")
 
 # 4) Beruf – nur sehr konservativ (Schlüsselwörter)
 JOB_HINT = re.compile(
@@ -109,17 +203,17 @@ def safe_city(text: str) -> Optional[str]:
         if "'" in city or " " in city:
             continue
         # sieht wie Name aus (Großbuchstabe gefolgt von Kleinbuchstaben)
-        if not re.match(r"^[A-ZÄÖÜ][a-zäöüß\-]{2,}$", city):
+        if not RE_CITY_SHAPE.match(city):
             continue
         return city
     return None
 
 def extract_status(text: str) -> Optional[str]:
     tl = text.lower()
-    for pat, value in STATUS_MAP.items():
-        if re.search(pat, tl):
+    for pat, value in STATUS_PATTERNS:
+        if pat.search(tl):
             # Dauer optional, z.B. "seit 3 jahren"
-            m = re.search(r"seit\s*(\d{1,2})\s*(jahr|jahren)", tl)
+            m = RE_STATUS_SINCE.search(tl)
             if m:
                 n = m.group(1)
                 return f"{value} seit {n} jahren"
@@ -157,108 +251,242 @@ def detect_phone_known(text: str) -> bool:
 def detect_address_known(text: str) -> bool:
     return bool(RE_ADDRESS_HINT.search(text)) and not bool(RE_INCEST.search(text))
 
+# -------------------------------------------------------
+# Kombinierter Extraktor: EIN Durchlauf pro Nachricht
+# -------------------------------------------------------
+@dataclass(frozen=True)
+class ProfileFacts:
+    incest: bool = False
+    contact: bool = False
+    meetup: bool = False
+    phone_known: bool = False
+    address_known: bool = False
+    city: Optional[str] = None
+    status: Optional[str] = None          # inkl. Dauer, z.B. 'single seit 3 jahren'
+    job: Optional[str] = None
+    gender: Optional[str] = None
+    wishes: Tuple[Tuple[str, str], ...] = ()
+
+_NO_FACTS = ProfileFacts()
+
+# Notwendige Teilstrings (kleingeschrieben) je Muster-Familie. Nur wenn einer davon
+# vorkommt, kann das exakte Muster treffen – sonst wird es gar nicht erst ausgeführt.
+_ANCHORS: Dict[str, Tuple[str, ...]] = {
+    "incest":  ("inzest", "stief", "schwester", "bruder", "mutter", "vater", "tochter", "sohn"),
+    "contact": ("whats", "telefon", "nummer", "mail", "instagram", "telegram", "snap"),
+    "meetup":  ("treffen", "date", "verabred", "real", "kaffee"),
+    "status":  ("single", "geschieden", "verheiratet", "getrennt", "verwitwet"),
+    "job":     ("ingenieur", "mechaniker", "handwerker", "arzt", "ärztin", "pfleger", "krankenschwester",
+                "fahrer", "koch", "köchin", "lehrer", "student", "informatiker", "entwickler",
+                "programmierer", "verk", "friseur", "bauarbeiter", "elektriker", "anwalt", "anwältin"),
+    "city":    ("wohne", "lebe", "aus", "wohnhaft"),
+    "gm":      ("mann", "männlich"),
+    "gf":      ("frau", "weiblich"),
+    "fplus":   ("freundschaft", "f+"),
+    "fest":    ("festes", "beziehung", "ernsthaft"),
+}
+# Kurze Formen, die als Teilstring überall vorkommen ('it' in 'mit', 'm 35', 'w40')
+RE_SHORT_TOKENS = re.compile(r"\b(?:it|m|w)(?:\s*\d{1,2})?\b")
+
+class ProfileExtractor:
+    """
+    Ein vorkompiliertes Objekt für alle Profil-Fakten einer Nachricht.
+    Der Text wird einmal kleingeschrieben; ein schneller Anker-Test entscheidet,
+    welche exakten Muster überhaupt laufen müssen. Die meisten Nachrichten
+    lösen nur ein oder zwei Familien aus. Ergebnis identisch zu den
+    Einzel-Extraktoren oben (siehe profile_selfcheck).
+    """
+    def __init__(self):
+        self._anchors = list(_ANCHORS.items())
+
+    def _families(self, low: str) -> set[str]:
+        fam = {name for name, keys in self._anchors if any(k in low for k in keys)}
+        for m in RE_SHORT_TOKENS.finditer(low):
+            first = m.group(0)[0]
+            fam.add({"i": "job", "m": "gm", "w": "gf"}[first])
+        return fam
+
+    def extract(self, text: str) -> ProfileFacts:
+        if not text:
+            return _NO_FACTS
+        low = text.lower()
+        fam = self._families(low)
+        if not fam:
+            return _NO_FACTS
+
+        if "incest" in fam and RE_INCEST.search(text):
+            return ProfileFacts(incest=True)
+        contact = "contact" in fam and bool(RE_CONTACT.search(text))
+        meetup = "meetup" in fam and bool(RE_MEETUP.search(text))
+        if contact or meetup:
+            return ProfileFacts(
+                contact=contact, meetup=meetup,
+                phone_known=bool(RE_PHONE.search(text)),
+                address_known=bool(RE_ADDRESS_HINT.search(text)),
+            )
+
+        status = extract_status(text) if "status" in fam else None
+        job = None
+        if "job" in fam:
+            m = JOB_HINT.search(text)
+            job = m.group(0).lower() if m else None
+        gender = None
+        if "gm" in fam and GENDER_M.search(text):
+            gender = "m"
+        elif "gf" in fam and GENDER_F.search(text):
+            gender = "w"
+        wishes = []
+        if "fplus" in fam and WISH_F_PLUS.search(text):
+            wishes.append(("sucht", "freundschaft_plus"))
+        if "fest" in fam and WISH_FEST.search(text):
+            wishes.append(("sucht", "festes"))
+        return ProfileFacts(
+            city=safe_city(text) if "city" in fam else None,
+            status=status, job=job, gender=gender, wishes=tuple(wishes),
+        )
+
+EXTRACTOR = ProfileExtractor()
+
 # -------------------------------------------------------
 # Kernlogik
 # -------------------------------------------------------
-def scan_recent_messages(con: sqlite3.Connection, max_msgs: int = 40) -> list[str]:
+def scan_recent_messages(con: sqlite3.Connection, max_msgs: int = 40, conv_id: Optional[str] = None) -> list[str]:
+    # Reihenfolge nach Nachrichtenzeit, nicht nach Einfügereihenfolge (Index conv_id, ts_epoch)
     cur = con.execute(
-        "SELECT text FROM messages ORDER BY id DESC LIMIT ?",
-        (max_msgs,)
+        "SELECT text FROM messages WHERE conv_id IS ? ORDER BY ts_epoch DESC, id DESC LIMIT ?",
+        (conv_id or None, max_msgs)
     )
     rows = cur.fetchall()
     # Neueste zuerst → wir verarbeiten absteigend
     return [r["text"] for r in rows if r["text"]]
 
+# -------------------------------------------------------
+# Inkrementelle Stufe (Wasserstand pro Unterhaltung)
+# -------------------------------------------------------
+def ensure_schema(con: sqlite3.Connection):
+    ensure_dialog_info_store(con)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS profile_watermarks (
+            conv_id TEXT PRIMARY KEY,            -- '' = ohne Dialogschlüssel
+            last_message_id INTEGER NOT NULL,    -- bis hierhin ausgewertet
+            updated_at TEXT
+        )
+    """)
+
+def extract_facts(text: str) -> Tuple[Dict[str, str], list[Tuple[str, str, float]]]:
+    """
+    Eine Nachricht auswerten.
+    Rückgabe: (Profilfelder, Dialog-Infos als (key, value, confidence)).
+    Streng: Inzest -> nichts; Treffen/Kontakt -> nur 'bekannt'-Markierungen.
+    """
+    facts = EXTRACTOR.extract(text)
+    fields: Dict[str, str] = {}
+    infos: list[Tuple[str, str, float]] = []
+    if facts.phone_known:
+        infos.append(("telefonnummer", "bekannt", 0.95))
+    if facts.address_known:
+        infos.append(("adresse", "bekannt", 0.90))
+    for name in ("city", "status", "job", "gender"):
+        val = getattr(facts, name)
+        if val:
+            fields[name] = val
+    for k, v in facts.wishes:
+        infos.append((k, v, 0.85))
+    return fields, infos
+
+def get_watermark(con: sqlite3.Connection, conv_id: Optional[str]) -> int:
+    row = con.execute(
+        "SELECT last_message_id FROM profile_watermarks WHERE conv_id=?", (conv_id or "",)
+    ).fetchone()
+    return row[0] if row else 0
+
+def set_watermark(con: sqlite3.Connection, conv_id: Optional[str], last_id: int):
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    con.execute(
+        "INSERT INTO profile_watermarks(conv_id, last_message_id, updated_at) VALUES (?,?,?) "
+        "ON CONFLICT(conv_id) DO UPDATE SET last_message_id=excluded.last_message_id, updated_at=excluded.updated_at",
+        (conv_id or "", last_id, now)
+    )
+
+def update_profile_incremental(con: sqlite3.Connection, conv_id: Optional[str] = None,
+                               batch: int = 500) -> int:
+    """
+    Wertet nur Nachrichten oberhalb des Wasserstands aus (eingehende = Gegenüber).
+    Merge: neuere Werte überschreiben ältere, fehlende Felder bleiben erhalten.
+    Sicher für Dauerbetrieb und Aufruf nach jeder neuen Nachricht. Rückgabe: Anzahl ausgewertet.
+    """
+    key = conv_id or ""
+    wm = get_watermark(con, key)
+    done = 0
+    while True:
+        rows = con.execute(   # Index (conv_id, id); unbekannte Unterhaltung = NULL
+            "SELECT id, direction, text FROM messages "
+            "WHERE conv_id IS ? AND id>? ORDER BY id LIMIT ?",
+            (key or None, wm, batch)
+        ).fetchall()
+        if not rows:
+            break
+
+        fields: Dict[str, str] = {}
+        infos: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        for r in rows:
+            if r[1] != "in":   # eigene Nachrichten beschreiben nicht das Gegenüber
+                continue
+            f, di = extract_facts(r[2])
+            fields.update(f)   # Reihenfolge alt -> neu: neueste Angabe gewinnt
+            for k, v, conf in di:
+                infos[(k, v)] = (conf, infos.get((k, v), (conf, 0))[1] + 1)
+            done += 1
+
+        if fields:
+            upsert_profile(con, "peer", key, **fields)
+        for (k, v), (conf, n) in infos.items():
+            upsert_dialog_info(con, key, k, v, confidence=conf, count=n)
+        wm = rows[-1][0]
+        set_watermark(con, key, wm)
+        con.commit()
+        if len(rows) < batch:
+            break
+    return done
+
 def main():
     con = connect_db()
     try:
-        texts = scan_recent_messages(con, max_msgs=60)
-        if not texts:
+        migrate(con)
+        if len(sys.argv) > 1 and sys.argv[1] == "compact":
+            n = compact_dialog_info(con)
+            con.commit()
+            print(f"✅ dialog_info kompaktiert: {n} doppelte Zeilen entfernt.")
+            return
+        convs = [r[0] for r in con.execute("SELECT conv_id FROM conversation_stats ORDER BY conv_id")]
+        if not convs:
             print("ℹ️  Keine Nachrichten in DB – nichts zu extrahieren.")
             return
 
-        # Sammelcontainer
-        city: Optional[str] = None
-        status: Optional[str] = None
-        job: Optional[str] = None
-        gender: Optional[str] = None
-
-        phone_known = False
-        address_known = False
-        wishes_pairs: list[Tuple[str,str]] = []
-
-        # Streng: Inhalte mit Inzest oder Treffen/Kontakt nicht als Profil verwenden
-        for t in texts:
-            if RE_INCEST.search(t):
-                continue
-            if RE_CONTACT.search(t) or RE_MEETUP.search(t):
-                # nur Dialog-Info ggf. (phone/address), aber keine Profilfelder
-                if not phone_known and detect_phone_known(t):
-                    phone_known = True
-                if not address_known and detect_address_known(t):
-                    address_known = True
-                continue
-
-            if city is None:
-                c = safe_city(t)
-                if c:
-                    city = c
-
-            if status is None:
-                s = extract_status(t)
-                if s:
-                    status = s
-
-            if job is None:
-                j = extract_job(t)
-                if j:
-                    job = j
-
-            if gender is None:
-                g = extract_gender(t)
-                if g:
-                    gender = g
-
-            # Wünsche (Dialog-Info)
-            wishes_pairs.extend(extract_wishes(t))
-
-        # In DB schreiben (nur was wir sicher haben)
-        changed = False
-        fields = {}
-        if city:   fields["city"] = city; changed = True
-        if status: fields["status"] = status; changed = True
-        if job:    fields["job"] = job; changed = True
-        if gender: fields["gender"] = gender; changed = True
-        if changed:
-            upsert_profile(con, side="peer", **fields)
-
-        # Dialog-Infos eintragen
-        if phone_known:
-            insert_dialog_info(con, "telefonnummer", "bekannt", confidence=0.95)
-        if address_known:
-            insert_dialog_info(con, "adresse", "bekannt", confidence=0.90)
-        for k, v in wishes_pairs:
-            insert_dialog_info(con, k, v, confidence=0.85)
-
-        con.commit()
+        total = 0
+        for conv in convs:
+            total += update_profile_incremental(con, conv)
+        if not total:
+            print("ℹ️  Keine neuen Nachrichten seit dem letzten Lauf.")
+            return
 
         # Ausgabe
-        print("✅ Profil- und Dialog-Infos aktualisiert.")
+        print(f"✅ Profil- und Dialog-Infos aktualisiert ({total} neue Nachrichten ausgewertet).")
         # Profil zeigen
-        cur = con.execute("SELECT side, name, city, status, job, gender, updated_at FROM profiles WHERE side='peer'")
-        pr = cur.fetchone()
-        if pr:
-            print(f"   side={pr['side']}  city={pr['city'] or '-'}  status={pr['status'] or '-'}  job={pr['job'] or '-'}  gender={pr['gender'] or '-'}  updated={pr['updated_at']}")
-        else:
+        cur = con.execute("SELECT conv_id, name, city, status, job, gender, updated_at FROM profiles WHERE side='peer' ORDER BY conv_id")
+        profs = cur.fetchall()
+        for pr in profs:
+            print(f"   [{pr['conv_id'] or '-'}] name={pr['name'] or '-'}  city={pr['city'] or '-'}  status={pr['status'] or '-'}  job={pr['job'] or '-'}  gender={pr['gender'] or '-'}  updated={pr['updated_at']}")
+        if not profs:
             print("   peer-Profil: (noch leer)")
 
         # Dialog-Infos zeigen (nur letzte 10)
-        cur = con.execute("SELECT key, value, confidence, created_at FROM dialog_info ORDER BY id DESC LIMIT 10")
+        cur = con.execute("SELECT conv_id, key, value, confidence, occurrences, last_seen FROM dialog_info ORDER BY last_seen DESC LIMIT 10")
         rows = cur.fetchall()
         if rows:
-            print("   Dialog-Infos (neueste):")
+            print("   Dialog-Infos (zuletzt gesehen):")
             for r in rows:
-                print(f"     - {r['key']} = {r['value']} (conf {r['confidence']:.2f}) {r['created_at']}")
+                print(f"     - [{r['conv_id'] or '-'}] {r['key']} = {r['value']} (conf {r['confidence'] or 0:.2f}, {r['occurrences']}x) {r['last_seen']}")
         else:
             print("   Keine neuen Dialog-Infos.")
     finally:
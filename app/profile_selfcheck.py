@@ -0,0 +1,79 @@
+# app/profile_selfcheck.py
+# Prüft, dass der kombinierte Extraktor exakt dasselbe liefert wie die
+# Einzel-Extraktoren, und misst die Kosten pro Nachricht auf dem Archiv.
+from __future__ import annotations
+import glob, json, os, sqlite3, sys, time
+from typing import List
+
+from app.profile_extract import (
+    DB_PATH, EXTRACTOR, ProfileFacts, RE_CONTACT, RE_INCEST, RE_MEETUP,
+    detect_address_known, detect_phone_known, extract_gender, extract_job,
+    extract_status, extract_wishes, safe_city,
+)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    "Ich bin Elektriker und seit 3 Jahren geschieden.",
+    "Komme aus Coburg, bin single seit 12 jahren, m 45",
+    "Meine Schwester ist Lehrerin",
+    "Schreib mir auf WhatsApp 0176 1234567, wohne in der Hauptstrasse",
+    "Ich suche was Festes, keine Freundschaft plus.",
+    "Verheiratet aber getrennt, ich bin frau",
+    "Ich bin Krankenschwester und weiblich",
+    "",
+]
+
+def reference(text: str) -> ProfileFacts:
+    """So wie die alte main()-Schleife die Einzel-Extraktoren kombiniert hat."""
+    if not text:
+        return ProfileFacts()
+    if RE_INCEST.search(text):
+        return ProfileFacts(incest=True)
+    contact, meetup = bool(RE_CONTACT.search(text)), bool(RE_MEETUP.search(text))
+    if contact or meetup:
+        return ProfileFacts(contact=contact, meetup=meetup,
+                            phone_known=detect_phone_known(text),
+                            address_known=detect_address_known(text))
+    return ProfileFacts(city=safe_city(text), status=extract_status(text), job=extract_job(text),
+                        gender=extract_gender(text), wishes=tuple(extract_wishes(text)))
+
+def load_texts(db_path: str) -> List[str]:
+    texts: List[str] = list(CASES)
+    if os.path.exists(db_path):
+        con = sqlite3.connect(db_path)
+        texts += [r[0] for r in con.execute("SELECT text FROM messages")]
+        con.close()
+    for path in sorted(glob.glob(os.path.join(BASE_DIR, "logs", "history_*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        msgs = data.get("messages", []) if isinstance(data, dict) else data
+        texts += [m.get("text") or "" for m in msgs if isinstance(m, dict)]
+    return texts
+
+def main():
+    texts = load_texts(sys.argv[1] if len(sys.argv) > 1 else DB_PATH)
+    print(f"Starte profile_selfcheck auf {len(texts)} Texten…\n")
+
+    diffs = 0
+    for t in texts:
+        a, b = reference(t), EXTRACTOR.extract(t)
+        if a != b:
+            diffs += 1
+            if diffs <= 5:
+                print(f"❌ Abweichung: {t[:80]!r}\n   alt : {a}\n   neu : {b}")
+    print(f"Abweichungen: {diffs}")
+
+    for label, fn in (("Einzel-Extraktoren", reference), ("ProfileExtractor", EXTRACTOR.extract)):
+        t0 = time.perf_counter()
+        for _ in range(5):
+            for t in texts:
+                fn(t)
+        us = (time.perf_counter() - t0) / (5 * len(texts)) * 1e6
+        print(f"   {label:20s}: {us:6.1f} µs / Nachricht")
+
+    assert diffs == 0, "Kombinierter Extraktor weicht ab"
+    print("\n✅ profile_selfcheck fertig.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+# app/provider_router.py
+# Routing zwischen KI-Providern (z.B. Kobold lokal, Gemini online):
+#   - Gesundheit je Provider: EWMA von Latenz und Fehlerquote, p95 der letzten Antworten
+#   - Circuit Breaker: nach FAIL_THRESHOLD Fehlern in Folge COOLDOWN Sekunden gesperrt,
+#     danach genau ein Probeaufruf (half-open)
+#   - Hedging: braucht der erste Provider länger als sein p95, läuft parallel der zweite;
+#     die erste brauchbare Antwort gewinnt, der Verlierer wird abgebrochen (abort) bzw. verworfen
+#   - Fällt der erste aus (None/Exception), sofort der zweite (Failover)
+#
+# Bewusst ohne Abhängigkeiten (nur stdlib) – Provider sind einfache Funktionen
+# (history, system_rules, user_message) -> Optional[str]. Offline-Test: app/router_selfcheck.py
+from __future__ import annotations
+import threading, time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from . import metrics
+
+ReplyFn = Callable[[list, str, str], Optional[str]]
+
+ALPHA          = 0.2     # Gewicht neuer Messungen in der EWMA
+FAIL_THRESHOLD = 3       # Fehler in Folge bis der Breaker öffnet
+COOLDOWN       = 60.0    # Sekunden gesperrt, danach Probeaufruf
+HEDGE_DEFAULT  = 20.0    # Hedge-Zeitpunkt, solange noch kein p95 bekannt ist
+HEDGE_MIN      = 2.0     # nie früher hedgen (spart doppelte Kosten bei schnellen Antworten)
+P95_SAMPLES    = 50      # Fenster für p95
+P95_MIN        = 5       # ab so vielen Messungen gilt das p95
+
+@dataclass
+class Health:
+    ewma_latency: Optional[float] = None
+    ewma_error: float = 0.0
+    failures: int = 0                      # in Folge
+    state: str = "closed"                  # closed | open | half_open
+    open_until: float = 0.0
+    trial: bool = False                    # Probeaufruf im half-open-Zustand läuft
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=P95_SAMPLES))
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < P95_MIN:
+            return None
+        xs = sorted(self.latencies)
+        return xs[min(int(0.95 * len(xs)), len(xs) - 1)]
+
+@dataclass
+class Provider:
+    name: str
+    generate: ReplyFn
+    abort: Optional[Callable[[], None]] = None   # laufende Generierung abbrechen (z.B. Kobold /api/extra/abort)
+    health: Health = field(default_factory=Health)
+
+class Router:
+    """
+    submit(...) -> Future mit der Antwort (oder None); generate(...) wartet darauf.
+    Die Reihenfolge der Provider ist die Priorität; der Zweite dient als Hedge/Failover.
+    """
+
+    def __init__(self, providers: Sequence[Provider], hedge_default: float = HEDGE_DEFAULT,
+                 hedge_min: float = HEDGE_MIN, cooldown: float = COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.providers: List[Provider] = list(providers)
+        self.hedge_default = hedge_default
+        self.hedge_min = hedge_min
+        self.cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Getrennte Pools: Koordination wartet auf Aufrufe, Aufrufe warten auf nichts -> kein Deadlock;
+        # nicht abbrechbare Verlierer (Gemini) belegen höchstens Aufruf-Threads
+        self._routes = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ki-route")
+        self._calls = ThreadPoolExecutor(max_workers=4 * len(self.providers), thread_name_prefix="ki-call")
+        self.last_winner: Optional[str] = None
+
+    # --- Gesundheit ---
+    def _allow(self, p: Provider, claim: bool = True) -> bool:
+        """Darf p aufgerufen werden? claim=True belegt im half-open-Zustand den einen Probeaufruf."""
+        h = p.health
+        with self._lock:
+            if h.state == "closed":
+                return True
+            if h.state == "open" and self._clock() >= h.open_until:
+                h.state, h.trial = "half_open", False
+            if h.state == "half_open" and not h.trial:
+                h.trial = claim
+                return True
+            return False
+
+    def _record(self, p: Provider, ok: bool, latency: float):
+        h = p.health
+        with self._lock:
+            h.ewma_error = ALPHA * (0.0 if ok else 1.0) + (1 - ALPHA) * h.ewma_error
+            if ok:
+                h.latencies.append(latency)
+                h.ewma_latency = latency if h.ewma_latency is None else ALPHA * latency + (1 - ALPHA) * h.ewma_latency
+                h.failures, h.state, h.trial = 0, "closed", False
+            else:
+                h.failures += 1
+                if h.state == "half_open" or h.failures >= FAIL_THRESHOLD:
+                    if h.state != "open":
+                        metrics.incr(f"router.{p.name}.breaker_open")
+                        print(f"⚡ KI-Provider '{p.name}' gesperrt für {self.cooldown:g}s "
+                              f"({h.failures} Fehler in Folge).")
+                    h.state, h.open_until, h.trial = "open", self._clock() + self.cooldown, False
+        if h.ewma_latency is not None:
+            metrics.set_value(f"router.{p.name}.ewma_s", round(h.ewma_latency, 2))
+        metrics.set_value(f"router.{p.name}.err", round(h.ewma_error, 2))
+
+    def hedge_delay(self, p: Provider) -> float:
+        p95 = p.health.p95()
+        return self.hedge_default if p95 is None else max(p95, self.hedge_min)
+
+    def status(self) -> str:
+        parts = []
+        for p in self.providers:
+            h = p.health
+            lat = f"{h.ewma_latency:.1f}s" if h.ewma_latency is not None else "-"
+            parts.append(f"{p.name}: {h.state}, Ø {lat}, Fehler {h.ewma_error:.0%}")
+        return " | ".join(parts)
+
+    # --- Aufrufe ---
+    def _call(self, p: Provider, args: Tuple, cancelled: threading.Event) -> Optional[str]:
+        t0 = self._clock()
+        try:
+            res = p.generate(*args)
+        except Exception as e:
+            print(f"⚠️ KI-Provider '{p.name}': {e}")
+            res = None
+        if not cancelled.is_set():   # abgebrochene Verlierer verfälschen die Statistik nicht
+            self._record(p, bool(res), self._clock() - t0)
+        return res or None
+
+    def _route(self, args: Tuple) -> Optional[str]:
+        candidates = [p for p in self.providers if self._allow(p, claim=False)]
+        if not candidates:
+            metrics.incr("router.rejected")
+            print(f"⛔ Kein KI-Provider verfügbar ({self.status()}).")
+            return None
+        running: Dict[Future, Tuple[Provider, threading.Event]] = {}
+
+        def start(p: Provider) -> Optional[Future]:
+            if not self._allow(p):   # inzwischen gesperrt bzw. Probeaufruf schon vergeben
+                return None
+            ev = threading.Event()
+            f = self._calls.submit(self._call, p, args, ev)
+            running[f] = (p, ev)
+            return f
+
+        backups = list(candidates)
+        while backups and not start(backups[0]):
+            backups.pop(0)
+        if not running:
+            metrics.incr("router.rejected")
+            return None
+        hedge_at = self._clock() + self.hedge_delay(backups.pop(0))
+        pending = set(running)
+        while pending or backups:
+            timeout = max(hedge_at - self._clock(), 0.0) if backups else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for f in done:
+                res = f.result()
+                if res:
+                    winner = running[f][0]
+                    self._cancel_others(running, f)
+                    self.last_winner = winner.name
+                    metrics.incr(f"router.won.{winner.name}")
+                    return res
+            if backups and (not pending or self._clock() >= hedge_at):
+                metrics.incr("router.failover" if not pending else "router.hedged")
+                nxt = backups.pop(0)
+                f = start(nxt)
+                if f is not None:
+                    pending.add(f)
+                    hedge_at = self._clock() + self.hedge_delay(nxt)
+        metrics.incr("router.failed")
+        return None
+
+    def _cancel_others(self, running: Dict[Future, Tuple[Provider, threading.Event]], winner: Future):
+        for f, (p, ev) in running.items():
+            if f is winner or f.done():
+                continue
+            ev.set()
+            metrics.incr(f"router.cancelled.{p.name}")
+            if p.abort is not None:
+                try:
+                    p.abort()
+                except Exception:
+                    pass   # Abbruch ist best effort – das Ergebnis wird ohnehin verworfen
+
+    def submit(self, history, system_rules: str, user_message: str) -> "Future[Optional[str]]":
+        return self._routes.submit(self._route, (history, system_rules, user_message))
+
+    def generate(self, history, system_rules: str, user_message: str) -> Optional[str]:
+        return self.submit(history, system_rules, user_message).result()
@@ -0,0 +1,225 @@
+# app/reprocess.py
+# Offline-Neuberechnung über das GANZE Nachrichten-Archiv (nach Änderungen an
+# intent_detector, rules oder profile_extract): Intent, Gefühle, Regel-Flags und
+# Profil-Fakten je Nachricht -> Tabelle message_analysis.
+#
+# Ablauf: Blöcke per Keyset (id > letzte id) aus SQLite lesen, auf einen
+# ProcessPoolExecutor verteilen, Ergebnisse in Reihenfolge zurückschreiben –
+# ein Block = eine Transaktion inkl. Checkpoint. Abbruch -> einfach neu starten.
+#
+#   python -m app.reprocess                 # fortsetzen bzw. neu anfangen
+#   python -m app.reprocess --restart       # Checkpoint verwerfen, alles neu
+#   python -m app.reprocess --workers 4 --chunk 5000
+from __future__ import annotations
+import argparse, json, os, sqlite3, time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import fields
+from datetime import datetime
+from typing import Deque, List, Optional, Tuple
+
+from .db import DB_PATH
+from .intent_detector import detect_intent
+from .migrations import migrate
+from .profile_extract import EXTRACTOR
+from .rules import RE_CONTACTS, RE_FAREWELL, RE_LINK, RE_MEETUP, RE_SEXUAL_TRIGGERS, is_incest_block
+
+
+JOB_NAME         = "analysis"
+ANALYSIS_VERSION = 1       # hochzählen, wenn sich die Auswertung ändert
+CHUNK_SIZE       = 2000    # Nachrichten pro Block (= pro Transaktion)
+INFLIGHT_PER_WORKER = 2    # so viele Blöcke pro Prozess gleichzeitig unterwegs
+
+Row = Tuple[int, str, str]   # (id, direction, text)
+
+# -------------------------------------------------------
+# Schema
+# -------------------------------------------------------
+def ensure_schema(con: sqlite3.Connection):
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS message_analysis (
+            message_id INTEGER PRIMARY KEY,   -- = messages.id
+            intent TEXT,
+            confidence REAL,
+            labels TEXT,                      -- kommagetrennt
+            feelings TEXT,                    -- kommagetrennt (feelings_lex-Kategorien)
+            flags TEXT,                       -- kommagetrennt: gesetzte Regel-Flags
+            facts TEXT,                       -- JSON, nur gefüllte Profil-Fakten
+            version INTEGER NOT NULL,
+            processed_at TEXT
+        )
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS reprocess_checkpoints (
+            job TEXT PRIMARY KEY,
+            last_message_id INTEGER NOT NULL,
+            rows_done INTEGER NOT NULL,
+            version INTEGER NOT NULL,
+            updated_at TEXT
+        )
+    """)
+    con.commit()
+
+def get_checkpoint(con: sqlite3.Connection, job: str) -> Tuple[int, int]:
+    """(letzte id, bisher verarbeitet). Andere Version -> von vorn."""
+    row = con.execute(
+        "SELECT last_message_id, rows_done, version FROM reprocess_checkpoints WHERE job=?", (job,)
+    ).fetchone()
+    if not row or row[2] != ANALYSIS_VERSION:
+        return 0, 0
+    return row[0], row[1]
+
+def set_checkpoint(con: sqlite3.Connection, job: str, last_id: int, rows_done: int):
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    con.execute(
+        "INSERT INTO reprocess_checkpoints(job, last_message_id, rows_done, version, updated_at) "
+        "VALUES (?,?,?,?,?) ON CONFLICT(job) DO UPDATE SET last_message_id=excluded.last_message_id, "
+        "rows_done=excluded.rows_done, version=excluded.version, updated_at=excluded.updated_at",
+        (job, last_id, rows_done, ANALYSIS_VERSION, now)
+    )
+
+def clear_checkpoint(con: sqlite3.Connection, job: str):
+    con.execute("DELETE FROM reprocess_checkpoints WHERE job=?", (job,))
+    con.commit()
+
+# -------------------------------------------------------
+# Auswertung (läuft in den Worker-Prozessen)
+# -------------------------------------------------------
+_FEELINGS: List[Tuple[str, str]] = []   # (token, kategorie), pro Prozess einmal geladen
+
+def load_feelings(lex_path: str) -> List[Tuple[str, str]]:
+    if not os.path.exists(lex_path):
+        return []
+    con = sqlite3.connect(lex_path)
+    try:
+        rows = con.execute("SELECT token, category FROM feelings_lex").fetchall()
+    except sqlite3.OperationalError:
+        rows = []   # Lexikon noch nicht angelegt (Migration 3)
+    finally:
+        con.close()
+    return [(tok.lower(), cat) for tok, cat in rows if tok]
+
+def init_worker(lex_path: str):
+    """Initializer des Pools: Lexikon einmal pro Prozess laden statt pro Block."""
+    global _FEELINGS
+    _FEELINGS = load_feelings(lex_path)
+
+def detect_feelings(low: str) -> List[str]:
+    return sorted({cat for tok, cat in _FEELINGS if tok in low})
+
+def rule_flags(text: str) -> List[str]:
+    flags = []
+    if is_incest_block(text):       flags.append("incest_block")
+    if RE_CONTACTS.search(text):    flags.append("has_contacts")
+    if RE_MEETUP.search(text):      flags.append("has_meetup")
+    if RE_LINK.search(text):        flags.append("has_link")
+    if RE_SEXUAL_TRIGGERS.search(text): flags.append("sexual_trigger")
+    if RE_FAREWELL.search(text):    flags.append("had_farewell")
+    return flags
+
+def analyze_message(direction: str, text: str) -> Tuple[str, float, str, str, str, Optional[str]]:
+    text = text or ""
+    res = detect_intent(text)
+    facts = None
+    if direction == "in":   # Profil-Fakten beschreiben nur das Gegenüber
+        f = EXTRACTOR.extract(text)
+        d = {fl.name: getattr(f, fl.name) for fl in fields(f) if getattr(f, fl.name)}
+        if d:
+            facts = json.dumps(d, ensure_ascii=False)
+    return (res.intent, res.confidence, ",".join(res.labels),
+            ",".join(detect_feelings(text.lower())), ",".join(rule_flags(text)), facts)
+
+def analyze_chunk(rows: List[Row]) -> List[tuple]:
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    return [(mid, *analyze_message(direction, text), ANALYSIS_VERSION, now) for mid, direction, text in rows]
+
+# -------------------------------------------------------
+# Treiber (Hauptprozess: lesen + schreiben)
+# -------------------------------------------------------
+def iter_chunks(con: sqlite3.Connection, after_id: int, chunk: int):
+    """Keyset-Paging über den Primärschlüssel – kein OFFSET, konstant schnell."""
+    last = after_id
+    while True:
+        rows = con.execute(
+            "SELECT id, direction, text FROM messages WHERE id>? ORDER BY id LIMIT ?", (last, chunk)
+        ).fetchall()
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield rows
+
+def write_results(con: sqlite3.Connection, job: str, results: List[tuple], rows_done: int):
+    con.execute("BEGIN")
+    con.executemany(
+        "INSERT OR REPLACE INTO message_analysis"
+        "(message_id, intent, confidence, labels, feelings, flags, facts, version, processed_at) "
+        "VALUES (?,?,?,?,?,?,?,?,?)", results
+    )
+    set_checkpoint(con, job, results[-1][0], rows_done)
+    con.execute("COMMIT")
+
+def reprocess(db_path: str = DB_PATH, workers: Optional[int] = None, chunk: int = CHUNK_SIZE,
+              job: str = JOB_NAME, restart: bool = False, lex_path: Optional[str] = None) -> int:
+    """Verarbeitet alles oberhalb des Checkpoints. Rückgabe: Anzahl Nachrichten in diesem Lauf."""
+    workers = workers or os.cpu_count() or 1
+    lex_path = lex_path or db_path   # feelings_lex liegt in derselben DB
+    con = sqlite3.connect(db_path, isolation_level=None)   # Transaktionen selbst steuern
+    con.execute("PRAGMA synchronous = NORMAL")
+    try:
+        migrate(con)
+        ensure_schema(con)
+        if restart:
+            clear_checkpoint(con, job)
+        after_id, rows_done = get_checkpoint(con, job)
+        total = con.execute("SELECT COUNT(*) FROM messages WHERE id>?", (after_id,)).fetchone()[0]
+        if not total:
+            print("ℹ️  Nichts zu tun – Archiv ist auf dem Stand des Checkpoints.")
+            return 0
+        if after_id:
+            print(f"↪️  Setze fort nach id {after_id} ({rows_done} bereits erledigt).")
+        print(f"🔁 Verarbeite {total} Nachrichten mit {workers} Prozess(en), Blockgröße {chunk}…")
+
+        done, t0 = 0, time.perf_counter()
+
+        def _flush(results: List[tuple]):
+            nonlocal done, rows_done
+            done += len(results)
+            rows_done += len(results)
+            write_results(con, job, results, rows_done)
+            rate = done / max(time.perf_counter() - t0, 1e-9)
+            print(f"   {done}/{total}  ({rate:,.0f} Zeilen/s)", end="\r", flush=True)
+
+        if workers == 1:
+            init_worker(lex_path)
+            for rows in iter_chunks(con, after_id, chunk):
+                _flush(analyze_chunk(rows))
+        else:
+            # Blöcke der Reihe nach einsammeln, damit der Checkpoint nie eine Lücke überspringt
+            inflight: Deque[Future] = deque()
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                     initargs=(lex_path,)) as pool:
+                for rows in iter_chunks(con, after_id, chunk):
+                    inflight.append(pool.submit(analyze_chunk, rows))
+                    if len(inflight) >= workers * INFLIGHT_PER_WORKER:
+                        _flush(inflight.popleft().result())
+                while inflight:
+                    _flush(inflight.popleft().result())
+
+        secs = time.perf_counter() - t0
+        print(f"\n✅ {done} Nachrichten in {secs:.1f}s neu ausgewertet ({done / max(secs, 1e-9):,.0f} Zeilen/s).")
+        return done
+    finally:
+        con.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Archiv neu auswerten (Intent, Gefühle, Regeln, Profil-Fakten).")
+    ap.add_argument("db", nargs="?", default=DB_PATH)
+    ap.add_argument("--workers", type=int, default=None, help="Prozesse (Standard: alle Kerne)")
+    ap.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="Nachrichten pro Block/Transaktion")
+    ap.add_argument("--job", default=JOB_NAME, help="Name des Checkpoints")
+    ap.add_argument("--restart", action="store_true", help="Checkpoint verwerfen und von vorn beginnen")
+    args = ap.parse_args()
+    reprocess(args.db, workers=args.workers, chunk=args.chunk, job=args.job, restart=args.restart)
+
+if __name__ == "__main__":
+    main()
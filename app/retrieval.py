@@ -0,0 +1,154 @@
+# app/retrieval.py
+# Passende ältere Nachrichten derselben Unterhaltung finden (SQLite FTS5 + BM25).
+# Der Volltext-Index wird über Trigger auf 'messages' automatisch mitgeführt.
+from __future__ import annotations
+import re, sqlite3, time
+from typing import Dict, Iterable, List, Optional
+
+from . import metrics
+
+MAX_TERMS      = 12    # höchstens so viele Suchwörter aus der eingehenden Nachricht
+MAX_HIT_CHARS  = 200   # Treffer im Prompt kürzen
+
+# Häufige Wörter bringen für die Relevanz nichts und machen die Suche nur langsam
+STOPWORDS = {
+    "aber", "alle", "als", "also", "auch", "auf", "aus", "bei", "bin", "bis", "bist", "das", "dass",
+    "dein", "deine", "dem", "den", "der", "des", "dich", "die", "dir", "doch", "dort", "drei", "du",
+    "ein", "eine", "einem", "einen", "einer", "es", "für", "gar", "gibt", "hab", "habe", "hast",
+    "hat", "hatte", "ich", "ihr", "ist", "jetzt", "kann", "mal", "man", "mein", "meine", "mich",
+    "mir", "mit", "nach", "nicht", "noch", "nur", "oder", "schon", "sehr", "sein", "sich", "sie",
+    "sind", "so", "und", "uns", "viel", "vom", "von", "war", "was", "weil", "wenn", "wie", "wir",
+    "wird", "zum", "zur", "gut", "ganz", "heute", "hier", "einfach", "immer", "dann", "denn",
+}
+RE_WORD = re.compile(r"\w{3,}", re.UNICODE)
+
+# -------------------------------------------------------
+# Schema: FTS5-Index + Trigger
+# -------------------------------------------------------
+FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+        text, conv_id,
+        content='messages', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ai AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, text, conv_id) VALUES (new.id, new.text, new.conv_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_ad AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, text, conv_id)
+        VALUES ('delete', old.id, old.text, old.conv_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS messages_fts_au AFTER UPDATE OF text, conv_id ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, text, conv_id)
+        VALUES ('delete', old.id, old.text, old.conv_id);
+        INSERT INTO messages_fts(rowid, text, conv_id) VALUES (new.id, new.text, new.conv_id);
+    END
+    """,
+]
+
+def ensure_fts(con: sqlite3.Connection) -> bool:
+    """Legt Index + Trigger an. Beim ersten Mal wird der Bestand indexiert (True)."""
+    existed = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name='messages_fts'"
+    ).fetchone() is not None
+    for stmt in FTS_DDL:
+        con.execute(stmt)
+    if not existed:
+        con.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+    con.commit()
+    return not existed
+
+def rebuild_fts(con: sqlite3.Connection):
+    con.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+    con.commit()
+
+# -------------------------------------------------------
+# Suche
+# -------------------------------------------------------
+def build_match_query(text: str, conv_id: Optional[str] = None) -> Optional[str]:
+    terms: List[str] = []
+    for w in RE_WORD.findall((text or "").lower()):
+        if w in STOPWORDS or w.isdigit() or w in terms:
+            continue
+        terms.append(w)
+        if len(terms) >= MAX_TERMS:
+            break
+    if not terms:
+        return None
+    words = " OR ".join(f'"{t}"' for t in terms)
+    if conv_id:
+        phrase = conv_id.replace('"', '""')
+        return f'conv_id : "{phrase}" AND text : ({words})'
+    return f"text : ({words})"
+
+def retrieve_related(con: sqlite3.Connection, conv_id: Optional[str], text: str, k: int = 3,
+                     exclude_texts: Iterable[str] = ()) -> List[Dict[str, str]]:
+    """
+    Die k relevantesten älteren Nachrichten (BM25) derselben Unterhaltung.
+    exclude_texts: Texte, die ohnehin schon im Prompt stehen (aktuelles Fenster).
+    """
+    query = build_match_query(text, conv_id)
+    if not query:
+        return []
+    exclude = {(t or "").strip() for t in exclude_texts}
+    sql = (
+        "SELECT m.id, m.direction, m.text FROM messages_fts "
+        "JOIN messages m ON m.id = messages_fts.rowid "
+        "WHERE messages_fts MATCH ?"
+    )
+    sql += " AND m.conv_id IS ?"   # FTS-Phrase grenzt vor, hier exakt (NULL = unbekannt)
+    sql += " ORDER BY bm25(messages_fts) LIMIT ?"
+
+    t0 = time.perf_counter()
+    try:
+        rows = con.execute(sql, (query, conv_id or None, k + len(exclude))).fetchall()
+    except sqlite3.OperationalError:
+        return []   # kein Index (alte DB) oder ungültige Anfrage -> ohne Treffer weiter
+    metrics.set_value("retrieval.last_ms", (time.perf_counter() - t0) * 1000)
+    metrics.incr("retrieval.queries")
+
+    out: List[Dict[str, str]] = []
+    seen = set()
+    for _id, direction, body in rows:
+        body = (body or "").strip()
+        if body in exclude or body in seen:
+            continue
+        seen.add(body)
+        out.append({"id": _id, "direction": direction, "text": body})
+        if len(out) >= k:
+            break
+    return out
+
+def format_related(hits: List[Dict[str, str]]) -> str:
+    lines = []
+    for h in hits:
+        who = "Gegenüber" if h["direction"] == "in" else "Du"
+        txt = " ".join(h["text"].split())
+        if len(txt) > MAX_HIT_CHARS:
+            txt = txt[: MAX_HIT_CHARS - 1] + "…"
+        lines.append(f"- {who}: {txt}")
+    return "\n    ".join(lines)
+
+# Mini-Benchmark auf der echten DB
+if __name__ == "__main__":
+    import sys
+    from .db import DB_PATH
+    db = sys.argv[1] if len(sys.argv) > 1 else DB_PATH
+    con = sqlite3.connect(db)
+    if ensure_fts(con):
+        print("🆕 FTS-Index aufgebaut.")
+    n = con.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    probes = ["Was arbeitest du eigentlich?", "Wo wohnst du denn genau?", "Ich bin heute so müde von der Arbeit"]
+    for q in probes:
+        t0 = time.perf_counter()
+        hits = retrieve_related(con, None, q, k=3)
+        ms = (time.perf_counter() - t0) * 1000
+        print(f"{ms:7.2f} ms  ({n} Nachrichten)  {q!r} -> {len(hits)} Treffer")
+    con.close()
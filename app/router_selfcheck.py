@@ -0,0 +1,92 @@
+# app/router_selfcheck.py
+# Offline-Test des KI-Routers mit Fake-Providern (kein Kobold, kein Gemini nötig):
+# Hedging, Failover, Circuit Breaker, Abbruch des Verlierers.
+#   python -m app.router_selfcheck
+from __future__ import annotations
+import threading, time
+from typing import Optional
+
+from app import metrics
+from app.provider_router import Provider, Router
+
+class FakeProvider:
+    """Antwortet nach `latency` Sekunden – oder gar nicht (`down`). Zählt Aufrufe und Abbrüche."""
+
+    def __init__(self, name: str, latency: float, down: bool = False):
+        self.name, self.latency, self.down = name, latency, down
+        self.calls = 0
+        self.aborts = 0
+        self._abort = threading.Event()
+
+    def generate(self, history, system_rules, user_message) -> Optional[str]:
+        self.calls += 1
+        self._abort.clear()
+        if self._abort.wait(self.latency):   # abgebrochen
+            return None
+        return None if self.down else f"{self.name}: Antwort auf '{user_message}'"
+
+    def abort(self):
+        self.aborts += 1
+        self._abort.set()
+
+    def provider(self) -> Provider:
+        return Provider(self.name, self.generate, self.abort)
+
+def timed(router: Router, msg: str):
+    t0 = time.perf_counter()
+    res = router.generate([], "Regeln", msg)
+    return res, time.perf_counter() - t0
+
+def main():
+    print("Starte router_selfcheck…\n")
+
+    # 1) Gesunder, schneller Primär-Provider: kein Hedge
+    kobold, gemini = FakeProvider("kobold", 0.05), FakeProvider("gemini", 0.05)
+    r = Router([kobold.provider(), gemini.provider()], hedge_default=0.3, hedge_min=0.1, cooldown=0.5)
+    res, secs = timed(r, "hallo")
+    assert res and res.startswith("kobold") and gemini.calls == 0, res
+    print(f"✅ Primär schnell: {res!r} in {secs * 1000:.0f} ms, Gemini nicht gefragt")
+
+    # 2) Primär hängt: nach hedge_default parallel Gemini, Kobold wird abgebrochen
+    kobold.latency = 2.0
+    res, secs = timed(r, "bist du da?")
+    assert res and res.startswith("gemini") and kobold.aborts == 1 and secs < 1.0, (res, secs)
+    print(f"✅ Hedge: {res!r} nach {secs * 1000:.0f} ms, Kobold abgebrochen")
+
+    # 3) p95 aus echten Messungen: nach 5 schnellen Antworten hedgt der Router früher
+    kobold.latency = 0.05
+    for _ in range(5):
+        r.generate([], "Regeln", "x")
+    delay = r.hedge_delay(r.providers[0])
+    assert 0.1 <= delay < 0.3, delay
+    print(f"✅ Hedge-Zeitpunkt aus p95: {delay * 1000:.0f} ms (statt 300 ms Standard)")
+
+    # 4) Primär fällt aus: sofortiger Failover, nach 3 Fehlern Breaker offen
+    kobold.down, kobold.latency = True, 0.01
+    for i in range(3):
+        res, secs = timed(r, f"fehler {i}")
+        assert res and res.startswith("gemini") and secs < 0.2, (res, secs)
+    assert r.providers[0].health.state == "open"
+    calls = kobold.calls
+    res, _ = timed(r, "gesperrt")
+    assert res.startswith("gemini") and kobold.calls == calls
+    print(f"✅ Failover + Breaker: Kobold gesperrt, direkt Gemini  ({r.status()})")
+
+    # 5) Nach dem Cooldown ein Probeaufruf; Kobold wieder gesund -> Breaker zu
+    kobold.down = False
+    time.sleep(0.55)
+    res, _ = timed(r, "wieder da?")
+    assert res.startswith("kobold") and r.providers[0].health.state == "closed", res
+    print(f"✅ Half-open Probe erfolgreich: {r.status()}")
+
+    # 6) Alles aus: None statt Hänger
+    kobold.down = gemini.down = True
+    res, secs = timed(r, "niemand da")
+    assert res is None, res
+    print(f"✅ Beide aus: None nach {secs * 1000:.0f} ms")
+
+    print(f"\n   Metriken: {metrics.format_line('router.')}")
+    print("\n✅ router_selfcheck fertig.")
+
+if __name__ == "__main__":
+    main()
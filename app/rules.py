@@ -33,6 +33,10 @@ RE_INCEST = re.compile(
     r"bruder\b|schwester\b|vater\b|mutter\b)(?:\b|$)",
     re.IGNORECASE
 )
+RE_SEXUAL_TRIGGERS = re.compile(
+    r"(ficken|sex|geil|ständer|muschi|pussy|schwanz|penis|vögeln|bumsen|lecken|lutschen|blasen)",
+    re.IGNORECASE
+)
 RE_FAREWELL = re.compile(
     r"\b(tsch[uü]ss|ciao|auf wiedersehen|bye|gute nacht|bis bald|"
     r"mach[’']?s gut|schlaf gut|bis sp[aä]ter|bis dann)\b",
@@ -63,12 +67,16 @@ def enforce_du_form(text: str) -> str:
         out = re.sub(pat, rep, out)
     return out
 
+# ---------- Harte Blockregel ----------
+def is_incest_block(text: str) -> bool:
+    """Familie/Inzest + sexueller Trigger -> niemals beantworten."""
+    t = text or ""
+    return bool(RE_INCEST.search(t)) and bool(RE_SEXUAL_TRIGGERS.search(t))
+
 # ---------- Pipeline-Durchlauf ----------
 def _pipeline_once(raw: str) -> Tuple[str, Dict[str, bool], bool]:
-    if RE_INCEST.search(raw or ""):
-        sexual_triggers = re.compile(r"(ficken|sex|geil|ständer|muschi|pussy|schwanz|penis|vögeln|bumsen|lecken|lutschen|blasen)", re.IGNORECASE)
-        if sexual_triggers.search(raw):
-             return "", {"incest_block": True}, True
+    if is_incest_block(raw):
+        return "", {"incest_block": True}, True
 
     flags: Dict[str, bool] = {"incest_block": False, "has_contacts": False,"has_meetup": False, "has_link": False, "had_farewell": False,"too_long": False, "used_du_form": False, "dash_removed": False,}
     txt = raw or ""
@@ -2,14 +2,12 @@
 import re
 import sqlite3
 import random
-from pathlib import Path
 
-DB_PATH = Path("data/chat_brain.sqlite")
+from .db import DB_PATH, connect_migrated
 
 class RuleEngine:
     def __init__(self, db_path=DB_PATH):
-        self.conn = sqlite3.connect(db_path)
-        self.conn.row_factory = sqlite3.Row
+        self.conn = connect_migrated(db_path, rows=True)
 
     def apply_rules(self, text: str) -> str:
         """ wendet Regeln in richtiger Reihenfolge an """
@@ -0,0 +1,82 @@
+# app/session.py
+# Login nur, wenn die gespeicherte Sitzung abgelaufen ist.
+# Der Browser-Kontext liegt dauerhaft im Profilordner (browser.open_persistent); beim
+# Start wird geprüft, ob der Chat ohne Login erreichbar ist – erst wenn nicht, wird
+# mit VILUU_USERNAME/VILUU_PASSWORD neu eingeloggt.
+from __future__ import annotations
+import os, re, sys, time
+
+LOGIN_URL = "https://chatadmin.de/login"
+CHAT_URL  = "https://viluu.de/mod99/chat/screen"
+
+CHAT_READY  = ".messages-container, #message-input"   # daran erkennen wir die Chat-Ansicht
+RE_LOGIN    = re.compile(r"/login\b|/signin\b", re.IGNORECASE)
+CHECK_TIMEOUT_MS = 15000
+
+def is_login_page(page) -> bool:
+    """Billig (nur die URL, kein DOM-Zugriff) – eignet sich für jeden Poll."""
+    return bool(RE_LOGIN.search(page.url or ""))
+
+def on_chat(page) -> bool:
+    """Steht die Seite schon eingeloggt im Chat? (ohne Navigation – z.B. nach dem Andocken)"""
+    try:
+        return not is_login_page(page) and page.query_selector(CHAT_READY) is not None
+    except Exception:
+        return False
+
+def session_valid(page, timeout_ms: int = CHECK_TIMEOUT_MS) -> bool:
+    """Öffnet den Chat; True, wenn er ohne Umleitung zum Login erscheint."""
+    try:
+        page.goto(CHAT_URL, wait_until="domcontentloaded", timeout=timeout_ms)
+        if is_login_page(page):
+            return False
+        page.wait_for_selector(CHAT_READY, timeout=timeout_ms)
+        return not is_login_page(page)
+    except Exception:
+        return False
+
+def login(page, username: str, password: str) -> bool:
+    """Login-Formular ausfüllen und danach prüfen, ob der Chat erreichbar ist."""
+    print(f"🔐 Sitzung abgelaufen – Login auf {LOGIN_URL} …")
+    page.goto(LOGIN_URL)
+    page.get_by_label("Nickname").fill(username)
+    page.get_by_label("Password").fill(password)
+    page.get_by_role("button", name="Log In").click()
+    try:
+        page.wait_for_url(lambda url: not RE_LOGIN.search(url), timeout=CHECK_TIMEOUT_MS)
+    except Exception:
+        pass   # bleibt auf der Login-Seite -> Prüfung unten schlägt fehl
+    return session_valid(page)
+
+def ensure_session(page, interactive: bool | None = None, keep_page: bool = False) -> bool:
+    """
+    Sitzung prüfen und nur bei Bedarf neu einloggen. Klappt das automatisch nicht und
+    läuft der Bot an einem Terminal, bleibt der bisherige manuelle Schritt als Rückfall.
+    keep_page: offene Chat-Seite (Daemon) nicht neu laden, wenn sie schon passt.
+    """
+    t0 = time.perf_counter()
+    if keep_page and on_chat(page):
+        print("✅ Chat-Seite übernommen – kein Neuladen, kein Login.")
+        return True
+    if session_valid(page):
+        print(f"✅ Sitzung gültig – Login übersprungen ({time.perf_counter() - t0:.1f}s).")
+        return True
+
+    username = os.getenv("VILUU_USERNAME")
+    password = os.getenv("VILUU_PASSWORD")
+    if username and password and login(page, username, password):
+        print(f"✅ Neu eingeloggt, Sitzung gespeichert ({time.perf_counter() - t0:.1f}s).")
+        return True
+
+    if interactive is None:
+        interactive = sys.stdin.isatty()
+    if not interactive:
+        print("❌ Login fehlgeschlagen (Zugangsdaten in .env prüfen).")
+        return False
+    if not (username and password):
+        print("⚠️ Login-Daten nicht in .env gefunden.")
+    input("--> BITTE LOGGE DICH IM BROWSER EIN, NAVIGIERE ZUM CHAT UND DRÜCKE DANN HIER ENTER...")
+    ok = not is_login_page(page)
+    if ok:
+        print("✅ Manuell eingeloggt – die Sitzung wird für den nächsten Start gespeichert.")
+    return ok
@@ -1,13 +1,10 @@
 # app/setup_db.py
-import sqlite3
-from pathlib import Path
-
-DB_PATH = Path("data/chat_brain.sqlite")
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+# Regel-Tabelle 'rules' (Regex-Regeln für rules_repo) + Startbefüllung.
+# Angelegt wird über app/migrations.py; dieses Skript bringt die DB nur auf Stand.
+from .db import DB_PATH, connect
+from .migrations import migrate, SCHEMA_VERSION
 
 schema = """
-PRAGMA foreign_keys = ON;
-
 CREATE TABLE IF NOT EXISTS rules (
   id INTEGER PRIMARY KEY,
   name TEXT NOT NULL,
@@ -29,18 +26,23 @@ seed = [
   # Länge 500 Zeichen erzwingen machen wir später im Code (einfacher und sicher).
 ]
 
-def main():
-  conn = sqlite3.connect(DB_PATH)
-  cur = conn.cursor()
-  cur.executescript(schema)
-  cur.execute("DELETE FROM rules")  # sauber neu befüllen
+def seed_rules(cur):
+  # nur eine leere Tabelle befüllen – eigene Regeln bleiben erhalten
+  if cur.execute("SELECT 1 FROM rules LIMIT 1").fetchone():
+    return
   cur.executemany(
       "INSERT INTO rules (name, pattern, action, replacement, priority) VALUES (?,?,?,?,?)",
       seed
   )
-  conn.commit()
-  conn.close()
-  print(f"✅ Datenbank erstellt: {DB_PATH} mit {len(seed)} Regeln.")
+
+def main():
+  conn = connect()
+  try:
+    migrate(conn)
+    n = conn.execute("SELECT COUNT(*) FROM rules").fetchone()[0]
+  finally:
+    conn.close()
+  print(f"✅ Datenbank bereit: {DB_PATH} (Schema-Version {SCHEMA_VERSION}) mit {n} Regeln.")
 
 if __name__ == "__main__":
   main()
@@ -0,0 +1,77 @@
+# app/startup_bench.py
+# Startzeit messen: jede Stufe in einem frischen Python-Prozess (kalte Importe),
+# mehrfach, Median. Dazu die teuersten Top-Level-Importe des Bots (-X importtime).
+#
+#   python -m app.startup_bench            # 5 Läufe je Stufe
+#   python -m app.startup_bench -n 10
+#
+# Die letzte Strecke bis zum ersten Poll (Browser, Login) braucht einen echten Browser:
+# run.py übergibt den Startzeitpunkt, der Bot gibt "Start -> erster Poll" selbst aus.
+from __future__ import annotations
+import argparse, os, re, statistics, subprocess, sys
+from typing import Dict, List, Optional, Tuple
+
+from .browser import BASE_DIR
+
+STAGES: List[Tuple[str, str]] = [
+    ("Python leer", "pass"),
+    ("Menü (run.py)", "import run"),
+    ("Playwright allein", "import playwright.sync_api"),
+    ("KI-Client (Registry)", "import app.ai_client"),
+    ("Bot-Module, Kobold", "import app.bot_with_history"),
+    ("Gemini-SDK (erst bei Auswahl)", "import google.generativeai"),
+]
+
+RE_IMPORTTIME = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def _run(code: str) -> Tuple[Optional[float], str]:
+    """Ein kalter Lauf: (Sekunden bis Ende der Importe, stderr) – None bei Fehler."""
+    env = dict(os.environ, KI_PROVIDER="kobold")
+    probe = f"import time as _t; _t0 = _t.perf_counter()\n{code}\nprint(_t.perf_counter() - _t0)"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe], cwd=BASE_DIR,
+                          env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return None, proc.stderr
+    return float(proc.stdout.strip().splitlines()[-1]), proc.stderr
+
+def top_imports(stderr: str, limit: int = 8) -> List[Tuple[str, float]]:
+    """Fremdpakete (ohne app.*) nach kumulierter Importzeit in ms – je Paket der erste, teuerste Import."""
+    out: Dict[str, float] = {}
+    for line in stderr.splitlines():
+        m = RE_IMPORTTIME.match(line)
+        if not m or len(m.group(3)) < 3:   # Ebene 0 = Interpreter-Start bzw. app selbst
+            continue
+        root = m.group(4).split(".")[0]
+        if root != "app":
+            out[root] = max(out.get(root, 0.0), int(m.group(2)) / 1000)
+    return sorted(out.items(), key=lambda kv: -kv[1])[:limit]
+
+def main():
+    ap = argparse.ArgumentParser(description="Kalte Importzeiten von run.py bis zu den Bot-Modulen messen.")
+    ap.add_argument("-n", type=int, default=5, help="Läufe je Stufe (Median)")
+    args = ap.parse_args()
+
+    print(f"⏱️  Kalte Importzeiten (Median aus {args.n} Läufen, je ein neuer Prozess):")
+    bot_stderr = ""
+    for label, code in STAGES:
+        times, err = [], ""
+        for _ in range(args.n):
+            t, err = _run(code)
+            if t is None:
+                break
+            times.append(t)
+        if not times:
+            last = (err.strip().splitlines() or ["?"])[-1]
+            print(f"   {label:32} –  ({last})")
+            continue
+        print(f"   {label:32} {statistics.median(times) * 1000:7.0f} ms")
+        if code == "import app.bot_with_history":
+            bot_stderr = err
+    if bot_stderr:
+        print("\n   Teuerste Pakete beim Import der Bot-Module:")
+        for name, ms in top_imports(bot_stderr):
+            print(f"     {ms:7.0f} ms  {name}")
+    print("\n   Bis zum ersten Poll: siehe Ausgabe 'Start -> erster Poll' beim Start über run.py.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+# app/summary_memory.py
+# Laufende Zusammenfassung langer Gespräche (pro Unterhaltung in SQLite).
+# Ältere Nachrichten, die nicht mehr ins Prompt-Fenster passen, werden im
+# Hintergrund schrittweise verdichtet – erst wenn genug Neues dazugekommen ist.
+from __future__ import annotations
+import queue, sqlite3, threading, time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from . import metrics
+
+REFRESH_EVERY     = 20    # neu hinzugekommene, ältere Nachrichten bis zur nächsten Verdichtung
+KEEP_RECENT       = 10    # die jüngsten Nachrichten stehen ohnehin im Prompt
+SUMMARY_MAX_CHARS = 600   # feste Größe des Blocks im Prompt
+MAX_LINE_CHARS    = 300   # einzelne lange Nachrichten kürzen
+MAX_BATCH         = 30    # höchstens so viele Nachrichten pro Verdichtungsschritt
+
+SUMMARY_RULES = """
+Du fasst einen Chat-Verlauf für dein eigenes Gedächtnis zusammen.
+Schreibe höchstens 5 kurze Stichpunkte auf Deutsch: Fakten über das Gegenüber
+(Beruf, Wohnort, Wünsche, Familie), offene Fragen, Stimmung und Themen.
+Keine Kontaktdaten, keine Adressen, keine Vermutungen.
+"""
+
+# -------------------------------------------------------
+# DB
+# -------------------------------------------------------
+def ensure_schema(con: sqlite3.Connection):
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS conversation_summaries (
+            conv_id TEXT PRIMARY KEY,          -- '' = ohne Dialogschlüssel
+            summary TEXT NOT NULL,
+            upto_message_id INTEGER NOT NULL,  -- bis hierhin verdichtet
+            updated_at TEXT
+        )
+    """)
+
+def get_summary_block(con: sqlite3.Connection, conv_id: Optional[str]) -> str:
+    row = con.execute(
+        "SELECT summary FROM conversation_summaries WHERE conv_id=?", (conv_id or "",)
+    ).fetchone()
+    if not row or not row[0]:
+        return ""
+    return row[0][:SUMMARY_MAX_CHARS]
+
+def _pending_messages(con: sqlite3.Connection, conv_id: str) -> Tuple[str, int, List[Tuple[int, str, str]]]:
+    """Ältere, noch nicht verdichtete Nachrichten (ohne die jüngsten KEEP_RECENT)."""
+    row = con.execute(
+        "SELECT summary, upto_message_id FROM conversation_summaries WHERE conv_id=?", (conv_id,)
+    ).fetchone()
+    summary, upto = (row[0], row[1]) if row else ("", 0)
+    rows = con.execute(
+        "SELECT id, direction, text FROM messages "
+        "WHERE conv_id IS ? AND id>? ORDER BY id DESC LIMIT -1 OFFSET ?",   # Index (conv_id, id)
+        (conv_id or None, upto, KEEP_RECENT)
+    ).fetchall()
+    rows.reverse()
+    return summary, upto, rows
+
+def refresh_summary(con: sqlite3.Connection, conv_id: Optional[str],
+                    summarize: Callable[[str, str], Optional[str]], force: bool = False) -> bool:
+    """Verdichtet, wenn genug neue ältere Nachrichten da sind. True = aktualisiert."""
+    key = conv_id or ""
+    previous, _, rows = _pending_messages(con, key)
+    if not rows or (len(rows) < REFRESH_EVERY and not force):
+        return False
+    rows = rows[:MAX_BATCH]   # großer Rückstand -> in mehreren Schritten (älteste zuerst)
+
+    lines = []
+    for _, direction, text in rows:
+        who = "Gegenüber" if direction == "in" else "Ich"
+        lines.append(f"{who}: {' '.join((text or '').split())[:MAX_LINE_CHARS]}")
+    new_summary = summarize(previous, "\n".join(lines))
+    if not new_summary:
+        return False
+
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    con.execute(
+        "INSERT INTO conversation_summaries(conv_id, summary, upto_message_id, updated_at) "
+        "VALUES (?,?,?,?) ON CONFLICT(conv_id) DO UPDATE SET "
+        "summary=excluded.summary, upto_message_id=excluded.upto_message_id, updated_at=excluded.updated_at",
+        (key, new_summary.strip()[:SUMMARY_MAX_CHARS], rows[-1][0], now)
+    )
+    con.commit()
+    metrics.incr("summary.refreshed")
+    metrics.incr("summary.messages_folded", len(rows))
+    return True
+
+# -------------------------------------------------------
+# Zusammenfassen per KI
+# -------------------------------------------------------
+def summarize_with_llm(previous: str, new_lines: str) -> Optional[str]:
+    # nicht über den Router der Antworten (siehe ai_client.generate_background)
+    from .ai_client import generate_background
+    block = ""
+    if previous:
+        block += f"BISHERIGE ZUSAMMENFASSUNG:\n{previous}\n\n"
+    block += f"NEUE NACHRICHTEN:\n{new_lines}\n\nAktualisierte Zusammenfassung:"
+    return generate_background([], SUMMARY_RULES, block)
+
+# -------------------------------------------------------
+# Hintergrund-Job
+# -------------------------------------------------------
+class SummaryWorker(threading.Thread):
+    """
+    Eigener Thread mit eigener DB-Verbindung. request() ist nicht blockierend.
+    Solange hot_path gesetzt ist (Antwort wird gerade generiert), wird gewartet,
+    damit das Modell nicht gleichzeitig für die Zusammenfassung rechnet.
+    """
+    def __init__(self, db_path: str, summarize: Callable[[str, str], Optional[str]] = summarize_with_llm):
+        super().__init__(name="summary-worker", daemon=True)
+        self.db_path = db_path
+        self.summarize = summarize
+        self.hot_path = threading.Event()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._pending: set[str] = set()
+        self._lock = threading.Lock()
+
+    def request(self, conv_id: Optional[str]):
+        key = conv_id or ""
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._queue.put(key)
+
+    def run(self):
+        con = sqlite3.connect(self.db_path)
+        try:
+            ensure_schema(con)
+            while True:
+                key = self._queue.get()
+                with self._lock:
+                    self._pending.discard(key)
+                try:
+                    while True:
+                        while self.hot_path.is_set():
+                            time.sleep(0.5)
+                        if not refresh_summary(con, key, self.summarize):
+                            break
+                except Exception as e:
+                    metrics.incr("summary.errors")
+                    print(f"⚠️ Zusammenfassung fehlgeschlagen: {e}")
+        finally:
+            con.close()
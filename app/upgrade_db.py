@@ -1,7 +1,8 @@
 # app/upgrade_db.py
-import sqlite3, os, json, datetime as dt
-
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "chat_brain.sqlite")
+# Grundschema (Profile, Dialog-Infos, Nachrichten, harte Regeln, Einstellungen).
+# Ausgeführt wird es als Migration 1 in app/migrations.py – hier nur DDL + Startwerte.
+from .db import DB_PATH, connect
+from .migrations import migrate, SCHEMA_VERSION
 
 DDL = [
     # Profile der beiden Seiten (du & Gegenüber)
@@ -12,23 +13,25 @@ DDL = [
         name TEXT,
         gender TEXT,           -- 'm','w','d' o.ä.
         city TEXT,
-        relationship_status TEXT,
+        status TEXT,           -- z.B. 'single seit 3 jahren' (Alt-DBs: relationship_status)
         birthday TEXT,         -- ISO 'YYYY-MM-DD' oder frei
         job TEXT,
         updated_at TEXT
     );
     """,
 
-    # Freie Dialog-Infos als Key/Value
+    # Freie Dialog-Infos als Key/Value – ein Eintrag je (Unterhaltung, key, value)
     """
     CREATE TABLE IF NOT EXISTS dialog_info (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
-        profile_id INTEGER,
+        conv_id TEXT NOT NULL DEFAULT '',
         key TEXT NOT NULL,
         value TEXT,
-        updated_at TEXT,
-        UNIQUE(profile_id, key),
-        FOREIGN KEY(profile_id) REFERENCES profiles(id) ON DELETE CASCADE
+        confidence REAL,
+        created_at TEXT,
+        first_seen TEXT,
+        last_seen TEXT,
+        occurrences INTEGER NOT NULL DEFAULT 1
     );
     """,
 
@@ -117,20 +120,9 @@ SEED_SETTINGS = {
     "greeting_mode": "smart"        # keine Zwangs-Begrüßung
 }
 
-def ensure_conn():
-    if not os.path.exists(DB_PATH):
-        print(f"ℹ️  DB wird neu angelegt: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    conn.execute("PRAGMA foreign_keys = ON;")
-    return conn
-
-def upsert_settings(conn, kv):
-    for k, v in kv.items():
-        conn.execute(
-            "INSERT INTO settings(key,value) VALUES(?,?) "
-            "ON CONFLICT(key) DO UPDATE SET value=excluded.value;",
-            (k, v)
-        )
+def seed_settings(conn, kv):
+    # nur fehlende Schlüssel setzen – geänderte Werte bleiben
+    conn.executemany("INSERT OR IGNORE INTO settings(key,value) VALUES(?,?)", list(kv.items()))
 
 def seed_rules(conn):
     # harte Regeln nur hinzufügen, wenn gleicher name noch nicht existiert
@@ -158,19 +150,12 @@ def seed_normalize(conn):
         )
 
 def main():
-    conn = ensure_conn()
+    conn = connect()
     try:
-        for stmt in DDL:
-            conn.execute(stmt)
-
-        upsert_settings(conn, SEED_SETTINGS)
-        seed_rules(conn)
-        seed_normalize(conn)
-
-        conn.commit()
+        n = migrate(conn)
         print("✅ DB-Upgrade erfolgreich.")
         print(f"   Datei: {DB_PATH}")
-        print("   Tabellen: profiles, dialog_info, messages, rules_hard, normalize_map, settings, rule_violations")
+        print(f"   Schema-Version: {SCHEMA_VERSION} ({n} Migration(en) angewendet)")
     finally:
         conn.close()
 
@@ -1,6 +1,20 @@
 # run.py
-from app.bot_with_history import main
-import os
+import time
+T0 = time.perf_counter()   # Prozessstart – für "Start -> erster Poll"
+
+from app.browser import daemon_running
+import os, subprocess, sys
+
+def run_bot(ki_provider: str):
+    # Erst jetzt laden: das Menü erscheint ohne Playwright-/Bot-Importe
+    from app.bot_with_history import main
+    main(ki_provider=ki_provider, started_at=T0)
+
+def start_browser_daemon():
+    # Eigenes Fenster (Windows) bzw. eigene Sitzung: der Browser überlebt Bot-Neustarts
+    kwargs = {"creationflags": subprocess.CREATE_NEW_CONSOLE} if os.name == "nt" else {"start_new_session": True}
+    subprocess.Popen([sys.executable, "-m", "app.browser_daemon"],
+                     cwd=os.path.dirname(os.path.abspath(__file__)), **kwargs)
 
 def start():
     while True:
@@ -12,6 +26,10 @@ def start():
         print("\nWelche KI möchtest du für diesen Lauf nutzen?")
         print("\n[1] Google Gemini (Online, schnell und kreativ)")
         print("[2] Lokales Modell / Kobold (Offline, auf deinem PC)")
+        if daemon_running():
+            print("\n🟢 Browser-Daemon läuft – der Bot dockt ohne Neustart des Browsers an.")
+        else:
+            print("\n[b] Browser-Daemon starten (Browser bleibt bei Bot-Neustarts offen)")
         print("\n[q] Programm beenden")
         print("\n=============================================")
         
@@ -19,15 +37,20 @@ def start():
         
         if choice == '1':
             print("\nStarte Bot mit Google Gemini...")
-            main(ki_provider="gemini")
+            run_bot("gemini")
             # Das break hier ist Absicht, damit das Menü nach einem Lauf nicht sofort wieder erscheint.
             # Du kannst es entfernen, wenn du das wünschst.
             break 
         elif choice == '2':
             print("\nStarte Bot mit dem lokalen Modell (Kobold)...")
             print("WICHTIG: Stelle sicher, dass dein lokaler Server (z.B. KoboldCpp) läuft!")
-            main(ki_provider="kobold")
+            run_bot("kobold")
             break
+        elif choice.lower() == 'b':
+            if not daemon_running():
+                start_browser_daemon()
+                print("\nBrowser-Daemon wird in einem eigenen Fenster gestartet...")
+            input("Drücke ENTER, um zum Menü zurückzukehren.")
         elif choice.lower() == 'q':
             print("\nProgramm wird beendet. Bis zum nächsten Mal!")
             break